@@ -0,0 +1,339 @@
+# -----------------------------------------------------
+# CONTROL DE ADMISIÓN (LÍMITES POR CLIENTE Y POR RUTA)
+# -----------------------------------------------------
+# Middleware ASGI puro que decide, antes del enrutado y del parseo del
+# cuerpo, si una petición entra:
+#
+# - Cubeta de tokens por cliente (IP) para todas las rutas HTTP y, además,
+#   una propia por ruta en las caras (contacto, Star Trip, renders...).
+#   Sin tokens -> 429 con Retry-After.
+# - Tope de peticiones simultáneas por ruta (hilos de SMTP, FFT, síntesis).
+#   Lleno -> 503 inmediato: no se encola trabajo que no se va a poder servir.
+# - Tamaño del cuerpo: Content-Length por encima del límite -> 413 sin leer
+#   nada; sin Content-Length (chunked) se lee hasta el límite y se corta.
+# - Presupuesto de WebSockets por ruta (total y por cliente). Fuera de
+#   presupuesto, la conexión se acepta y se cierra al momento con 1013
+#   (reintentar más tarde): un cierre antes de aceptar lo convierte el
+#   servidor en un 403 del handshake y el cliente nunca vería el código.
+#
+# Rechazar cuesta microsegundos y no toca el event loop de la app: la
+# latencia del tráfico admitido se mantiene estable bajo sobrecarga.
+# La API no tiene usuarios autenticados, así que el cliente es la IP. Detrás
+# de N proxies (ADMISSION_TRUST_PROXY=N) es la entrada de X-Forwarded-For que
+# añadió el más externo: la N-ésima empezando por la derecha. Las de la
+# izquierda las escribe el propio cliente y no sirven como clave.
+
+import math
+import os
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+from starlette.routing import compile_path
+
+from fast_json import FastJSONResponse
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") not in ("0", "false", "False")
+# Número de proxies de confianza delante de la app (0: la IP de la conexión; "true" equivale a 1)
+_TRUST_PROXY = os.getenv("ADMISSION_TRUST_PROXY", "0")
+ADMISSION_TRUST_PROXY = 1 if _TRUST_PROXY in ("true", "True") else int(_TRUST_PROXY) if _TRUST_PROXY.isdigit() else 0
+# Cubeta general por cliente (todas las rutas HTTP)
+ADMISSION_DEFAULT_RATE = float(os.getenv("ADMISSION_DEFAULT_RATE", 50))
+ADMISSION_DEFAULT_BURST = float(os.getenv("ADMISSION_DEFAULT_BURST", 100))
+# Cubetas recordadas por límite; al superarlo se olvida la menos reciente (vuelve llena)
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", 100_000))
+
+WS_TRY_AGAIN_LATER = 1013
+
+
+class TokenBuckets:
+    """Una cubeta por clave: `rate` tokens por segundo hasta `burst`; LRU acotada en claves."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = ADMISSION_MAX_CLIENTS, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str) -> float:
+        """Consume un token; 0 si hay, o los segundos que faltan para el siguiente."""
+        now = self._clock()
+        entry = self._buckets.get(key)
+        if entry is None:
+            tokens = self.burst
+        else:
+            tokens = min(self.burst, entry[0] + (now - entry[1]) * self.rate)
+            self._buckets.move_to_end(key)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class RoutePolicy:
+    """Límites de una ruta (plantilla de FastAPI); `path` también sirve de etiqueta en las métricas."""
+
+    def __init__(
+        self,
+        path: str,
+        methods: Sequence[str] = ("POST",),
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        max_body_bytes: Optional[int] = None,
+        stream_body: bool = False,
+        max_connections: Optional[int] = None,
+        max_connections_per_client: Optional[int] = None,
+        websocket: bool = False,
+    ):
+        self.path = path
+        self.methods = frozenset(method.upper() for method in methods)
+        self.websocket = websocket
+        self.buckets = TokenBuckets(rate, burst or rate) if rate else None
+        self.max_concurrency = max_concurrency
+        self.max_body_bytes = max_body_bytes
+        # El endpoint lee el cuerpo en streaming y aplica su propio límite: sólo se mira Content-Length
+        self.stream_body = stream_body
+        self.max_connections = max_connections
+        self.max_connections_per_client = max_connections_per_client
+        self.regex = compile_path(path)[0] if "{" in path else None
+
+        self.in_flight = 0
+        self.connections = 0
+        self.client_connections: Counter = Counter()
+        self.admitted = 0
+        self.rejected: Counter = Counter()
+
+    def stats(self) -> dict:
+        stats = {"admitted": self.admitted, "rejected": dict(self.rejected)}
+        if self.websocket:
+            stats.update(connections=self.connections, max_connections=self.max_connections)
+        else:
+            stats.update(in_flight=self.in_flight, max_concurrency=self.max_concurrency,
+                         max_body_bytes=self.max_body_bytes)
+        if self.buckets is not None:
+            stats.update(rate_per_s=self.buckets.rate, burst=self.buckets.burst)
+        return stats
+
+
+class AdmissionController:
+    """Registro de políticas por ruta más la cubeta general por cliente."""
+
+    def __init__(
+        self,
+        default_rate: float = ADMISSION_DEFAULT_RATE,
+        default_burst: float = ADMISSION_DEFAULT_BURST,
+        trust_proxy: int = ADMISSION_TRUST_PROXY,
+        enabled: bool = ADMISSION_ENABLED,
+    ):
+        self.enabled = enabled
+        self.trust_proxy = int(trust_proxy)
+        self.default_buckets = TokenBuckets(default_rate, default_burst) if default_rate > 0 else None
+        self.default_rejected = 0
+        self._exact: Dict[tuple, RoutePolicy] = {}
+        self._patterns: List[RoutePolicy] = []
+        self.policies: List[RoutePolicy] = []
+
+    def limit(self, path: str, **limits) -> RoutePolicy:
+        """Registra los límites de una ruta; se declara junto al endpoint que protege."""
+        policy = RoutePolicy(path, **limits)
+        self.policies.append(policy)
+        if policy.regex is not None:
+            self._patterns.append(policy)
+        else:
+            for method in ("WEBSOCKET",) if policy.websocket else policy.methods:
+                self._exact[(method, path)] = policy
+        return policy
+
+    def match(self, method: str, path: str) -> Optional[RoutePolicy]:
+        policy = self._exact.get((method, path))
+        if policy is not None:
+            return policy
+        websocket = method == "WEBSOCKET"
+        for policy in self._patterns:
+            if policy.websocket == websocket and (websocket or method in policy.methods) and policy.regex.match(path):
+                return policy
+        return None
+
+    def client_key(self, scope) -> str:
+        if self.trust_proxy:
+            # Varias cabeceras equivalen a una sola con las listas unidas, en orden
+            forwarded = [entry.strip() for name, value in scope.get("headers", ()) if name == b"x-forwarded-for"
+                         for entry in value.split(b",")]
+            forwarded = [entry for entry in forwarded if entry]
+            if forwarded:
+                # Con menos entradas que proxies, todas las escribieron proxies de confianza: la más lejana
+                return forwarded[max(0, len(forwarded) - self.trust_proxy)].decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "default": {
+                "rate_per_s": self.default_buckets.rate if self.default_buckets else None,
+                "burst": self.default_buckets.burst if self.default_buckets else None,
+                "clients_tracked": len(self.default_buckets) if self.default_buckets else 0,
+                "rejected": self.default_rejected,
+            },
+            "routes": {
+                f"{'WS' if policy.websocket else ','.join(sorted(policy.methods))} {policy.path}": policy.stats()
+                for policy in self.policies
+            },
+        }
+
+    def rejections(self) -> List[tuple]:
+        """(ruta, motivo, total) para las métricas."""
+        rows = [("*", "rate_limited", self.default_rejected)]
+        for policy in self.policies:
+            rows.extend((policy.path, reason, count) for reason, count in policy.rejected.items())
+        return rows
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI: aplica AdmissionController antes de enrutar y de leer el cuerpo."""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if not self.controller.enabled:
+            await self.app(scope, receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _reject(scope, receive, send, policy: Optional[RoutePolicy], status: int, reason: str, detail: str, retry_after: float = 0):
+        if policy is not None:
+            policy.rejected[reason] += 1
+            # Para que las métricas etiqueten el rechazo con la plantilla de la ruta
+            scope["route"] = policy
+        headers = {"Retry-After": str(max(1, math.ceil(retry_after)))} if status in (429, 503) else {}
+        await FastJSONResponse({"detail": detail}, status_code=status, headers=headers)(scope, receive, send)
+
+    async def _http(self, scope, receive, send):
+        controller = self.controller
+        client = controller.client_key(scope)
+        if controller.default_buckets is not None:
+            wait = controller.default_buckets.take(client)
+            if wait:
+                controller.default_rejected += 1
+                await self._reject(scope, receive, send, None, 429, "rate_limited",
+                                   "Demasiadas peticiones. Reintenta en unos segundos.", wait)
+                return
+
+        policy = controller.match(scope["method"], scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+        if policy.buckets is not None:
+            wait = policy.buckets.take(client)
+            if wait:
+                await self._reject(scope, receive, send, policy, 429, "rate_limited",
+                                   "Demasiadas peticiones a este recurso. Reintenta en unos segundos.", wait)
+                return
+
+        length = None
+        if policy.max_body_bytes is not None:
+            for name, value in scope.get("headers", ()):
+                if name == b"content-length":
+                    length = int(value) if value.isdigit() else None
+                    break
+            if length is not None and length > policy.max_body_bytes:
+                await self._reject(scope, receive, send, policy, 413, "too_large",
+                                   f"Cuerpo demasiado grande: máximo {policy.max_body_bytes} bytes.")
+                return
+
+        if policy.max_concurrency is not None and policy.in_flight >= policy.max_concurrency:
+            await self._reject(scope, receive, send, policy, 503, "overloaded",
+                               "Servicio saturado. Reintenta en unos segundos.", 1)
+            return
+
+        policy.in_flight += 1
+        try:
+            if policy.max_body_bytes is not None and length is None and not policy.stream_body:
+                # Cuerpo chunked: se lee aquí hasta el límite, antes de que nadie lo parsee
+                body = bytearray()
+                more_body = True
+                while more_body:
+                    message = await receive()
+                    if message["type"] != "http.request":
+                        return
+                    body += message.get("body", b"")
+                    more_body = message.get("more_body", False)
+                    if len(body) > policy.max_body_bytes:
+                        await self._reject(scope, receive, send, policy, 413, "too_large",
+                                           f"Cuerpo demasiado grande: máximo {policy.max_body_bytes} bytes.")
+                        return
+                receive = _replay_body(bytes(body), receive)
+            policy.admitted += 1
+            await self.app(scope, receive, send)
+        finally:
+            policy.in_flight -= 1
+
+    async def _websocket(self, scope, receive, send):
+        controller = self.controller
+        policy = controller.match("WEBSOCKET", scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+        client = controller.client_key(scope)
+        reason = None
+        if policy.buckets is not None and policy.buckets.take(client):
+            reason = "rate_limited"
+        elif policy.max_connections is not None and policy.connections >= policy.max_connections:
+            reason = "overloaded"
+        elif (policy.max_connections_per_client is not None
+              and policy.client_connections[client] >= policy.max_connections_per_client):
+            reason = "client_budget"
+        if reason is not None:
+            policy.rejected[reason] += 1
+            scope["route"] = policy
+            await _close_try_again_later(receive, send, "Presupuesto de conexiones agotado")
+            return
+
+        policy.connections += 1
+        policy.client_connections[client] += 1
+        policy.admitted += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            policy.connections -= 1
+            policy.client_connections[client] -= 1
+            if policy.client_connections[client] <= 0:
+                del policy.client_connections[client]
+
+
+async def _close_try_again_later(receive, send, reason: str) -> None:
+    """Acepta y cierra con 1013 sin pasar por la app; la sala nunca llega a ver la conexión."""
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+    await send({"type": "websocket.close", "code": WS_TRY_AGAIN_LATER, "reason": reason})
+
+
+def _replay_body(body: bytes, receive):
+    """`receive` que entrega primero el cuerpo ya leído y después delega (p. ej. http.disconnect)."""
+    pending = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def replay():
+        if pending:
+            return pending.pop()
+        return await receive()
+
+    return replay
@@ -0,0 +1,369 @@
+"""Suite de carga y benchmarks de todas las superficies de la API, con baselines.
+
+Conduce la app en proceso (httpx + ASGITransport, con el lifespan real) y a
+través de uvicorn (HTTP real + WebSockets). Firestore y SMTP se sustituyen por
+dobles locales (fake_backends.py). Escenarios:
+
+- transmute:        corpus realista (diario en español, con repeticiones que ejercitan la caché)
+- transmute-batch:  lotes de 200 textos
+- star-trip-*:      JSON de 1k y 100k puntos, binario float32 de 2M puntos
+- hologram/mystery: GET a alta concurrencia
+- contact:          formulario de contacto contra la cola de correo
+- divine-flow-ws:   muchos espectadores de /ws/divine-flow (sólo uvicorn)
+
+Por escenario reporta peticiones/s, p50/p99 (ms) y RSS del proceso servidor
+(en modo inprocess es el propio proceso: incluye el cliente y las ejecuciones
+anteriores de --runs).
+Con --save-baseline guarda benchmarks/baselines/<modo>.json; después, cada
+ejecución se compara con él y termina con código 1 si algún escenario empeora
+más de lo tolerado: rps o RSS fuera de --tolerance, p99 (la mediana en los
+escenarios con pocas peticiones) fuera de --p99-tolerance más --p99-slack-ms,
+o más errores que en el baseline.
+
+Requiere httpx (pip install httpx) además de requirements.txt.
+
+Uso (desde backend-fastapi/):
+    python benchmarks/api_suite.py [--mode inprocess|uvicorn|all] [--scale 1.0]
+                                   [--only transmute star-trip-small] [--runs 3] [--save-baseline]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+MIN_P99_SAMPLES = 200
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+SENTENCES = [
+    "Hoy sentí una paz enorme al despertar con la luz del sol",
+    "El miedo volvió a aparecer en la oscuridad de la noche",
+    "Bailé toda la tarde, la musica y el ritmo me llenaron de alegria",
+    "Siento un vacio profundo, como mirar un abismo sin fondo",
+    "La conciencia se expande cuando medito sobre el amor",
+    "Escribí sobre la abundancia y la creacion de nuevos proyectos",
+    "Hubo caos en el trabajo y un bloqueo creativo que no se iba",
+    "Pensé en la entropia del universo y en la singularidad quantum",
+    "Una fiesta con amigos, risa y flow hasta el amanecer",
+    "El dolor de la perdida todavía pesa, pero hay esencia divina en todo",
+    "Camino por la playa y el mar me devuelve la calma",
+    "Leí sobre física cuántica y me quedé pensando en el tiempo",
+]
+
+
+def journal_corpus(size: int, seed: int = 3) -> list:
+    rng = random.Random(seed)
+    texts = []
+    for idx in range(size):
+        if texts and rng.random() < 0.3:
+            # ~30 % de entradas repetidas: lo que la caché de respuestas debería absorber
+            texts.append(rng.choice(texts))
+            continue
+        sentences = rng.sample(SENTENCES, rng.randint(1, 5))
+        texts.append(". ".join(sentences) + f". Entrada {idx}.")
+    return texts
+
+
+def session_points(points: int, seed: int = 5) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(points) / 256.0
+    return (np.sin(2 * np.pi * 10 * t) + 0.4 * rng.standard_normal(points)).astype(np.float32)
+
+
+def build_scenarios(scale: float) -> list:
+    """(nombre, peticiones, concurrencia, fábrica de petición) — la fábrica recibe el índice."""
+    corpus = journal_corpus(2000)
+    small = session_points(1_000).tolist()
+    medium = session_points(100_000).tolist()
+    large = session_points(2_000_000).tobytes()
+
+    def count(n):
+        return max(1, int(n * scale))
+
+    return [
+        ("transmute", count(2000), 16,
+         lambda i: ("POST", "/api/v1/cosmic-architect/transmute", {"json": {"text": corpus[i % len(corpus)]}})),
+        ("transmute-batch", count(40), 4,
+         lambda i: ("POST", "/api/v1/cosmic-architect/transmute/batch",
+                    {"json": {"texts": corpus[(i * 200) % 1800:(i * 200) % 1800 + 200]}})),
+        ("star-trip-small", count(500), 16,
+         lambda i: ("POST", "/api/v1/star-trip/analyze-data",
+                    {"json": {"user_id": f"u{i % 50}", "session_id": f"small-{i}", "raw_frequency_points": small}})),
+        ("star-trip-100k-json", count(30), 2,
+         lambda i: ("POST", "/api/v1/star-trip/analyze-data",
+                    {"json": {"user_id": "u", "session_id": f"medium-{i}", "raw_frequency_points": medium, "mode": "Relax"}})),
+        ("star-trip-2m-binary", count(30), 2,
+         lambda i: ("POST", f"/api/v1/star-trip/analyze-data/binary?user_id=u&session_id=large-{i}&mode=Sleep",
+                    {"content": large, "headers": {"content-type": "application/octet-stream"}})),
+        ("hologram", count(5000), 64, lambda i: ("GET", "/api/v1/cosmic-hologram", {})),
+        ("mystery", count(5000), 64, lambda i: ("GET", "/api/v1/cosmic-mystery", {})),
+        ("contact", count(1500), 16,
+         lambda i: ("POST", "/api/v1/contact",
+                    {"json": {"name": "Viajera", "email": "v@cosmic.local", "subject": f"Misión {i}", "message": corpus[i % 50]}})),
+    ]
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * pct / 100)))]
+
+
+def rss_mb(pid: int) -> tuple:
+    """(RSS actual, pico) en MB leídos de /proc."""
+    values = {}
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, value = line.split(":")
+                values[key] = int(value.split()[0]) / 1024
+    return values.get("VmRSS", 0.0), values.get("VmHWM", 0.0)
+
+
+async def run_http(client: httpx.AsyncClient, requests_count: int, concurrency: int, factory) -> dict:
+    # Calentamiento sin medir: importaciones perezosas, cachés frías y conexiones del pool de httpx
+    for idx in range(min(concurrency, requests_count)):
+        method, url, kwargs = factory(idx)
+        await client.request(method, url, **kwargs)
+
+    latencies = []
+    errors = 0
+    next_index = iter(range(requests_count))
+
+    async def worker():
+        nonlocal errors
+        for idx in next_index:
+            method, url, kwargs = factory(idx)
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests_count,
+        "errors": errors,
+        "rps": round(requests_count / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+async def run_divine_flow(port: int, clients: int, rooms: int, seconds: float) -> dict:
+    import websockets
+
+    gaps = []
+    frames = 0
+
+    async def viewer(idx):
+        nonlocal frames
+        url = f"ws://127.0.0.1:{port}/ws/divine-flow?room=suite-{idx % rooms}"
+        async with websockets.connect(url, subprotocols=["divine-flow.bin.v1"], max_size=None) as ws:
+            stop_at = time.perf_counter() + seconds
+            last = None
+            while time.perf_counter() < stop_at:
+                try:
+                    await asyncio.wait_for(ws.recv(), timeout=max(0.01, stop_at - time.perf_counter()))
+                except asyncio.TimeoutError:
+                    break
+                now = time.perf_counter()
+                if last is not None:
+                    gaps.append((now - last) * 1000)
+                last = now
+                frames += 1
+                if frames % 10 == 0:
+                    await ws.send(json.dumps({"x": random.uniform(0, 100), "y": random.uniform(0, 100), "active": True}))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(viewer(i) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    # Para los WebSockets el "rps" es frames entregados por segundo y p50/p99 el intervalo entre frames
+    return {
+        "requests": frames,
+        "errors": 0,
+        "rps": round(frames / elapsed, 1),
+        "p50_ms": round(percentile(gaps, 50), 2),
+        "p99_ms": round(percentile(gaps, 99), 2),
+    }
+
+
+async def run_inprocess(scenarios, only) -> dict:
+    import main
+    from fake_backends import install
+
+    fakes = install(main)
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://suite", timeout=120) as client:
+            for name, count, concurrency, factory in scenarios:
+                if only and name not in only:
+                    continue
+                result = await run_http(client, count, concurrency, factory)
+                result["rss_mb"], result["peak_rss_mb"] = (round(v, 1) for v in rss_mb(os.getpid()))
+                results[name] = result
+                report(name, result)
+    fakes["smtp"].stop()
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(scenarios, only, ws_clients: int, ws_seconds: float) -> dict:
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([BACKEND_DIR, BENCH_DIR]))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "suite_app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    results = {}
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+            deadline = time.time() + 30
+            while True:
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    if time.time() > deadline:
+                        raise RuntimeError("uvicorn no respondió a tiempo")
+                    await asyncio.sleep(0.1)
+            for name, count, concurrency, factory in scenarios:
+                if only and name not in only:
+                    continue
+                result = await run_http(client, count, concurrency, factory)
+                result["rss_mb"], result["peak_rss_mb"] = (round(v, 1) for v in rss_mb(process.pid))
+                results[name] = result
+                report(name, result)
+        if not only or "divine-flow-ws" in only:
+            result = await run_divine_flow(port, ws_clients, max(1, ws_clients // 10), ws_seconds)
+            result["rss_mb"], result["peak_rss_mb"] = (round(v, 1) for v in rss_mb(process.pid))
+            results["divine-flow-ws"] = result
+            report("divine-flow-ws", result)
+    finally:
+        process.terminate()
+        process.wait(timeout=20)
+    return results
+
+
+def report(name: str, result: dict) -> None:
+    print(
+        f"{name:>22} {result['requests']:>8} {result['errors']:>6} {result['rps']:>10.1f} "
+        f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['rss_mb']:>8.1f} {result['peak_rss_mb']:>9.1f}"
+    )
+
+
+def median_results(runs: list) -> dict:
+    """Mediana métrica a métrica de varias ejecuciones (amortigua una ejecución con suerte o con ruido)."""
+    merged = {}
+    for name in runs[0]:
+        samples = [run[name] for run in runs if name in run]
+        merged[name] = {key: float(np.median([sample[key] for sample in samples])) for key in samples[0]}
+        for key in ("requests", "errors"):
+            merged[name][key] = int(merged[name][key])
+    return merged
+
+
+def compare(results: dict, baseline: dict, tolerance: float, p99_tolerance: float, slack_ms: float) -> list:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {result['rps']} < {base['rps']} (-{tolerance:.0%})")
+        # La cola de latencia es ruidosa: tolerancia propia más un margen absoluto para los p99 de pocos ms.
+        # Con menos de MIN_P99_SAMPLES peticiones el p99 es casi el máximo; se compara la mediana.
+        key = "p99_ms" if result["requests"] >= MIN_P99_SAMPLES else "p50_ms"
+        if result[key] > base[key] * (1 + p99_tolerance) + slack_ms:
+            regressions.append(
+                f"{name}: {key[:3]} {result[key]} ms > {base[key]} ms (+{p99_tolerance:.0%} +{slack_ms:g} ms)"
+            )
+        if result["rss_mb"] > base["rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: RSS {result['rss_mb']} MB > {base['rss_mb']} MB (+{tolerance:.0%})")
+        if result["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {result['errors']} errores (baseline {base.get('errors', 0)})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn", "all"], default="all")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplica el número de peticiones")
+    parser.add_argument("--only", nargs="+", help="escenarios a ejecutar")
+    parser.add_argument("--ws-clients", type=int, default=100)
+    parser.add_argument("--ws-seconds", type=float, default=5.0)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="caída de rps / subida de RSS admitida")
+    parser.add_argument("--p99-tolerance", type=float, default=0.5, help="subida relativa de p99 admitida")
+    parser.add_argument("--p99-slack-ms", type=float, default=5.0, help="margen absoluto de p99")
+    parser.add_argument("--runs", type=int, default=1, help="ejecuciones por modo; se usa la mediana")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    scenarios = build_scenarios(args.scale)
+    modes = ["inprocess", "uvicorn"] if args.mode == "all" else [args.mode]
+    failed = []
+    for mode in modes:
+        print(f"\n== {mode} ==")
+        print(f"{'escenario':>22} {'peticiones':>8} {'errores':>6} {'rps':>10} {'p50 ms':>9} {'p99 ms':>9} {'RSS MB':>8} {'pico MB':>9}")
+        runs = []
+        for _ in range(args.runs):
+            if mode == "inprocess":
+                runs.append(asyncio.run(run_inprocess(scenarios, args.only)))
+            else:
+                runs.append(asyncio.run(run_uvicorn(scenarios, args.only, args.ws_clients, args.ws_seconds)))
+        results = median_results(runs)
+        if args.runs > 1:
+            print(f"-- mediana de {args.runs} ejecuciones --")
+            for name, result in results.items():
+                report(name, result)
+
+        baseline_path = os.path.join(BASELINE_DIR, f"{mode}.json")
+        if args.save_baseline:
+            os.makedirs(BASELINE_DIR, exist_ok=True)
+            baseline = {
+                "machine": {"python": platform.python_version(), "cpus": os.cpu_count(), "platform": platform.platform()},
+                "scale": args.scale,
+                "scenarios": results,
+            }
+            with open(baseline_path, "w", encoding="utf-8") as handle:
+                json.dump(baseline, handle, indent=2, ensure_ascii=False)
+            print(f"Baseline guardado en {os.path.relpath(baseline_path, BACKEND_DIR)}")
+        elif os.path.exists(baseline_path):
+            with open(baseline_path, encoding="utf-8") as handle:
+                baseline = json.load(handle)
+            if baseline.get("scale") != args.scale:
+                print(f"(baseline con --scale {baseline.get('scale')}: comparación omitida)")
+                continue
+            regressions = compare(results, baseline, args.tolerance, args.p99_tolerance, args.p99_slack_ms)
+            for line in regressions:
+                print(f"❌ REGRESIÓN {mode} {line}")
+            if not regressions:
+                print(f"✅ Sin regresiones frente a {os.path.relpath(baseline_path, BACKEND_DIR)}")
+            failed.extend(regressions)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
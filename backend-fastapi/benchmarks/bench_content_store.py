@@ -0,0 +1,109 @@
+"""Benchmark: /cosmic-hologram y /cosmic-mystery con el catálogo pre-codificado.
+
+1. Costo por acierto sin HTTP: el camino anterior (random.choice + validación
+   del response_model + jsonable_encoder + JSON) frente a elegir una entrada
+   ya serializada del ContentStore.
+2. Endpoint completo llamando a la app ASGI directamente (sin cliente HTTP,
+   que costaría más que el propio servidor): el endpoint anterior montado en
+   la app real (mismo middleware y router) frente al nuevo, y la
+   revalidación con If-None-Match.
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_content_store.py [--calls 200000] [--requests 20000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+import main  # noqa: E402
+from main import COSMIC_HOLOGRAMS, HologramResponse, content_store  # noqa: E402
+
+
+def per_hit(calls: int) -> None:
+    def previous():
+        # Lo que FastAPI hacía por petición con response_model y un dict devuelto
+        value = HologramResponse.model_validate(random.choice(COSMIC_HOLOGRAMS))
+        return json.dumps(jsonable_encoder(value), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+    def current():
+        entry = content_store.catalog("holograms").pick()
+        return entry.encoded("gzip, deflate, br")[0]
+
+    print(f"{'camino':>22} {'µs/acierto':>11}")
+    for label, fn in (("anterior", previous), ("pre-codificado", current)):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        print(f"{label:>22} {1e6 * (time.perf_counter() - start) / calls:>11.2f}")
+
+
+def mount_previous_endpoint() -> str:
+    # Mismo middleware y mismo router que la app real: sólo cambia el cuerpo del endpoint
+    @main.app.get("/bench/previous-hologram", response_model=HologramResponse)
+    async def previous_cosmic_hologram():
+        return random.choice(COSMIC_HOLOGRAMS)
+
+    return "/bench/previous-hologram"
+
+
+async def asgi_get(path: str, query: bytes = b"", headers=()) -> int:
+    """GET directo a la app ASGI (sin cliente HTTP): mide sólo el costo del lado servidor."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query, "root_path": "",
+        "headers": [(b"host", b"bench"), (b"accept-encoding", b"gzip, br")] + list(headers),
+        "client": ("127.0.0.1", 5000), "server": ("bench", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await main.app(scope, receive, send)
+    return status
+
+
+async def endpoint(requests_count: int) -> None:
+    async def run(label, path, query=b"", headers=()):
+        latencies = []
+        for _ in range(requests_count):
+            start = time.perf_counter()
+            status = await asgi_get(path, query, headers)
+            latencies.append(time.perf_counter() - start)
+            assert status in (200, 304), status
+        latencies.sort()
+        print(f"{label:>22} {requests_count / sum(latencies):>9.1f} {1e6 * latencies[len(latencies) // 2]:>8.1f} "
+              f"{1e6 * latencies[int(len(latencies) * 0.99)]:>8.1f}")
+
+    print(f"\n{'endpoint (ASGI)':>22} {'req/s':>9} {'p50 µs':>8} {'p99 µs':>8}")
+    await run("anterior", mount_previous_endpoint())
+    await run("pre-codificado", "/api/v1/cosmic-hologram")
+    etag = content_store.catalog("holograms").pick("viajera-7").etag
+    await run("semilla + 304", "/api/v1/cosmic-hologram", b"seed=viajera-7", [(b"if-none-match", etag.encode())])
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    per_hit(args.calls)
+    asyncio.run(endpoint(args.requests))
+
+
+if __name__ == "__main__":
+    main_cli()
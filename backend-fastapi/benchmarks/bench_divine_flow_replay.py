@@ -0,0 +1,156 @@
+"""Benchmark: grabación de Divine Flow y repetición sin simular.
+
+1. Grabación: se graba una sala de N partículas tick a tick (mismo append()
+   que DivineFlowRoom.tick) y se mide el costo por tick y los bytes en disco
+   frente a guardar los frames JSON o binarios tal cual.
+2. Fidelidad: los frames binarios repetidos deben ser idénticos a los que
+   emitió la sala en vivo; en JSON se informa el error máximo por campo.
+3. CPU por espectador: V clientes de una sala en vivo (simulación +
+   codificación por tick) frente a V repeticiones de la misma grabación, en
+   frío (primer paso: decodificar y codificar cada segmento) y en caché.
+   Los WebSocket son falsos (envío sin costo): se mide sólo el servidor.
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_divine_flow_replay.py [--particles 200] [--ticks 1500] [--viewers 20] [--seconds 3]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from divine_flow_recording import FrameRecorder, Recording, ReplayLibrary, recording_path  # noqa: E402
+from divine_flow_rooms import DivineFlowRoom  # noqa: E402
+from frame_protocol import BINARY_PROTOCOL, DELTA_PROTOCOL, BinaryFrameEncoder, encode_json_frame  # noqa: E402
+from quantum_engine import STATE_FIELDS, QuantumEngine  # noqa: E402
+
+
+class NullWebSocket:
+    def __init__(self):
+        self.frames = 0
+
+    async def send_text(self, data):
+        self.frames += 1
+
+    async def send_bytes(self, data):
+        self.frames += 1
+
+
+async def record(args, directory: str):
+    engine = QuantumEngine(args.particles, seed=11)
+    # Reloj simulado a 50 Hz: la grabación dura lo mismo que una sala real aunque se genere más rápido
+    clock = iter(np.arange(args.ticks + 1) / 50.0)
+    recorder = FrameRecorder(recording_path("bench", directory), "bench", args.particles, 50.0,
+                             clock=lambda: float(next(clock)))
+    encoder = BinaryFrameEncoder(args.particles)
+    live_binary, live_json, append_s = [], [], 0.0
+    json_bytes = binary_bytes = 0
+    for tick in range(1, args.ticks + 1):
+        angle = tick / 40
+        obs = (50 + 30 * np.cos(angle), 50 + 30 * np.sin(angle), tick % 90 < 45)
+        engine.step(*obs)
+        start = time.perf_counter()
+        recorder.append(engine, tick, *obs)
+        append_s += time.perf_counter() - start
+        frame = encode_json_frame(engine)
+        binary = bytes(encoder.encode(engine, tick))
+        json_bytes += len(frame.encode("utf-8"))
+        binary_bytes += len(binary)
+        if tick <= args.verify_ticks:
+            live_json.append(json.loads(frame))
+            live_binary.append(binary)
+        if tick % 50 == 0:
+            await asyncio.sleep(0)  # deja avanzar al hilo de escritura
+    await recorder.close()
+    stats = recorder.stats()
+
+    print(f"{args.ticks} ticks de {args.particles} partículas: append() {1e6 * append_s / args.ticks:.1f} µs por tick")
+    print(f"{'almacenamiento':>28} {'B/tick':>10} {'MB/hora':>10}")
+    for label, total in (("frames JSON", json_bytes), ("frames binarios (sin vx/vy)", binary_bytes),
+                         ("grabación .dfr", stats["bytes"])):
+        per_tick = total / args.ticks
+        print(f"{label:>28} {per_tick:>10.0f} {per_tick * 50 * 3600 / 1e6:>10.1f}")
+    return Recording(recorder.path), live_binary, live_json
+
+
+async def verify(recording: Recording, library: ReplayLibrary, live_binary: list, live_json: list) -> None:
+    binary, replayed = [], []
+    for idx in range(recording.segment_at(0), len(recording.segments)):
+        binary += [frame for _, frame in await library.segment_frames(recording, idx, BINARY_PROTOCOL)]
+        replayed += [json.loads(frame) for _, frame in await library.segment_frames(recording, idx, None)]
+        if len(binary) >= len(live_binary):
+            break
+    assert binary[: len(live_binary)] == live_binary, "los frames binarios repetidos no coinciden con los en vivo"
+    errors = {
+        field: max(abs(a[field] - b[field]) for frame_a, frame_b in zip(replayed, live_json)
+                   for a, b in zip(frame_a["particles"], frame_b["particles"]))
+        for field in STATE_FIELDS
+    }
+    print(f"✅ {len(live_binary)} frames binarios idénticos a los en vivo; error máximo JSON: "
+          + ", ".join(f"{field} {error:.4f}" for field, error in errors.items()))
+
+
+async def cpu_seconds(run, seconds: float) -> float:
+    start = time.process_time()
+    await run(seconds)
+    return time.process_time() - start
+
+
+async def serve_live(args, protocol, seconds: float) -> None:
+    room = DivineFlowRoom("bench", args.particles)
+    for client_id in range(args.viewers):
+        room.join(client_id, NullWebSocket(), protocol)
+    await asyncio.sleep(seconds)
+    await room.close()
+
+
+def serve_replay(args, library: ReplayLibrary, recording: Recording, protocol):
+    async def run(seconds: float) -> None:
+        tasks = [asyncio.create_task(library.stream(NullWebSocket(), recording, protocol)) for _ in range(args.viewers)]
+        await asyncio.sleep(seconds)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return run
+
+
+async def compare_cpu(args, directory: str, recording: Recording) -> None:
+    print(f"\n{args.viewers} espectadores durante {args.seconds:.0f} s (CPU del proceso, % de un núcleo)")
+    print(f"{'protocolo':>22} {'en vivo':>10} {'repetición fría':>16} {'en caché':>10}")
+    for label, protocol in (("json", None), ("binario", BINARY_PROTOCOL), ("delta", DELTA_PROTOCOL)):
+        live = await cpu_seconds(lambda s: serve_live(args, protocol, s), args.seconds)
+        library = ReplayLibrary(directory)
+        run = serve_replay(args, library, recording, protocol)
+        cold = await cpu_seconds(run, args.seconds)
+        cached = await cpu_seconds(run, args.seconds)
+        print(f"{label:>22} {100 * live / args.seconds:>9.1f}% {100 * cold / args.seconds:>15.1f}% "
+              f"{100 * cached / args.seconds:>9.1f}%")
+
+
+async def main_async(args) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        recording, live_binary, live_json = await record(args, directory)
+        await verify(recording, ReplayLibrary(directory), live_binary, live_json)
+        await compare_cpu(args, directory, recording)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--particles", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=1500, help="ticks grabados (50 por segundo)")
+    parser.add_argument("--verify-ticks", type=int, default=300, help="ticks comparados con los frames en vivo")
+    parser.add_argument("--viewers", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,212 @@
+"""Benchmark: set() síncrono en el endpoint vs escritura diferida en batches.
+
+Usa un cliente Firestore falso que duerme `--latency-ms` por cada viaje de
+ida y vuelta (y falla con probabilidad `--fail-rate`). Mientras llegan las
+peticiones de Star Trip, una sonda mide el retraso del event loop; al final
+se vacía la cola y se comprueba que el almacén falso tiene todas las sesiones.
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_firestore_writer.py [--requests 2000] [--rate 500] [--latency-ms 40]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from firestore_writer import FirestoreWriteBehind, document_ref  # noqa: E402
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeQuery:
+    """order_by / start_at / offset / limit sobre una colección, con el desempate por id de Firestore."""
+
+    def __init__(self, ref, field=None, descending=False, start=None, skip=0, count=None):
+        self.ref, self.field, self.descending = ref, field, descending
+        self.start, self.skip, self.count = start, skip, count
+
+    def _with(self, **changes):
+        params = dict(field=self.field, descending=self.descending, start=self.start, skip=self.skip, count=self.count)
+        params.update(changes)
+        return FakeQuery(self.ref, **params)
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._with(field=field, descending=direction == "DESCENDING")
+
+    def start_at(self, values):
+        return self._with(start=values[self.field])
+
+    def offset(self, skip):
+        return self._with(skip=skip)
+
+    def limit(self, count):
+        return self._with(count=count)
+
+    def stream(self):
+        docs = self.ref.documents()
+        if self.field is not None:
+            docs.sort(key=lambda doc: (doc.to_dict().get(self.field), doc.id), reverse=self.descending)
+            if self.start is not None:
+                docs = [doc for doc in docs if (doc.to_dict().get(self.field) <= self.start if self.descending
+                                                else doc.to_dict().get(self.field) >= self.start)]
+        docs = docs[self.skip:]
+        if self.count is not None:
+            docs = docs[:self.count]
+        self.ref.db.round_trip()
+        self.ref.db.reads += len(docs)
+        return iter(docs)
+
+
+class FakeRef:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+
+    def collection(self, name):
+        return FakeRef(self.db, self.path + (name,))
+
+    def document(self, name):
+        return FakeRef(self.db, self.path + (name,))
+
+    def set(self, data):
+        self.db.round_trip()
+        with self.db.lock:
+            self.db.store[self.path] = data
+
+    def get(self):
+        self.db.round_trip()
+        with self.db.lock:
+            self.db.reads += 1
+            return FakeSnapshot(self.path[-1], self.db.store.get(self.path))
+
+    def documents(self):
+        # Documentos directos de esta colección (sin subcolecciones)
+        with self.db.lock:
+            return [FakeSnapshot(path[-1], data) for path, data in self.db.store.items()
+                    if len(path) == len(self.path) + 1 and path[:-1] == self.path]
+
+    def stream(self):
+        return FakeQuery(self).stream()
+
+    def order_by(self, field, direction="ASCENDING"):
+        return FakeQuery(self).order_by(field, direction)
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.ops = []
+
+    def set(self, ref, data):
+        self.ops.append((ref.path, data))
+
+    def commit(self):
+        self.db.round_trip()
+        with self.db.lock:
+            self.db.store.update(self.ops)
+            self.db.commits += 1
+
+
+class FakeFirestore:
+    """Cliente falso en memoria: latencia fija por viaje, fallos inyectados y lecturas contadas."""
+
+    def __init__(self, latency_s: float, fail_rate: float = 0.0):
+        self.latency_s = latency_s
+        self.fail_rate = fail_rate
+        self.store = {}
+        self.commits = 0
+        self.reads = 0
+        self.lock = threading.Lock()
+
+    def round_trip(self):
+        time.sleep(self.latency_s)
+        if random.random() < self.fail_rate:
+            raise ConnectionError("fallo inyectado")
+
+    def collection(self, name):
+        return FakeRef(self, (name,))
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+async def loop_lag_probe(samples, stop, interval=0.005):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def run(mode: str, args) -> None:
+    db = FakeFirestore(args.latency_ms / 1000, args.fail_rate if mode == "write-behind" else 0.0)
+    writer = FirestoreWriteBehind(lambda: db, flush_interval=args.flush_ms / 1000, base_backoff=0.05)
+    writer.start()
+    lag, handler_ms, stop = [], [], asyncio.Event()
+    probe = asyncio.create_task(loop_lag_probe(lag, stop))
+
+    async def handler(idx):
+        start = time.perf_counter()
+        path = ("star_trip_results", f"user-{idx % 100}", "sessions", f"s-{idx}")
+        data = {"timestamp": int(time.time()), "score": 95.0, "mode": "Focus"}
+        if mode == "inline":
+            document_ref(db, path).set(data)
+        else:
+            writer.enqueue(path, data)
+        handler_ms.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    tasks = []
+    for idx in range(args.requests):
+        tasks.append(asyncio.create_task(handler(idx)))
+        await asyncio.sleep(1 / args.rate)
+    await asyncio.gather(*tasks)
+    served = time.perf_counter() - start
+    await writer.drain()
+    stop.set()
+    await probe
+
+    print(
+        f"{mode:>12} {served:>7.2f} {percentile(handler_ms, 50):>8.3f} {percentile(handler_ms, 99):>8.3f} "
+        f"{statistics.median(lag):>8.2f} {percentile(lag, 99):>8.2f} {max(lag):>8.1f} "
+        f"{len(db.store):>7} {db.commits:>7} {writer.retries:>6}"
+    )
+    assert len(db.store) == args.requests, "faltan sesiones en el almacén"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=500, help="peticiones por segundo")
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--flush-ms", type=float, default=200)
+    parser.add_argument("--fail-rate", type=float, default=0.1, help="sólo en write-behind")
+    parser.add_argument("--modes", nargs="+", default=["inline", "write-behind"])
+    args = parser.parse_args()
+
+    print(f"{'modo':>12} {'servido':>7} {'p50 ms':>8} {'p99 ms':>8} {'lag p50':>8} {'lag p99':>8} {'lag max':>8} {'docs':>7} {'commits':>7} {'reint':>6}")
+    for mode in args.modes:
+        asyncio.run(run(mode, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Benchmark: ancho de banda y CPU de los frames JSON vs binario (completo y delta).
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_frame_protocol.py [--counts 200 5000 50000] [--ticks 100]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_protocol import BinaryFrameEncoder, encode_json_frame  # noqa: E402
+from quantum_engine import QuantumEngine  # noqa: E402
+
+
+def run(count: int, ticks: int, encode) -> tuple:
+    """Devuelve (bytes promedio por frame, µs promedio de codificación)."""
+    engine = QuantumEngine(count, seed=3)
+    total_bytes = 0
+    total_time = 0.0
+    for tick in range(ticks):
+        # Observador en reposo que orbita lentamente: movimiento típico de la vista
+        engine.step(50 + 20 * math.cos(tick * 0.02), 50 + 20 * math.sin(tick * 0.02), False)
+        start = time.perf_counter()
+        frame = encode(engine, tick)
+        total_time += time.perf_counter() - start
+        total_bytes += len(frame.encode() if isinstance(frame, str) else frame)
+    return total_bytes / ticks, total_time / ticks * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", type=int, nargs="+", default=[200, 5000, 50000])
+    parser.add_argument("--ticks", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'particulas':>10} {'formato':>8} {'bytes/frame':>12} {'KB/s @50Hz':>11} {'µs/frame':>10}")
+    for count in args.counts:
+        encoders = {
+            "json": lambda engine, tick: encode_json_frame(engine),
+            "binario": lambda engine, tick, enc=BinaryFrameEncoder(count): bytes(enc.encode(engine, tick)),
+            "delta": lambda engine, tick, enc=BinaryFrameEncoder(count, delta=True): bytes(enc.encode(engine, tick)),
+        }
+        for name, encode in encoders.items():
+            size, micros = run(count, args.ticks, encode)
+            print(f"{count:>10} {name:>8} {size:>12.0f} {size * 50 / 1024:>11.1f} {micros:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
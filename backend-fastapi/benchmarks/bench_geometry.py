@@ -0,0 +1,171 @@
+"""Microbenchmark y verificación de paridad de la geometría vectorizada.
+
+Compara los generadores NumPy de cosmic_geometry contra copias literales de
+los generadores escalares originales (math.sin/math.cos por punto) sobre
+todas las combinaciones de tipo, nodos y un barrido de frecuencias. Cualquier
+diferencia termina con código 1 (tests/test_geometry_parity.py corre la misma
+comparación con pytest).
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_geometry.py [--batch 500] [--repeat 200]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cosmic_geometry  # noqa: E402
+
+
+# --- Generadores escalares originales (referencia, sin modificaciones) ---
+
+def legacy_sacred_geometry(frequency: float, nodes_count: int) -> list:
+    points = []
+    center_x, center_y = 150, 150
+    phi = (1 + math.sqrt(5)) / 2  # Proporción Áurea para escalado armónico
+    
+    # Dividimos los nodos en 2 órbitas concéntricas perfectas (Efecto Merkaba / Matriz Sagrada)
+    layers = [0.55, 1.0] # Órbita interna y órbita externa
+    nodes_per_layer = max(nodes_count // 2, 4)
+    
+    base_radius = 65 + (frequency % 35) # Radio balanceado para que no toque los bordes
+    
+    for layer_idx, scale in enumerate(layers):
+        current_radius = base_radius * scale
+        angular_offset = (layer_idx * math.pi / nodes_per_layer) * phi if layer_idx > 0 else 0
+        
+        for i in range(nodes_per_layer):
+            angle = (i * 2 * math.pi / nodes_per_layer) + angular_offset
+            r = current_radius * (1 + 0.06 * math.sin(i * phi + (frequency * 0.02)))
+            
+            x = center_x + r * math.cos(angle)
+            y = center_y + r * math.sin(angle)
+            points.append({"x": round(x, 2), "y": round(y, 2)})
+            
+    return points
+
+
+def legacy_advanced_cosmic_geometry(geometry_type: str, frequency: float, nodes_count: int) -> list:
+    points = []
+    center_x, center_y = 150, 150
+    phi = (1 + math.sqrt(5)) / 2
+    base_radius = 75 + (frequency % 30)
+
+    if geometry_type == "fractal_starburst":
+        for i in range(nodes_count):
+            angle = (i * 2 * math.pi / nodes_count)
+            # Oscilación armónica pura para pétalos estelares entrelazados de alta definición
+            r = base_radius * (1.2 if i % 2 == 0 else 0.45) * (1 + 0.12 * math.sin(i * phi + frequency))
+            x = center_x + r * math.cos(angle)
+            y = center_y + r * math.sin(angle)
+            points.append({"x": round(x, 2), "y": round(y, 2)})
+
+    elif geometry_type == "rose_of_grandi":
+        # Ecuación de Rosa Espectral Sagrada: R = cos(k * theta) + armónicos polares distribuidos
+        k = max(3, int((frequency % 5) + 3))
+        for i in range(nodes_count):
+            angle = (i * 2 * math.pi / nodes_count)
+            r = base_radius * (math.cos(k * angle) * 0.85 + 0.45)
+            x = center_x + r * math.cos(angle)
+            y = center_y + r * math.sin(angle)
+            points.append({"x": round(x, 2), "y": round(y, 2)})
+
+    elif geometry_type == "fermat_spiral":
+        # Remapeo de espirales polares de difracción multifacetada
+        for i in range(nodes_count):
+            theta = i * (2 * math.pi / nodes_count) * phi
+            r = math.sqrt(i + 1) * (base_radius / math.sqrt(nodes_count)) * 1.3
+            # Inyección de modulación armónica simétrica para evitar formas rocosas
+            r = r * (1 + 0.15 * math.sin(i * 2.0 + frequency))
+            x = center_x + r * math.cos(theta)
+            y = center_y + r * math.sin(theta)
+            points.append({"x": round(x, 2), "y": round(y, 2)})
+
+    elif geometry_type == "chaotic_glitch":
+        # Geometría de torsión fractal hipercompleja basada en interferencia cuántica
+        for i in range(nodes_count):
+            angle = (i * 2 * math.pi / nodes_count) + (math.cos(frequency + i) * 0.25)
+            r = base_radius * (0.55 + 0.65 * math.cos(i * phi + (frequency * 0.05)))
+            x = center_x + r * math.cos(angle)
+            y = center_y + r * math.sin(angle)
+            points.append({"x": round(x, 2), "y": round(y, 2)})
+
+    elif geometry_type == "merkaba_matrix":
+        # Solución al Bug de Caída: Ejecución de matriz estelar de doble órbita densa con entrelazado áureo
+        layers = [0.45, 0.75, 1.1]  # Triple anillo de difracción cuántica para el patrón por defecto
+        nodes_per_layer = max(nodes_count // len(layers), 4)
+        for l_idx, scale in enumerate(layers):
+            current_radius = base_radius * scale
+            offset = (l_idx * math.pi / nodes_per_layer) * phi
+            for i in range(nodes_per_layer):
+                angle = (i * 2 * math.pi / nodes_per_layer) + offset
+                r = current_radius * (1 + 0.08 * math.cos(i * phi + frequency))
+                x = center_x + r * math.cos(angle)
+                y = center_y + r * math.sin(angle)
+                points.append({"x": round(x, 2), "y": round(y, 2)})
+    else:
+        return legacy_sacred_geometry(frequency, nodes_count)
+
+    return points
+
+
+def sample_frequencies():
+    # Frecuencias reales del endpoint: 432 + sumas de medias/enteras del diccionario, y hashes enteros
+    for step in range(0, 6000):
+        yield 432 + step * 0.5
+    for value in range(432, 963):
+        yield value
+
+
+def check_parity() -> tuple:
+    """(mandalas comparadas, diferencias); el primer caso distinto se imprime para depurar."""
+    checked = mismatches = 0
+    for geometry_type in cosmic_geometry.GEOMETRY_TYPES + ("unknown",):
+        for nodes in range(12, 37):
+            freqs = list(sample_frequencies())
+            batch = cosmic_geometry.generate_geometry_batch(geometry_type, freqs, nodes)
+            for freq, points in zip(freqs, batch):
+                checked += 1
+                if points != legacy_advanced_cosmic_geometry(geometry_type, freq, nodes):
+                    if not mismatches:
+                        print(f"❌ Primera diferencia: {geometry_type}, frecuencia {freq}, {nodes} nodos")
+                    mismatches += 1
+    return checked, mismatches
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--skip-parity", action="store_true")
+    args = parser.parse_args()
+
+    if not args.skip_parity:
+        checked, mismatches = check_parity()
+        print(f"Paridad: {checked} mandalas comparadas, {mismatches} diferencias")
+        if mismatches:
+            sys.exit(1)
+
+    freqs = [432 + i * 1.5 for i in range(args.batch)]
+    print(f"{'tipo':>18} {'escalar µs':>11} {'numpy µs':>9} {'lote escalar ms':>16} {'lote numpy ms':>14}")
+    for geometry_type in cosmic_geometry.GEOMETRY_TYPES:
+        single_legacy = timed(lambda: legacy_advanced_cosmic_geometry(geometry_type, 741.5, 36), args.repeat)
+        single_numpy = timed(lambda: cosmic_geometry.generate_advanced_cosmic_geometry(geometry_type, 741.5, 36), args.repeat)
+        batch_legacy = timed(lambda: [legacy_advanced_cosmic_geometry(geometry_type, f, 36) for f in freqs], 5) / 1000
+        batch_numpy = timed(lambda: cosmic_geometry.generate_geometry_batch(geometry_type, freqs, 36), 5) / 1000
+        print(f"{geometry_type:>18} {single_legacy:>11.1f} {single_numpy:>9.1f} {batch_legacy:>16.2f} {batch_numpy:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
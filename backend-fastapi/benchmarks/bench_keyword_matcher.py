@@ -0,0 +1,98 @@
+"""Benchmark: escaneo por subcadena (`word in text`) vs autómata Aho-Corasick.
+
+Mide el costo por texto con el léxico original y con léxicos sintéticos de
+miles de términos, para textos cortos y largos, y verifica que ambos métodos
+encuentran exactamente las mismas palabras.
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_keyword_matcher.py [--sizes 0 1000 5000] [--lengths 200 10000]
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import VIBE_PRECEDENCE, CosmicLexicon  # noqa: E402
+
+BASE_VIBRATIONAL = {
+    "miedo": {"freq": 174, "polaridad": -1, "elemento": "tierra"},
+    "magia": {"freq": 369, "polaridad": -1, "elemento": "eter"},
+    "caos": {"freq": 396, "polaridad": -1, "elemento": "fuego"},
+    "bloqueo": {"freq": 417, "polaridad": -1, "elemento": "agua"},
+    "amor": {"freq": 528, "polaridad": 1, "elemento": "éter"},
+    "abundancia": {"freq": 639, "polaridad": 1, "elemento": "aire"},
+    "creacion": {"freq": 741, "polaridad": 1, "elemento": "fuego"},
+    "conciencia": {"freq": 852, "polaridad": 1, "elemento": "éter"},
+    "iluminacion": {"freq": 963, "polaridad": 1, "elemento": "éter"},
+}
+BASE_VIBES = {
+    "DARK_EMOTION": ["dolor", "ira", "miedo", "muerte", "tristeza", "odio", "caos", "sufrimiento", "oscuridad", "bloqueo", "pain"],
+    "FUN_EMOTION": ["joyboy", "musica", "baile", "risa", "fiesta", "alegria", "ritmo", "flow", "rap", "fuego", "magia"],
+    "HARMONIC_LIGHT": ["amor", "paz", "luz", "iluminacion", "conciencia", "abundancia", "divino", "esencia", "creacion", "dios"],
+    "CHAOTIC_VOID": ["vacio", "nada", "abismo", "quantum", "singularidad", "entropia"],
+}
+
+
+def synthetic_lexicon(extra_terms: int, rng: random.Random) -> CosmicLexicon:
+    vibrational = dict(BASE_VIBRATIONAL)
+    vibes = {category: list(words) for category, words in BASE_VIBES.items()}
+    for n in range(extra_terms):
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10)))
+        if n % 2:
+            vibrational[word] = {"freq": 400 + n % 500, "polaridad": 1, "elemento": "aire"}
+        else:
+            vibes[VIBE_PRECEDENCE[n % len(VIBE_PRECEDENCE)]].append(word)
+    return CosmicLexicon(vibrational, vibes)
+
+
+def naive_scan(lexicon: CosmicLexicon, text_lower: str) -> set:
+    """Equivalente al código original: un `in` por palabra del diccionario y de cada lista."""
+    hits = {word for word in lexicon.vibrational if word in text_lower}
+    for category in VIBE_PRECEDENCE:
+        hits.update(word for word in lexicon.vibes[category] if word in text_lower)
+    return hits
+
+
+def sample_text(length: int, lexicon: CosmicLexicon, rng: random.Random) -> str:
+    vocabulary = list(lexicon.automaton.patterns)
+    filler = ["el", "cosmos", "respira", "entre", "las", "estrellas", "y", "la", "mente", "vibra"]
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(rng.choice(vocabulary) if rng.random() < 0.05 else rng.choice(filler))
+    return " ".join(words)[:length]
+
+
+def per_call_us(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 1000, 5000])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[200, 10000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(33)
+    print(f"{'términos':>9} {'texto':>7} {'in-scan µs':>11} {'autómata µs':>12} {'iguales':>8}")
+    for extra in args.sizes:
+        lexicon = synthetic_lexicon(extra, rng)
+        terms = len(lexicon.automaton.patterns)
+        for length in args.lengths:
+            text = sample_text(length, lexicon, rng)
+            same = naive_scan(lexicon, text) == lexicon.scan(text)
+            naive = per_call_us(lambda: naive_scan(lexicon, text), args.repeat)
+            automaton = per_call_us(lambda: lexicon.scan(text), args.repeat)
+            print(f"{terms:>9} {length:>7} {naive:>11.1f} {automaton:>12.1f} {str(same):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Benchmark: SMTP por mensaje (conexión + login cada vez) vs cola con pool y spool.
+
+Levanta un servidor SMTP de prueba local (TCP plano) que simula el costo del
+handshake TLS + login con `--handshake-ms` y, opcionalmente, responde 451
+(error transitorio) a uno de cada `--fail-every` mensajes. Mide la latencia
+que ve el endpoint, el tiempo hasta entregar todo y cuántas conexiones se
+abrieron. Después comprueba que un spool con mensajes pendientes (servidor
+caído) se entrega completo al "reiniciar" la cola. Las mismas garantías
+(entrega, reintento y recuperación del spool) se verifican con aserciones en
+tests/test_mail_queue.py.
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_mail_queue.py [--messages 200] [--handshake-ms 150]
+"""
+
+import argparse
+import asyncio
+import os
+import smtplib
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mail_queue import MailQueue, SMTPConnectionPool  # noqa: E402
+
+RAW_MESSAGE = "Subject: NUEVA MISION\r\n\r\n" + "Transmision de datos cosmicos.\r\n" * 20
+
+
+class StandInSMTPServer:
+    """Servidor SMTP mínimo (EHLO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT) en un hilo propio."""
+
+    def __init__(self, handshake_s: float, fail_every: int = 0):
+        self.handshake_s = handshake_s
+        self.fail_every = fail_every
+        self.connections = 0
+        self.delivered = 0
+        self._data_count = 0
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        await asyncio.sleep(self.handshake_s / 2)
+        writer.write(b"220 stand-in ESMTP\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO"):
+                writer.write(b"250-stand-in\r\n250 AUTH PLAIN LOGIN\r\n")
+            elif command.startswith("AUTH"):
+                await asyncio.sleep(self.handshake_s / 2)
+                writer.write(b"235 2.7.0 Authentication successful\r\n")
+            elif command.startswith("DATA"):
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                while (await reader.readline()) not in (b".\r\n", b""):
+                    pass
+                self._data_count += 1
+                if self.fail_every and self._data_count % self.fail_every == 0:
+                    writer.write(b"451 4.3.0 Temporary failure\r\n")
+                else:
+                    self.delivered += 1
+                    writer.write(b"250 OK\r\n")
+            elif command.startswith("QUIT"):
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2)
+
+
+def plain_connect(host, port):
+    return smtplib.SMTP(host, port, timeout=10)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def per_message(server, args):
+    def send():
+        with plain_connect("127.0.0.1", server.port) as smtp:
+            smtp.login("portal", "secret")
+            smtp.sendmail("portal@cosmic", ["portal@cosmic"], RAW_MESSAGE)
+
+    latencies = []
+
+    async def request():
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(send)
+        except smtplib.SMTPException:
+            pass
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(args.messages)))
+    return latencies, time.perf_counter() - start
+
+
+async def queued(server, args, spool_dir):
+    pool = SMTPConnectionPool("127.0.0.1", server.port, "portal", "secret", size=args.pool, connect=plain_connect)
+    queue = MailQueue(pool, spool_dir, workers=args.pool, base_backoff=0.05)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.messages):
+        t0 = time.perf_counter()
+        await queue.enqueue("portal@cosmic", ["portal@cosmic"], RAW_MESSAGE)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    await queue.drain(timeout=120)
+    return latencies, time.perf_counter() - start, queue
+
+
+async def restart_check(args, spool_dir):
+    # 1) Servidor caído: todo queda en el spool tras el apagado
+    pool = SMTPConnectionPool("127.0.0.1", 9, "portal", "secret", connect=plain_connect)
+    queue = MailQueue(pool, spool_dir, workers=1, base_backoff=0.5)
+    for _ in range(25):
+        await queue.enqueue("portal@cosmic", ["portal@cosmic"], RAW_MESSAGE)
+    await queue.drain(timeout=0.5)
+    left = queue.stats()["spooled"]
+    # 2) "Reinicio" con el servidor disponible: se recupera y entrega lo pendiente
+    server = StandInSMTPServer(0.0)
+    pool = SMTPConnectionPool("127.0.0.1", server.port, "portal", "secret", connect=plain_connect)
+    queue = MailQueue(pool, spool_dir, workers=2)
+    queue.start()
+    await queue.drain(timeout=30)
+    server.stop()
+    return left, server.delivered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--handshake-ms", type=float, default=150)
+    parser.add_argument("--pool", type=int, default=2)
+    parser.add_argument("--fail-every", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'modo':>12} {'p50 ms':>9} {'p99 ms':>9} {'total s':>8} {'conexiones':>10} {'entregados':>10}")
+    server = StandInSMTPServer(args.handshake_ms / 1000, args.fail_every)
+    latencies, total = asyncio.run(per_message(server, args))
+    print(f"{'por mensaje':>12} {statistics.median(latencies):>9.2f} {percentile(latencies, 99):>9.2f} {total:>8.2f} {server.connections:>10} {server.delivered:>10}")
+    server.stop()
+
+    server = StandInSMTPServer(args.handshake_ms / 1000, args.fail_every)
+    with tempfile.TemporaryDirectory() as spool_dir:
+        latencies, total, queue = asyncio.run(queued(server, args, spool_dir))
+        print(f"{'cola + pool':>12} {statistics.median(latencies):>9.3f} {percentile(latencies, 99):>9.3f} {total:>8.2f} {server.connections:>10} {server.delivered:>10}  (reintentos: {queue.retries})")
+    server.stop()
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        left, delivered = asyncio.run(restart_check(args, spool_dir))
+        print(f"reinicio: {left} mensajes en el spool con el servidor caído -> {delivered} entregados tras reiniciar")
+
+
+if __name__ == "__main__":
+    main()
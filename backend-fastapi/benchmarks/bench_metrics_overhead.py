@@ -0,0 +1,98 @@
+"""Benchmark: costo de las métricas (observe, middleware ASGI y scrape).
+
+1) ns por `Histogram.observe` con y sin etiquetas;
+2) ns por petición de una app FastAPI mínima llamada directamente por ASGI
+   (sin red), con y sin MetricsMiddleware;
+3) tiempo de `render()` con muchas series (lo que cuesta cada scrape).
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_metrics_overhead.py [--requests 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI  # noqa: E402
+
+from metrics import MetricsMiddleware, MetricsRegistry  # noqa: E402
+
+
+def bench_observe(n: int) -> None:
+    registry = MetricsRegistry()
+    plain = registry.histogram("plain_seconds", "sin etiquetas")
+    labeled = registry.histogram("labeled_seconds", "con etiquetas", ("method", "route", "status"))
+    labels = ("POST", "/api/v1/cosmic-architect/transmute", "200")
+    start = time.perf_counter()
+    for i in range(n):
+        plain.observe(0.0042)
+    plain_ns = (time.perf_counter() - start) / n * 1e9
+    start = time.perf_counter()
+    for i in range(n):
+        labeled.observe(0.0042, labels)
+    labeled_ns = (time.perf_counter() - start) / n * 1e9
+    print(f"observe sin etiquetas: {plain_ns:8.0f} ns   con etiquetas: {labeled_ns:8.0f} ns")
+
+
+def build_app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware, registry=MetricsRegistry())
+    return app
+
+
+async def drive(app, n: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/api/v1/items/7", "raw_path": b"/api/v1/items/7", "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def bench_render(routes: int) -> None:
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "latencia", ("method", "route", "status"))
+    for i in range(routes):
+        for status in ("200", "404", "500"):
+            latency.observe(0.01, ("GET", f"/api/v1/route/{i}", status))
+    start = time.perf_counter()
+    body = registry.render()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"render con {routes * 3} series de histograma: {elapsed:6.2f} ms ({len(body) / 1024:.0f} KB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    bench_observe(1_000_000)
+    base = asyncio.run(drive(build_app(False), args.requests))
+    instrumented = asyncio.run(drive(build_app(True), args.requests))
+    print(f"petición ASGI sin métricas: {base:7.1f} µs   con métricas: {instrumented:7.1f} µs   (+{instrumented - base:.1f} µs)")
+    bench_render(50)
+
+
+if __name__ == "__main__":
+    main()
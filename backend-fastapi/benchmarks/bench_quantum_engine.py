@@ -0,0 +1,91 @@
+"""Benchmark: ticks por segundo del motor vectorizado vs el bucle original de dicts.
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_quantum_engine.py [--counts 200 5000 50000] [--seconds 1.0]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quantum_engine import QuantumEngine  # noqa: E402
+
+
+def legacy_particles(engine: QuantumEngine) -> list:
+    """Copia el estado del motor vectorizado al formato original (lista de dicts)."""
+    return [{k: float(v) if k != "id" else v for k, v in p.items()} for p in engine.particles]
+
+
+def legacy_step(particles: list, obs_x: float, obs_y: float, is_active: bool) -> None:
+    """Bucle original de websocket_divine_flow, sin modificaciones."""
+    for p in particles:
+        dx = obs_x - p["x"]
+        dy = obs_y - p["y"]
+        dist = math.sqrt(dx**2 + dy**2) + 0.1
+
+        force = (4.5 if is_active else 0.3) / dist
+        p["vx"] += (dx / dist) * force
+        p["vy"] += (dy / dist) * force
+
+        p["x"] += p["vx"]
+        p["y"] += p["vy"]
+
+        p["vx"] *= 0.94
+        p["vy"] *= 0.94
+
+        if p["x"] < 0 or p["x"] > 100: p["vx"] *= -1
+        if p["y"] < 0 or p["y"] > 100: p["vy"] *= -1
+
+
+def observer_path(tick: int):
+    return 50 + 30 * math.cos(tick * 0.05), 50 + 30 * math.sin(tick * 0.05), tick % 40 < 20
+
+
+def check_parity(count: int = 500, ticks: int = 50, dtype=np.float64) -> float:
+    engine = QuantumEngine(count, seed=7, dtype=dtype)
+    particles = legacy_particles(engine)
+    for t in range(ticks):
+        obs_x, obs_y, active = observer_path(t)
+        engine.step(obs_x, obs_y, active)
+        legacy_step(particles, obs_x, obs_y, active)
+    ref = np.array([[p["x"], p["y"]] for p in particles])
+    got = np.stack([engine.x, engine.y], axis=1).astype(np.float64)
+    return float(np.max(np.abs(ref - got)))
+
+
+def ticks_per_second(step, seconds: float) -> float:
+    ticks = 0
+    start = time.perf_counter()
+    while True:
+        step(*observer_path(ticks))
+        ticks += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return ticks / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", type=int, nargs="+", default=[200, 1000, 10000, 50000])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"Paridad float64 (max |Δpos| tras 50 ticks): {check_parity():.2e}")
+    print(f"Paridad float32 (max |Δpos| tras 1 tick):   {check_parity(ticks=1, dtype=np.float32):.2e}")
+    print(f"{'particulas':>10} {'dict ticks/s':>14} {'numpy ticks/s':>14} {'speedup':>8}")
+    for count in args.counts:
+        engine = QuantumEngine(count, seed=1)
+        particles = legacy_particles(engine)
+        legacy = ticks_per_second(lambda x, y, a: legacy_step(particles, x, y, a), args.seconds)
+        vectorized = ticks_per_second(engine.step, args.seconds)
+        print(f"{count:>10} {legacy:>14.1f} {vectorized:>14.1f} {vectorized / legacy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
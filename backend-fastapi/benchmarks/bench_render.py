@@ -0,0 +1,119 @@
+"""Benchmark: rasterizado de mandalas y throughput de /api/v1/cosmic-architect/render.
+
+1. Render en frío por tamaño: rasterizado NumPy y codificación PNG / WebP
+   (mandalas distintas, media por imagen).
+2. Endpoint en proceso (httpx + ASGITransport) con una caché vacía en un
+   directorio temporal: primera petición de cada mandala (render), repetición
+   (acierto en memoria), acierto en disco tras vaciar la memoria, y
+   revalidación con If-None-Match (304, sin cuerpo).
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_render.py [--sizes 256 512 1024] [--mandalas 20] [--requests 2000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("RENDER_CACHE_DIR", tempfile.mkdtemp(prefix="cosmic-render-cache-"))
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from mandala_render import encode_image, render_mandala  # noqa: E402
+
+WORDS = ["amor", "miedo", "caos", "fiesta", "musica", "luz", "vacio", "abismo", "conciencia", "abundancia", "paz", "ritmo"]
+
+
+def mandala_texts(count: int) -> list:
+    return [f"{WORDS[i % len(WORDS)]} y {WORDS[(i * 7 + 3) % len(WORDS)]}, entrada {i}" for i in range(count)]
+
+
+def cold_renders(sizes, texts) -> None:
+    print(f"{'tamaño':>7} {'render ms':>10} {'PNG ms':>8} {'PNG KB':>7} {'WebP ms':>8} {'WebP KB':>8} {'img/s':>7}")
+    transmutations = [main.build_transmutation(text) for text in texts]
+    for size in sizes:
+        render_s = png_s = webp_s = 0.0
+        png_bytes = webp_bytes = 0
+        for result in transmutations:
+            xs = [p["x"] for p in result["geometry_nodes"]]
+            ys = [p["y"] for p in result["geometry_nodes"]]
+            start = time.perf_counter()
+            pixels = render_mandala(xs, ys, result["frequency_hz"], result["glow_color"], result["secondary_color"], size)
+            rendered = time.perf_counter()
+            png = encode_image(pixels, "png")
+            encoded = time.perf_counter()
+            webp = encode_image(pixels, "webp")
+            render_s += rendered - start
+            png_s += encoded - rendered
+            webp_s += time.perf_counter() - encoded
+            png_bytes += len(png)
+            webp_bytes += len(webp)
+        n = len(transmutations)
+        print(
+            f"{size:>7} {1000 * render_s / n:>10.1f} {1000 * png_s / n:>8.1f} {png_bytes / n / 1024:>7.1f} "
+            f"{1000 * webp_s / n:>8.1f} {webp_bytes / n / 1024:>8.1f} {n / (render_s + png_s):>7.1f}"
+        )
+
+
+async def endpoint_throughput(texts, size: int, requests_count: int, concurrency: int) -> None:
+    url = "/api/v1/cosmic-architect/render"
+
+    async def run(label, count, make_request):
+        latencies = []
+        queue = iter(range(count))
+
+        async def worker():
+            for idx in queue:
+                start = time.perf_counter()
+                response = await make_request(idx)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code in (200, 304), response.status_code
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        print(f"{label:>26} {count:>9} {count / elapsed:>9.1f} {p50:>8.2f} {p99:>8.2f}")
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            print(f"\n{'endpoint (' + str(size) + ' px)':>26} {'peticiones':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+
+            def get(idx, **headers):
+                return client.get(url, params={"text": texts[idx % len(texts)], "size": size}, headers=headers)
+
+            await run("render (caché vacía)", len(texts), get)
+            await run("acierto en memoria", requests_count, get)
+            main.render_cache.memory.clear()
+            await run("acierto en disco", len(texts), get)
+
+            etags = [(await get(idx)).headers["etag"] for idx in range(len(texts))]
+            await run("revalidación 304", requests_count, lambda idx: get(idx, **{"If-None-Match": etags[idx % len(texts)]}))
+            stats = main.render_cache.stats()
+            print(f"renders={stats['renders']} disk_hits={stats['disk_hits']} coalesced={stats['coalesced']} "
+                  f"avg_render_ms={stats['avg_render_ms']}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 512, 1024])
+    parser.add_argument("--mandalas", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    texts = mandala_texts(args.mandalas)
+    cold_renders(args.sizes, texts)
+    asyncio.run(endpoint_throughput(texts, 512, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,120 @@
+"""Benchmark: costo de serialización por petición, ruta a ruta.
+
+Para cada respuesta JSON caliente compara el camino anterior de FastAPI
+(revalidación con el response_model de la ruta si lo tiene, jsonable_encoder
+y json.dumps en JSONResponse; en Star Trip, además, las notas convertidas a
+listas con .tolist()) con el actual: FastJSONResponse construida
+directamente con el dict (orjson, arrays de NumPy incluidos).
+También mide las rutas que siguen devolviendo un dict y sólo ganan el
+render de default_response_class.
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_serialization.py [--seconds 1.0]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+import fast_json  # noqa: E402
+import main  # noqa: E402
+from fast_json import FastJSONResponse  # noqa: E402
+from star_trip_analysis import analyze_session  # noqa: E402
+
+WORDS = ["amor", "miedo", "caos", "fiesta", "musica", "luz", "vacio", "abismo", "conciencia", "abundancia", "paz", "ritmo"]
+
+
+def route_field(path: str, method: str = "POST"):
+    for route in main.app.routes:
+        if getattr(route, "path", None) == path and method in getattr(route, "methods", ()):
+            return route.response_field
+    raise LookupError(path)
+
+
+def star_trip_content(points: int) -> dict:
+    t = np.arange(points) / 256.0
+    samples = (10 + 4 * np.sin(2 * np.pi * 1.5 * t) + np.sin(2 * np.pi * 11 * t)).astype(np.float32)
+    result = analyze_session(samples, "Focus", 256.0)
+    return main.complete_star_trip_session("bench-user", "bench-session", "Focus", points, result, time.time())
+
+
+def as_lists(content: dict) -> dict:
+    # Lo que compose_symphony devolvía antes: listas de Python en lugar de arrays
+    symphony = dict(content["symphony_data"], pitch=content["symphony_data"]["pitch"].tolist(),
+                    duration_ms=content["symphony_data"]["duration_ms"].tolist())
+    return dict(content, symphony_data=symphony)
+
+
+def cases():
+    transmutation = main.build_transmutation("hoy siento amor y un poco de miedo, pero la música me devuelve la luz")
+    batch = {"count": 200, "results": [main.build_transmutation(f"{WORDS[i % 12]} {WORDS[(i * 5) % 12]} {i}") for i in range(200)]}
+    stream = dict(main.build_transmutation("amor " * 40), text_length=200_000)
+    star_trip = star_trip_content(100_000)
+    chunk_status = {"upload_id": "0" * 32, "session_id": "bench-session", "mode": "Focus", "next_seq": 12,
+                    "received_points": 98_304, "max_points": 76_800_000, "windows": 383, "duplicates": 0}
+
+    # (ruta, response_field de la ruta, contenido, sólo cambia el render)
+    yield "/transmute", route_field("/api/v1/cosmic-architect/transmute"), transmutation, False
+    yield "/transmute/batch (200)", route_field("/api/v1/cosmic-architect/transmute/batch"), batch, False
+    yield "/transmute/stream", route_field("/api/v1/cosmic-architect/transmute/stream"), stream, False
+    for path in ("/analyze-data", "/analyze-data/binary", "/sessions/{upload_id}/finalize"):
+        yield f"star-trip{path}", route_field(f"/api/v1/star-trip{path}"), star_trip, False
+    yield "star-trip/sessions/{id}/chunks/{seq}", \
+        route_field("/api/v1/star-trip/sessions/{upload_id}/chunks/{seq}", "PUT"), chunk_status, False
+    stats = {"responses": main.transmute_cache.stats(), "geometry": main.geometry_cache.stats(),
+             "renders": main.render_cache.stats()}
+    yield "/cache-stats (dict)", None, stats, True
+
+
+async def measure(fn, seconds: float) -> float:
+    """µs por llamada: repite `await fn()` en tandas hasta cubrir `seconds`."""
+    calls, elapsed, batch = 0, 0.0, 16
+    while elapsed < seconds:
+        start = time.perf_counter()
+        for _ in range(batch):
+            await fn()
+        elapsed += time.perf_counter() - start
+        calls += batch
+        batch *= 2
+    return 1e6 * elapsed / calls
+
+
+async def run(seconds: float) -> None:
+    print(f"codificador: {'orjson ' + fast_json.orjson.__version__ if fast_json.orjson else 'json (fallback)'}")
+    print(f"{'ruta':>40} {'bytes':>8} {'antes µs':>10} {'ahora µs':>10} {'x':>6}")
+    for label, field, content, render_only in cases():
+        listed = as_lists(content) if "symphony_data" in content else content
+
+        async def previous():
+            # fastapi.routing.get_request_handler: serialize_response + response_class(content).body
+            return JSONResponse(await serialize_response(field=field, response_content=listed)).body
+
+        async def current():
+            if render_only:
+                return FastJSONResponse(jsonable_encoder(content)).body
+            return FastJSONResponse(content).body
+
+        body = await current()
+        assert await previous() == body, label
+        before_us, after_us = await measure(previous, seconds), await measure(current, seconds)
+        print(f"{label:>40} {len(body):>8} {before_us:>10.1f} {after_us:>10.1f} {before_us / after_us:>6.1f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="tiempo de medida por camino y ruta")
+    args = parser.parse_args()
+    asyncio.run(run(args.seconds))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,70 @@
+"""Benchmark: escalado de las interacciones entre vecinos con la rejilla espacial.
+
+Compara el tick con fuerzas de vecinos (QUANTUM_MIRROR / GRAVITATIONAL_COLLAPSE)
+contra el tick base del observador, de 1k a 100k partículas, y verifica que la
+rejilla encuentra exactamente los mismos pares que la búsqueda O(N²).
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_spatial_grid.py [--counts 1000 10000 100000] [--ticks 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quantum_engine import NEIGHBOR_MODES, QuantumEngine  # noqa: E402
+
+
+def brute_force_pairs(engine: QuantumEngine) -> set:
+    dx = engine.x[:, None] - engine.x[None, :]
+    dy = engine.y[:, None] - engine.y[None, :]
+    i, j = np.nonzero(np.triu(dx * dx + dy * dy < engine.grid.radius ** 2, k=1))
+    return set(zip(i.tolist(), j.tolist()))
+
+
+def grid_pairs(engine: QuantumEngine) -> set:
+    engine.grid.build(engine.x, engine.y)
+    radius_sq = engine.grid.radius ** 2
+    found = set()
+    for i, j in engine.grid.pairs():
+        dx = engine.x[j] - engine.x[i]
+        dy = engine.y[j] - engine.y[i]
+        near = dx * dx + dy * dy < radius_sq
+        found.update(zip(np.minimum(i, j)[near].tolist(), np.maximum(i, j)[near].tolist()))
+    return found
+
+
+def ms_per_tick(engine: QuantumEngine, ticks: int) -> float:
+    engine.step()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        engine.step(30, 70, False)
+    return (time.perf_counter() - start) / ticks * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000, 30000, 100000])
+    parser.add_argument("--ticks", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = QuantumEngine(2000, seed=5)
+    expected, found = brute_force_pairs(engine), grid_pairs(engine)
+    print(f"Paridad de pares (N=2000): rejilla={len(found)} fuerza bruta={len(expected)} iguales={found == expected}")
+
+    header = f"{'particulas':>10} {'base ms':>9}" + "".join(f" {mode + ' ms':>26}" for mode in NEIGHBOR_MODES)
+    print(header + f" {'ns/particula':>13}")
+    for count in args.counts:
+        base = ms_per_tick(QuantumEngine(count, seed=1), args.ticks)
+        timings = [ms_per_tick(QuantumEngine(count, seed=1, physics_mode=mode), args.ticks) for mode in NEIGHBOR_MODES]
+        row = f"{count:>10} {base:>9.2f}" + "".join(f" {t:>26.2f}" for t in timings)
+        print(row + f" {max(timings) * 1e6 / count:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark: ingesta y análisis espectral de sesiones Star Trip de millones de puntos.
+
+Compara, por tamaño de sesión, el costo de recibir los puntos como lista JSON
+(json.loads + validación List[float] de pydantic + conversión a NumPy) frente
+al cuerpo binario float32 (np.frombuffer), y el costo del análisis (FFT por
+ventanas, bandas, pista dominante y sinfonía).
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_star_trip_analysis.py [--points 100000 1000000 4000000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List
+
+import numpy as np
+from pydantic import TypeAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from star_trip_analysis import DEFAULT_SAMPLE_RATE_HZ, analyze_session, finite_samples, samples_from_bytes  # noqa: E402
+
+FLOAT_LIST = TypeAdapter(List[float])
+
+
+def session_signal(points: int) -> np.ndarray:
+    rng = np.random.default_rng(11)
+    t = np.arange(points) / DEFAULT_SAMPLE_RATE_HZ
+    alpha = np.sin(2 * np.pi * 10 * t) * (1 + 0.5 * np.sin(2 * np.pi * t / 60))
+    return (alpha + 0.4 * rng.standard_normal(points)).astype(np.float32)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, nargs="+", default=[100_000, 1_000_000, 4_000_000])
+    parser.add_argument("--mode", default="Relax", choices=["Focus", "Relax", "Sleep"])
+    args = parser.parse_args()
+
+    print(f"{'puntos':>9} {'JSON MB':>8} {'JSON s':>8} {'bin MB':>7} {'bin s':>8} {'análisis s':>10} {'Mpts/s':>7} {'iguales':>8}")
+    for points in args.points:
+        signal = session_signal(points)
+        json_body = json.dumps({"raw_frequency_points": signal.tolist()}).encode()
+        binary_body = signal.tobytes()
+
+        def from_json(body):
+            values = FLOAT_LIST.validate_python(json.loads(body)["raw_frequency_points"])
+            return finite_samples(values)
+
+        json_samples, json_s = timed(from_json, json_body)
+        bin_samples, bin_s = timed(samples_from_bytes, binary_body)
+        result, analysis_s = timed(analyze_session, bin_samples, args.mode)
+        same = analyze_session(json_samples, args.mode) == result
+        print(
+            f"{points:>9} {len(json_body) / 2**20:>8.1f} {json_s:>8.3f} {len(binary_body) / 2**20:>7.1f} "
+            f"{bin_s:>8.5f} {analysis_s:>10.3f} {points / analysis_s / 1e6:>7.1f} {str(same):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
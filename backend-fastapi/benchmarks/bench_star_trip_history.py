@@ -0,0 +1,208 @@
+"""Benchmark: historial y estadísticas de Star Trip con agregados precalculados.
+
+Contra el Firestore en memoria de bench_firestore_writer (con latencia por
+viaje y lecturas contadas):
+
+1. Comprobación: se escriben sesiones de muchos usuarios (días salteados,
+   empates de timestamp, reescrituras de sesiones recientes) por el mismo
+   camino que complete_star_trip_session y se verifica que las estadísticas
+   coinciden con un recálculo desde cero en tres casos: agregados en memoria,
+   cargados de Firestore por un proceso nuevo y reconstruidos recorriendo las
+   sesiones (usuarios sin documento de agregados). También se recorre el
+   historial completo página a página (sin huecos ni repetidos).
+2. Costo de una visita al panel (estadísticas + primera página): recorrer la
+   subcolección entera en cada visita frente a los agregados, en frío (un
+   documento) y en caché (sin lecturas).
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_star_trip_history.py [--users 200] [--sessions 150] [--latency-ms 2]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_firestore_writer import FakeFirestore  # noqa: E402
+
+from firestore_writer import FirestoreWriteBehind, document_ref  # noqa: E402
+from star_trip_history import RESULTS_COLLECTION, StarTripHistory, session_day  # noqa: E402
+
+MODES = ("Focus", "Relax", "Sleep")
+DAY_S = 86400
+
+
+def generate_sessions(rng: random.Random, user: int, count: int, now: int) -> list:
+    """Escrituras en orden: días consecutivos con huecos, empates y alguna reescritura (con más puntos)."""
+    writes, day, recent = [], 0, []
+    start = now - (count // 2 + 10) * DAY_S
+    for idx in range(count):
+        if rng.random() < 0.15 and recent:
+            pick = rng.randrange(max(0, len(recent) - 5), len(recent))
+            session_id, data = recent[pick]
+            recent[pick] = (session_id, dict(data, score=round(min(100.0, data["score"] + rng.uniform(0, 3)), 2)))
+            writes.append(recent[pick])
+            continue
+        day += rng.choice((0, 0, 1, 1, 1, 2, 4))
+        timestamp = min(now, start + day * DAY_S + rng.randrange(0, 3600))
+        if recent and rng.random() < 0.1:
+            timestamp = recent[-1][1]["timestamp"]  # empate de timestamp
+        timestamp = max(timestamp, recent[-1][1]["timestamp"] if recent else 0)
+        data = {"timestamp": timestamp, "score": round(rng.uniform(60, 99), 2), "mode": rng.choice(MODES)}
+        session_id = f"s-{user}-{idx:05d}"
+        writes.append((session_id, data))
+        recent.append((session_id, data))
+    return writes
+
+
+def reference_stats(sessions: dict, today: int) -> dict:
+    """Lo que costaría O(sesiones) por visita: estadísticas recalculadas desde todas las sesiones."""
+    ordered = sorted(sessions.items(), key=lambda item: (item[1]["timestamp"], item[0]))
+    days = sorted({session_day(data["timestamp"]) for _, data in ordered})
+    longest = current = 0
+    for idx, day in enumerate(days):
+        current = current + 1 if idx and day == days[idx - 1] + 1 else 1
+        longest = max(longest, current)
+    modes = {}
+    for _, data in ordered:
+        modes.setdefault(data["mode"], []).append(data["score"])
+    return {
+        "sessions": len(ordered),
+        "average_score": round(sum(data["score"] for _, data in ordered) / len(ordered), 2),
+        "best_score": max(data["score"] for _, data in ordered),
+        "modes": {mode: (len(scores), round(sum(scores) / len(scores), 2), max(scores)) for mode, scores in sorted(modes.items())},
+        "streak": (current if days[-1] >= today - 1 else 0, longest),
+    }
+
+
+def comparable(stats: dict) -> dict:
+    return {
+        "sessions": stats["sessions"],
+        "average_score": stats["average_score"],
+        "best_score": stats["best"]["score"],
+        "modes": {mode: (m["sessions"], m["average_score"], m["best_score"]) for mode, m in stats["modes"].items()},
+        "streak": (stats["streak"]["current"], stats["streak"]["longest"]),
+    }
+
+
+async def walk_history(history: StarTripHistory, user_id: str, limit: int) -> list:
+    seen, cursor = [], None
+    while True:
+        page = await history.history(user_id, limit, cursor)
+        seen.extend((entry["session_id"], entry["timestamp"]) for entry in page["sessions"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+async def verify(args) -> FakeFirestore:
+    rng = random.Random(7)
+    now = int(time.time())
+    today = session_day(now)
+    db = FakeFirestore(args.latency_ms / 1000)
+    # Sin límite efectivo de cola: aquí se comprueba la exactitud, no el rechazo por saturación
+    writer = FirestoreWriteBehind(lambda: db, flush_interval=0.05, max_pending=2 * args.users * (args.sessions + 1))
+    history = StarTripHistory(lambda: db, writer)
+    writer.start()
+
+    expected = {}
+    streams = {f"user-{user}": generate_sessions(rng, user, args.sessions, now) for user in range(args.users)}
+    start = time.perf_counter()
+    for step in range(args.sessions):
+        for user_id, writes in streams.items():
+            if step < len(writes):
+                session_id, data = writes[step]
+                # Mismo camino que complete_star_trip_session
+                writer.enqueue((RESULTS_COLLECTION, user_id, "sessions", session_id), data)
+                history.record(user_id, session_id, data)
+                expected.setdefault(user_id, {})[session_id] = data
+        if step % 10 == 0:
+            await asyncio.sleep(0)
+    record_s = time.perf_counter() - start
+    await asyncio.sleep(args.latency_ms / 1000 * 4)
+    await writer.drain()
+    assert writer.rejected == 0 and writer.dropped == 0
+    total = sum(len(sessions) for sessions in expected.values())
+    print(f"{total} sesiones de {args.users} usuarios registradas en {record_s * 1000:.0f} ms "
+          f"({1e6 * record_s / total:.1f} µs por sesión, agregados incluidos); {writer.written} documentos escritos")
+
+    reference = {user_id: reference_stats(sessions, today) for user_id, sessions in expected.items()}
+    orders = {user_id: sorted(((sid, data["timestamp"]) for sid, data in sessions.items()),
+                              key=lambda item: (item[1], item[0]), reverse=True)
+              for user_id, sessions in expected.items()}
+
+    async def check(label, instance):
+        for user_id in expected:
+            assert comparable(await instance.stats(user_id)) == reference[user_id], (label, user_id)
+        for user_id in list(expected)[:20]:
+            for limit in (7, 20, 100):
+                assert await walk_history(instance, user_id, limit) == orders[user_id], (label, user_id, limit)
+        print(f"✅ {label}: estadísticas e historial correctos")
+
+    await check("agregados en memoria", history)
+    await check("agregados cargados de Firestore", StarTripHistory(lambda: db, writer))
+    for user_id in expected:
+        del db.store[(RESULTS_COLLECTION, user_id)]
+    rebuilt = StarTripHistory(lambda: db, writer)
+    writer.start()
+    await check("agregados reconstruidos desde las sesiones", rebuilt)
+    await writer.drain()
+    assert all((RESULTS_COLLECTION, user_id) in db.store for user_id in expected), "la reconstrucción no se persistió"
+    return db
+
+
+async def dashboard_cost(db: FakeFirestore, args) -> None:
+    users = [f"user-{user}" for user in range(args.users)]
+
+    def full_scan(user_id):
+        # El enfoque obvio: recorrer la subcolección entera en cada visita
+        docs = document_ref(db, (RESULTS_COLLECTION, user_id, "sessions")).stream()
+        sessions = {doc.id: doc.to_dict() for doc in docs}
+        stats = reference_stats(sessions, session_day(time.time()))
+        page = sorted(sessions.items(), key=lambda item: (item[1]["timestamp"], item[0]), reverse=True)[:20]
+        return stats, page
+
+    async def run(label, visit):
+        reads_before = db.reads
+        start = time.perf_counter()
+        for user_id in users:
+            await visit(user_id)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>24} {(db.reads - reads_before) / len(users):>12.1f} {1000 * elapsed / len(users):>10.2f}")
+
+    async def scan_visit(user_id):
+        await asyncio.to_thread(full_scan, user_id)
+
+    history = StarTripHistory(lambda: db, FirestoreWriteBehind(lambda: db))
+
+    async def aggregate_visit(user_id):
+        await history.stats(user_id)
+        await history.history(user_id, 20)
+
+    print(f"\n{'visita al panel':>24} {'lecturas':>12} {'ms/visita':>10}")
+    await run("subcolección completa", scan_visit)
+    await run("agregados (en frío)", aggregate_visit)
+    await run("agregados (en caché)", aggregate_visit)
+
+
+async def main_async(args) -> None:
+    db = await verify(args)
+    await dashboard_cost(db, args)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=150, help="escrituras por usuario")
+    parser.add_argument("--latency-ms", type=float, default=2)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main_cli()
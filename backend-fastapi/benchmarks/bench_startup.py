@@ -0,0 +1,101 @@
+"""Benchmark de arranque en frío: tiempo de `import main` y hasta la primera respuesta.
+
+Cada repetición usa un proceso nuevo (como una instancia recién escalada):
+1) `import main` medido dentro del proceso, y qué módulos pesados quedaron cargados;
+2) uvicorn desde cero hasta que GET / responde 200.
+Escenarios: sin credenciales de Firebase (modo degradado) y con credenciales
+de prueba (FIREBASE_PROJECT_ID), con el calentamiento en segundo plano activo.
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_startup.py [--runs 5] [--app-dir .]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("numpy", "firebase_admin", "google.cloud.firestore", "PIL", "requests", "smtplib")
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({"import_s": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+SCENARIOS = {
+    "sin Firebase": {},
+    "Firebase (prueba)": {"FIREBASE_PROJECT_ID": "cosmic-benchmark"},
+}
+
+
+def scenario_env(extra: dict) -> dict:
+    env = {key: value for key, value in os.environ.items() if not key.startswith("FIREBASE_")}
+    env.update(extra)
+    return env
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(app_dir: str, env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE % (HEAVY_MODULES,)],
+        cwd=app_dir, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_first_response(app_dir: str, env: dict) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + 30
+        while time.perf_counter() < deadline:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("el servidor no respondió en 30 s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--app-dir", default=BACKEND_DIR, help="directorio con main.py (p. ej. otro checkout)")
+    args = parser.parse_args()
+
+    print(f"{'escenario':>18} {'import p50 s':>12} {'1ª resp p50 s':>13} {'1ª resp max s':>13}  módulos pesados tras import")
+    for name, extra in SCENARIOS.items():
+        env = scenario_env(extra)
+        imports = [measure_import(args.app_dir, env) for _ in range(args.runs)]
+        first = [measure_first_response(args.app_dir, env) for _ in range(args.runs)]
+        loaded = ", ".join(imports[-1]["loaded"]) or "-"
+        print(
+            f"{name:>18} {statistics.median(i['import_s'] for i in imports):>12.3f} "
+            f"{statistics.median(first):>13.3f} {max(first):>13.3f}  {loaded}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Benchmark: síntesis en streaming de la sinfonía de Star Trip.
+
+Con las sinfonías que compose_symphony produce para cada modo (timbre
+distinto), repetidas en bucle hasta `--minutes` (5 por defecto, el
+max_duration_minutes de las sesiones):
+
+1. Factor de tiempo real (segundos de audio por segundo de CPU de pared) y
+   tiempo hasta el primer bloque, consumiendo SymphonyClipCache.stream como
+   lo hace StreamingResponse.
+2. Pico de memoria (tracemalloc, incluye los buffers de NumPy): en streaming
+   frente a juntar el clip entero en memoria y frente a sintetizarlo de una
+   sola pasada vectorizada (el enfoque sin bloques).
+3. Caché de clips: una pasada de la sinfonía por el endpoint, primera
+   petición (síntesis) frente a la repetida (servida desde la LRU).
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_symphony_audio.py [--minutes 5] [--sample-rate 48000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+
+from star_trip_analysis import MODE_PROFILES, analyze_session  # noqa: E402
+from symphony_audio import SymphonyClipCache, SymphonyRenderer  # noqa: E402
+
+
+def symphony_for(mode: str) -> dict:
+    t = np.arange(60_000) / 256.0
+    samples = (10 + 4 * np.sin(2 * np.pi * 1.5 * t) + 2 * np.sin(2 * np.pi * 11 * t)
+               + np.random.default_rng(3).normal(0, 1, t.size)).astype(np.float32)
+    return analyze_session(samples, mode)["symphony"]
+
+
+def renderer_for(symphony: dict, args, loop: bool = True, minutes: float = None) -> SymphonyRenderer:
+    return SymphonyRenderer(
+        symphony["pitch"], symphony["duration_ms"], symphony["tempo_bpm"], symphony["instrument"],
+        args.sample_rate, minutes or args.minutes, loop=loop,
+    )
+
+
+async def consume(renderer: SymphonyRenderer, keep: bool) -> tuple:
+    """(segundos hasta el primer bloque, segundos totales, bytes); con `keep` se juntan como un buffer entero."""
+    cache = SymphonyClipCache(max_clip_bytes=0)
+    chunks, total = [], 0
+    start = time.perf_counter()
+    first = None
+    async for chunk in cache.stream(renderer):
+        if first is None:
+            first = time.perf_counter() - start
+        total += len(chunk)
+        if keep:
+            chunks.append(chunk)
+    if keep:
+        clip = b"".join(chunks)
+        assert len(clip) == total
+    return first, time.perf_counter() - start, total
+
+
+def traced_peak(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+async def realtime(args) -> None:
+    print(f"{args.minutes:g} min a {args.sample_rate} Hz por modo")
+    print(f"{'modo':>8} {'audio s':>9} {'render s':>9} {'x tiempo real':>14} {'1er bloque ms':>14} {'MB':>7}")
+    for mode in MODE_PROFILES:
+        renderer = renderer_for(symphony_for(mode), args)
+        first, elapsed, total = await consume(renderer, keep=False)
+        assert total == renderer.content_length
+        print(f"{mode:>8} {renderer.duration_s:>9.1f} {elapsed:>9.2f} {renderer.duration_s / elapsed:>14.1f} "
+              f"{1000 * first:>14.1f} {total / 1e6:>7.1f}")
+
+
+def memory(args) -> None:
+    renderer = renderer_for(symphony_for("Focus"), args)
+    print(f"\npico de memoria, {renderer.duration_s:.0f} s de audio ({renderer.content_length / 1e6:.1f} MB de PCM)")
+    cases = [
+        ("streaming por bloques", lambda: asyncio.run(consume(renderer, keep=False))),
+        ("bloques juntados en un buffer", lambda: asyncio.run(consume(renderer, keep=True))),
+    ]
+    if args.naive_minutes:
+        naive = renderer_for(symphony_for("Focus"), args, minutes=args.naive_minutes)
+        cases.append((f"una pasada ({args.naive_minutes:g} min)", lambda: naive.render_block(0, naive.total_samples)))
+    for label, fn in cases:
+        print(f"{label:>36} {traced_peak(fn):>9.1f} MB")
+
+
+async def cache_hits(args) -> None:
+    import main
+
+    symphony = symphony_for("Relax")
+    body = {"pitch": symphony["pitch"].tolist(), "duration_ms": symphony["duration_ms"].tolist(),
+            "tempo_bpm": symphony["tempo_bpm"], "instrument": symphony["instrument"], "sample_rate": args.sample_rate}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"\n{'endpoint (una pasada)':>36} {'ms':>9} {'bytes':>10}")
+        bodies = []
+        for label in ("síntesis (fallo de caché)", "repetida (acierto)"):
+            start = time.perf_counter()
+            response = await client.post("/api/v1/star-trip/symphony/render", json=body)
+            elapsed = time.perf_counter() - start
+            assert response.status_code == 200, response.text
+            bodies.append(response.content)
+            print(f"{label:>36} {1000 * elapsed:>9.1f} {len(response.content):>10}")
+        assert bodies[0] == bodies[1]
+    print(f"caché: {main.symphony_clips.stats()['clips']}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=5)
+    parser.add_argument("--sample-rate", type=int, default=48000)
+    parser.add_argument("--naive-minutes", type=float, default=1,
+                        help="duración de la síntesis de una sola pasada (0 la omite; usa ~1 GB por 5 min)")
+    args = parser.parse_args()
+    asyncio.run(realtime(args))
+    memory(args)
+    asyncio.run(cache_hits(args))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,90 @@
+"""Benchmark: transmutación de textos de varios MB en memoria vs en streaming.
+
+"En memoria" reproduce el análisis original (texto completo + lower() + un
+escaneo `in` por palabra + sumas de códigos); "streaming" alimenta
+TransmutationStream con trozos de 64 KB como llegarían del cuerpo HTTP.
+Reporta tiempo, MB/s y pico de memoria (tracemalloc) de cada modo.
+
+Uso (desde backend-fastapi/):
+    python benchmarks/bench_transmutation_stream.py [--sizes-mb 1 4 16]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_keyword_matcher import BASE_VIBES, BASE_VIBRATIONAL  # noqa: E402
+from keyword_matcher import VIBE_PRECEDENCE, CosmicLexicon  # noqa: E402
+from transmutation_stream import TransmutationStream  # noqa: E402
+
+CHUNK_BYTES = 64 * 1024
+JOURNAL_WORDS = (
+    "hoy sentí la energía del cosmos fluir entre mis manos mientras escribía sobre el amor "
+    "la paz y el miedo que a veces aparece en la oscuridad de la noche estrellada"
+).split()
+
+
+def journal_bytes(size_mb: float) -> bytes:
+    rng = random.Random(7)
+    target = int(size_mb * 1024 * 1024)
+    words = []
+    total = 0
+    while total < target:
+        word = rng.choice(JOURNAL_WORDS)
+        words.append(word)
+        total += len(word) + 1
+    return " ".join(words).encode("utf-8")[:target]
+
+
+def in_memory(body: bytes, lexicon: CosmicLexicon) -> tuple:
+    text = body.decode("utf-8", errors="replace")
+    text_lower = text.lower()
+    hits = {word for word in lexicon.vibrational if word in text_lower}
+    for category in VIBE_PRECEDENCE:
+        hits.update(word for word in lexicon.vibes[category] if word in text_lower)
+    lower_sum = sum(ord(char) for char in text_lower)
+    color_hash = sum(ord(c) * (idx + 1) for idx, c in enumerate(text))
+    return hits, lower_sum, color_hash
+
+
+def streaming(body: bytes, lexicon: CosmicLexicon) -> tuple:
+    stream = TransmutationStream(lexicon)
+    view = memoryview(body)
+    for start in range(0, len(body), CHUNK_BYTES):
+        stream.feed(bytes(view[start:start + CHUNK_BYTES]))
+    stream.finish()
+    return stream.hits, stream.lower_sum, stream.color_hash
+
+
+def measure(fn, body: bytes, lexicon: CosmicLexicon) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(body, lexicon)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    lexicon = CosmicLexicon(BASE_VIBRATIONAL, BASE_VIBES)
+    print(f"{'MB':>5} {'modo':>10} {'segundos':>9} {'MB/s':>7} {'pico MB':>8} {'iguales':>8}")
+    for size in args.sizes_mb:
+        body = journal_bytes(size)
+        reference, elapsed, peak = measure(in_memory, body, lexicon)
+        print(f"{size:>5g} {'memoria':>10} {elapsed:>9.2f} {size / elapsed:>7.1f} {peak / 2**20:>8.1f} {'-':>8}")
+        result, elapsed, peak = measure(streaming, body, lexicon)
+        print(f"{size:>5g} {'streaming':>10} {elapsed:>9.2f} {size / elapsed:>7.1f} {peak / 2**20:>8.1f} {str(result == reference):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Dobles locales de Firestore y SMTP para los benchmarks de la API.
+
+`install(main)` sustituye, antes del arranque (lifespan), la cola write-behind
+de Star Trip (y su historial) por una con el FakeFirestore de bench_firestore_writer y la cola
+de correo por una que entrega a un StandInSMTPServer local, de modo que los
+endpoints recorren su camino real sin salir de la máquina.
+
+Por defecto también desactiva el control de admisión: la suite mide capacidad
+y todas sus peticiones salen de una sola IP (load_test_admission.py lo deja activo).
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_firestore_writer import FakeFirestore  # noqa: E402
+from bench_mail_queue import StandInSMTPServer, plain_connect  # noqa: E402
+
+
+def install(main, firestore_latency_ms: float = 20.0, smtp_handshake_ms: float = 50.0, admission: bool = False) -> dict:
+    from firestore_writer import FirestoreWriteBehind
+    from mail_queue import MailQueue, SMTPConnectionPool
+    from star_trip_history import StarTripHistory
+
+    db = FakeFirestore(firestore_latency_ms / 1000)
+    main.star_trip_writer = FirestoreWriteBehind(lambda: db)
+    main.star_trip_history = StarTripHistory(lambda: db, main.star_trip_writer)
+
+    smtp_server = StandInSMTPServer(smtp_handshake_ms / 1000)
+    os.environ.setdefault("ZOHO_USER", "portal@cosmic.local")
+    os.environ.setdefault("ZOHO_PASSWORD", "benchmark")
+    spool_dir = tempfile.mkdtemp(prefix="cosmic-mail-spool-")
+    pool = SMTPConnectionPool("127.0.0.1", smtp_server.port, "portal", "benchmark", connect=plain_connect)
+    main.mail_queue = MailQueue(pool, spool_dir)
+    main.admission.enabled = admission
+    return {"firestore": db, "smtp": smtp_server, "spool_dir": spool_dir}
@@ -0,0 +1,233 @@
+"""Prueba de carga del control de admisión: tráfico legítimo bajo una inundación.
+
+Levanta la app con uvicorn (suite_app: Firestore y SMTP locales) y simula,
+con X-Forwarded-For (ADMISSION_TRUST_PROXY=1: la entrada de la derecha), muchos clientes distintos:
+
+- Legítimos: --users clientes, cada uno con una transmutación y un holograma
+  cada ~100 ms. Se mide su p50/p99, peticiones/s y errores.
+- Ataque (desde --attackers IPs, en un proceso aparte con menos prioridad y
+  peticiones pre-codificadas sobre sockets crudos para que el generador no le
+  robe la CPU al servidor): formulario de contacto en bucle, sesiones de Star
+  Trip de 100k puntos en JSON a alta concurrencia, cuerpos de 20 MB y
+  --ws-flood WebSockets de Divine Flow, cada uno en una sala nueva (un bucle
+  de 50 Hz por sala). --attacks elige un subconjunto.
+
+Tres fases, cada una con un servidor nuevo: sin ataque, ataque sin control
+de admisión y ataque con él. Con admisión la latencia de los legítimos debe
+volver cerca de la fase sin ataque y el ataque recibir 429/503/413 rápidos.
+La columna CPU es la del proceso del servidor durante la fase.
+
+Uso (desde backend-fastapi/):
+    python benchmarks/load_test_admission.py [--seconds 10] [--users 20] [--attackers 3] [--ws-flood 60] [--attacks contact,ws]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+import numpy as np
+import websockets
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from api_suite import SENTENCES, free_port, percentile, session_points  # noqa: E402
+
+ATTACKS = ("contact", "star-trip", "oversized", "ws")
+
+
+def start_server(port: int, admission: bool) -> subprocess.Popen:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([BACKEND_DIR, BENCH_DIR]),
+               SUITE_ADMISSION="1" if admission else "0", ADMISSION_TRUST_PROXY="1")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "suite_app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("uvicorn no respondió a tiempo")
+
+
+def cpu_seconds(pid: int) -> float:
+    """CPU de usuario + sistema consumida por el proceso, de /proc."""
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def legit_user(client: httpx.AsyncClient, user: int, stop_at: float, results: dict) -> None:
+    headers = {"X-Forwarded-For": f"10.0.{user // 250}.{user % 250 + 1}"}
+    idx = user
+    while time.perf_counter() < stop_at:
+        idx += 1
+        for method, url, kwargs in (
+            ("POST", "/api/v1/cosmic-architect/transmute", {"json": {"text": SENTENCES[idx % len(SENTENCES)] + f" {idx % 40}"}}),
+            ("GET", "/api/v1/cosmic-hologram", {}),
+        ):
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, headers=headers, **kwargs)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 599
+            results["latencies"].append((time.perf_counter() - start) * 1000)
+            results["status"][status] += 1
+        await asyncio.sleep(0.1)
+
+
+def raw_request(path: str, ip: str, body: bytes, content_type: str = "application/json") -> bytes:
+    head = (f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nX-Forwarded-For: {ip}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n")
+    return head.encode() + body
+
+
+async def http_flood(port: int, request: bytes, stop_at: float, results: Counter) -> None:
+    """Reenvía la misma petición pre-codificada en bucle sobre un socket crudo: el atacante gasta poca CPU."""
+    reader = writer = None
+    while time.perf_counter() < stop_at:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            headers = head.lower()
+            length = int(headers.split(b"content-length: ", 1)[1].split(b"\r\n", 1)[0]) if b"content-length: " in headers else 0
+            await reader.readexactly(length)
+            results[status] += 1
+            if b"connection: close" in headers or b"content-length: " not in headers:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            # Con un cuerpo sin leer el servidor cierra la conexión tras responder
+            results["error"] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def ws_flood(port: int, ip: str, count: int, stop_at: float, results: Counter) -> None:
+    async def connection(idx):
+        url = f"ws://127.0.0.1:{port}/ws/divine-flow?room=flood-{ip}-{idx}"
+        try:
+            async with websockets.connect(url, subprotocols=["divine-flow.bin.v1"], max_size=None,
+                                          additional_headers={"X-Forwarded-For": ip}) as ws:
+                # Un rechazo llega como cierre 1013 tras el handshake: se cuenta abierta con el primer frame
+                await ws.recv()
+                results["ws_open"] += 1
+                while time.perf_counter() < stop_at:
+                    try:
+                        await asyncio.wait_for(ws.recv(), timeout=max(0.01, stop_at - time.perf_counter()))
+                    except asyncio.TimeoutError:
+                        break
+        except (websockets.exceptions.InvalidStatus, websockets.exceptions.ConnectionClosed):
+            results["ws_rejected"] += 1
+        except OSError:
+            results["ws_error"] += 1
+
+    await asyncio.gather(*(connection(idx) for idx in range(count)))
+
+
+async def attack(port: int, args, stop_at: float) -> Counter:
+    results = Counter()
+    medium = json.dumps({"user_id": "flood", "session_id": "flood", "raw_frequency_points": session_points(100_000).tolist()}).encode()
+    oversized = b"[" + b"1.0," * (5 * 1024 * 1024) + b"1.0]"
+    tasks = []
+    for attacker in range(args.attackers):
+        ip = f"203.0.113.{attacker + 1}"
+        if "contact" in args.attacks:
+            contact = json.dumps({"name": "Flood", "email": "f@cosmic.local", "subject": "spam", "message": "x" * 500}).encode()
+            tasks += [http_flood(port, raw_request("/api/v1/contact", ip, contact), stop_at, results) for _ in range(8)]
+        if "star-trip" in args.attacks:
+            tasks += [http_flood(port, raw_request("/api/v1/star-trip/analyze-data", ip, medium), stop_at, results)
+                      for _ in range(4)]
+        if "oversized" in args.attacks:
+            tasks.append(http_flood(port, raw_request("/api/v1/star-trip/analyze-data", ip, oversized), stop_at, results))
+        if "ws" in args.attacks:
+            tasks.append(ws_flood(port, ip, args.ws_flood // args.attackers, stop_at, results))
+    await asyncio.gather(*tasks)
+    return results
+
+
+def attack_process(port: int, args, seconds: float, queue) -> None:
+    # Con menos prioridad: un atacante real no comparte la CPU del servidor, aquí sí
+    os.nice(10)
+    results = asyncio.run(attack(port, args, time.perf_counter() + seconds))
+    queue.put(dict(results))
+
+
+async def phase(label: str, args, admission: bool, with_attack: bool) -> None:
+    port = free_port()
+    process = start_server(port, admission)
+    legit = {"latencies": [], "status": Counter()}
+    attacker = None
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            await client.get("/")
+            if with_attack:
+                queue = multiprocessing.Queue()
+                attacker = multiprocessing.Process(target=attack_process, args=(port, args, args.seconds + 1, queue))
+                attacker.start()
+                # Que el ataque ya esté en marcha al medir
+                await asyncio.sleep(1)
+            start, cpu_start = time.perf_counter(), cpu_seconds(process.pid)
+            stop_at = start + args.seconds
+            await asyncio.gather(*(legit_user(client, user, stop_at, legit) for user in range(args.users)))
+            elapsed = time.perf_counter() - start
+            cpu = 100 * (cpu_seconds(process.pid) - cpu_start) / elapsed
+            attack_results = queue.get(timeout=120) if attacker else {}
+    finally:
+        if attacker:
+            attacker.join(timeout=20)
+        process.terminate()
+        process.wait(timeout=20)
+
+    latencies = legit["latencies"]
+    ok = sum(count for status, count in legit["status"].items() if status < 400)
+    errors = sum(legit["status"].values()) - ok
+    flood = ", ".join(f"{key}: {value}" for key, value in sorted(attack_results.items(), key=lambda item: str(item[0])))
+    print(f"{label:>26} {ok / elapsed:>9.1f} {percentile(latencies, 50):>9.1f} {percentile(latencies, 99):>9.1f} "
+          f"{errors:>7} {cpu:>6.0f}%   {flood or '-'}")
+
+
+async def main_async(args) -> None:
+    print(f"{args.users} clientes legítimos, {args.attackers} IPs atacantes, {args.seconds:.0f} s por fase")
+    print(f"{'fase':>26} {'ok/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errores':>7} {'CPU':>7}   respuestas al ataque")
+    await phase("sin ataque", args, admission=True, with_attack=False)
+    await phase("ataque, sin admisión", args, admission=False, with_attack=True)
+    await phase("ataque, con admisión", args, admission=True, with_attack=True)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--attackers", type=int, default=3)
+    parser.add_argument("--ws-flood", type=int, default=60, help="WebSockets de Divine Flow abiertos por el ataque")
+    parser.add_argument("--attacks", default=",".join(ATTACKS), help=f"subconjunto de {','.join(ATTACKS)}")
+    args = parser.parse_args()
+    args.attacks = set(args.attacks.split(","))
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    np.seterr(all="ignore")
+    main_cli()
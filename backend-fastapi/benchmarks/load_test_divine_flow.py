@@ -0,0 +1,122 @@
+"""Prueba de carga local de /ws/divine-flow con muchos clientes WebSocket falsos.
+
+Levanta el servidor con uvicorn para cada valor de DIVINE_FLOW_SHARDS, conecta
+clientes repartidos en varias salas y mide los ticks de simulación por segundo
+agregados (suma de todas las salas) y los frames recibidos. Con salas pesadas
+(muchas partículas + QUANTUM_MIRROR) el throughput debe crecer casi
+linealmente con el número de workers hasta agotar los núcleos.
+
+Uso (desde backend-fastapi/):
+    python benchmarks/load_test_divine_flow.py --shards 0 1 2 4 --rooms 8 --clients 64 \\
+        --particles 20000 --mode QUANTUM_MIRROR --seconds 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(port: int, shards: int, particles: int) -> subprocess.Popen:
+    # Todos los clientes salen de 127.0.0.1: sin control de admisión se mide la capacidad de las salas
+    env = dict(os.environ, DIVINE_FLOW_SHARDS=str(shards), DIVINE_FLOW_PARTICLES=str(particles), ADMISSION_ENABLED="0")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("El servidor no respondió a tiempo")
+
+
+def fetch_stats(port: int) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/v1/divine-flow/stats", timeout=5) as response:
+        return json.load(response)
+
+
+async def fake_client(port: int, room: str, mode: str, stop_at: float, totals: dict) -> None:
+    url = f"ws://127.0.0.1:{port}/ws/divine-flow?room={room}&mode={mode}"
+    async with websockets.connect(url, subprotocols=["divine-flow.bin.v1"], max_size=None) as ws:
+        tick = 0
+        while time.time() < stop_at:
+            await ws.send(json.dumps({"x": 50 + (tick % 20), "y": 50, "active": tick % 10 < 5}))
+            try:
+                frame = await asyncio.wait_for(ws.recv(), timeout=1)
+            except asyncio.TimeoutError:
+                continue
+            totals["frames"] += 1
+            totals["bytes"] += len(frame)
+            tick += 1
+
+
+async def drive(port: int, rooms: int, clients: int, mode: str, seconds: float) -> dict:
+    totals = {"frames": 0, "bytes": 0}
+    # Calentamiento: crea las salas y deja arrancar a los workers antes de medir
+    stop_at = time.time() + seconds + 3
+    tasks = [
+        asyncio.create_task(fake_client(port, f"load-{i % rooms}", mode, stop_at, totals))
+        for i in range(clients)
+    ]
+    await asyncio.sleep(3)
+    before = await asyncio.to_thread(fetch_stats, port)
+    frames_before, bytes_before = totals["frames"], totals["bytes"]
+    start = time.time()
+    await asyncio.sleep(seconds - 0.5)
+    # Se mide antes de que los clientes se desconecten y las salas se liberen
+    after = await asyncio.to_thread(fetch_stats, port)
+    elapsed = time.time() - start
+    frames, sent_bytes = totals["frames"] - frames_before, totals["bytes"] - bytes_before
+    await asyncio.gather(*tasks)
+    ticks = sum(room["tick_count"] for room in after["rooms"].values()) - sum(
+        room["tick_count"] for room in before["rooms"].values()
+    )
+    return {
+        "ticks_per_s": ticks / elapsed,
+        "frames_per_s": frames / elapsed,
+        "mb_per_s": sent_bytes / elapsed / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--rooms", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--particles", type=int, default=20000)
+    parser.add_argument("--mode", default="QUANTUM_MIRROR")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()} | salas: {args.rooms} | clientes: {args.clients} | "
+          f"partículas/sala: {args.particles} | modo: {args.mode}")
+    print(f"{'shards':>6} {'ticks/s':>9} {'frames/s':>9} {'MB/s':>7} {'escala':>7}")
+    baseline = None
+    for shards in args.shards:
+        server = start_server(args.port, shards, args.particles)
+        try:
+            result = asyncio.run(drive(args.port, args.rooms, args.clients, args.mode, args.seconds))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+        baseline = baseline or result["ticks_per_s"]
+        print(f"{shards:>6} {result['ticks_per_s']:>9.1f} {result['frames_per_s']:>9.1f} "
+              f"{result['mb_per_s']:>7.2f} {result['ticks_per_s'] / baseline:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
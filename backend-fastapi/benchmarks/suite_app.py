@@ -0,0 +1,23 @@
+"""Aplicación para uvicorn con los dobles locales instalados (la usa api_suite.py).
+
+    python -m uvicorn suite_app:app --app-dir benchmarks   (desde backend-fastapi/)
+"""
+
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import main  # noqa: E402
+from fake_backends import install  # noqa: E402
+
+fakes = install(
+    main,
+    firestore_latency_ms=float(os.getenv("SUITE_FIRESTORE_LATENCY_MS", 20)),
+    smtp_handshake_ms=float(os.getenv("SUITE_SMTP_HANDSHAKE_MS", 50)),
+    # SUITE_ADMISSION=1 deja activo el control de admisión (load_test_admission.py)
+    admission=os.getenv("SUITE_ADMISSION", "0") == "1",
+)
+app = main.app
@@ -0,0 +1,259 @@
+# -----------------------------------------------------
+# CATÁLOGO PRE-CODIFICADO DEL ORÁCULO (HOLOGRAMAS Y MISTERIOS)
+# -----------------------------------------------------
+# /cosmic-hologram y /cosmic-mystery son las llamadas más frecuentes de la
+# página de Divine Flow y siempre devuelven una entrada de un catálogo fijo.
+# Cada entrada se valida con su modelo Pydantic y se serializa a bytes una
+# sola vez al cargar el catálogo (con su ETag y, si compensa, sus versiones
+# gzip/brotli); servirla es elegir una entrada y copiar bytes.
+#
+# - Origen: el catálogo por defecto del código, un archivo JSON
+#   (CONTENT_CATALOG_PATH) o una colección de Firestore
+#   (CONTENT_FIRESTORE_COLLECTION). Se vigila cada CONTENT_RELOAD_INTERVAL_S.
+# - Recarga atómica: el catálogo nuevo se construye y valida aparte y se
+#   sustituye de una vez; si algo no valida se conserva el anterior.
+# - Selección ponderada (campo `weight`) o determinista con una semilla
+#   (la misma semilla da la misma entrada mientras no cambie el catálogo).
+
+import asyncio
+import bisect
+import gzip
+import hashlib
+import json
+import os
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from render_cache import content_key
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin el paquete `brotli` sólo se pre-comprime con gzip
+    brotli = None
+
+CONTENT_CATALOG_PATH = os.getenv("CONTENT_CATALOG_PATH")
+CONTENT_FIRESTORE_COLLECTION = os.getenv("CONTENT_FIRESTORE_COLLECTION")
+CONTENT_RELOAD_INTERVAL_S = float(os.getenv("CONTENT_RELOAD_INTERVAL_S", 30))
+# Por debajo de este tamaño comprimir no ahorra nada (cabeceras incluidas)
+CONTENT_COMPRESS_MIN_BYTES = int(os.getenv("CONTENT_COMPRESS_MIN_BYTES", 512))
+
+
+def accepted_encodings(header: Optional[str]) -> set:
+    """Codificaciones aceptadas en Accept-Encoding (las que llevan q=0 se excluyen)."""
+    accepted = set()
+    for item in (header or "").split(","):
+        token, _, params = item.partition(";")
+        token = token.strip().lower()
+        if token and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(token)
+    return accepted
+
+
+class ContentEntry:
+    """Una respuesta ya validada y serializada, con su ETag y sus variantes comprimidas."""
+
+    __slots__ = ("id", "weight", "body", "etag", "gzip", "br")
+
+    def __init__(self, entry_id: str, weight: float, body: bytes):
+        self.id = entry_id
+        self.weight = weight
+        self.body = body
+        self.etag = f'"{content_key(body)[:32]}"'
+        self.gzip = None
+        self.br = None
+        if len(body) >= CONTENT_COMPRESS_MIN_BYTES:
+            self.gzip = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.br = brotli.compress(body, quality=11)
+
+    def encoded(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """(cuerpo, Content-Encoding) según lo que acepte el cliente."""
+        if self.gzip is None:
+            return self.body, None
+        accepted = accepted_encodings(accept_encoding)
+        if self.br is not None and "br" in accepted:
+            return self.br, "br"
+        if "gzip" in accepted:
+            return self.gzip, "gzip"
+        return self.body, None
+
+
+class ContentCatalog:
+    """Entradas inmutables de un catálogo con sus pesos acumulados para elegir en O(log n)."""
+
+    def __init__(self, entries: List[ContentEntry]):
+        self.entries = tuple(entries)
+        self._cumulative = []
+        total = 0.0
+        for entry in self.entries:
+            total += entry.weight
+            self._cumulative.append(total)
+        self.total_weight = total
+        self.by_id = {entry.id: entry for entry in self.entries}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def pick(self, seed: Optional[str] = None) -> ContentEntry:
+        if seed is None:
+            point = random.random() * self.total_weight
+        else:
+            # Determinista entre procesos y reinicios (hash() de Python cambia con PYTHONHASHSEED)
+            digest = hashlib.blake2b(seed.encode("utf-8"), digest_size=8).digest()
+            point = int.from_bytes(digest, "big") / 2 ** 64 * self.total_weight
+        return self.entries[min(bisect.bisect_right(self._cumulative, point), len(self.entries) - 1)]
+
+
+def build_catalogs(payload: Dict[str, List[dict]], schemas: Dict[str, Type[BaseModel]]) -> Dict[str, ContentCatalog]:
+    """Valida y serializa todas las entradas; cualquier error invalida la carga completa (ValueError)."""
+    if not isinstance(payload, dict):
+        raise ValueError("el catálogo debe ser un objeto {nombre: [entradas]}")
+    catalogs = {}
+    for name, schema in schemas.items():
+        items = payload.get(name)
+        if not items or not isinstance(items, list):
+            raise ValueError(f"catálogo '{name}' vacío o ausente")
+        entries = []
+        for idx, item in enumerate(items):
+            if not isinstance(item, dict):
+                raise ValueError(f"{name}[{idx}]: cada entrada debe ser un objeto")
+            try:
+                weight = float(item.get("weight", 1))
+            except (TypeError, ValueError):
+                weight = 0.0
+            if not weight > 0 or weight == float("inf"):
+                raise ValueError(f"{name}[{idx}]: weight debe ser un número positivo")
+            body = schema.model_validate(item).model_dump_json().encode("utf-8")
+            entries.append(ContentEntry(str(item.get("id", idx)), weight, body))
+        catalogs[name] = ContentCatalog(entries)
+    return catalogs
+
+
+class ContentStore:
+    """Catálogos pre-codificados con recarga atómica desde archivo o Firestore."""
+
+    def __init__(
+        self,
+        schemas: Dict[str, Type[BaseModel]],
+        defaults: Dict[str, List[dict]],
+        path: Optional[str] = CONTENT_CATALOG_PATH,
+        collection: Optional[str] = CONTENT_FIRESTORE_COLLECTION,
+        get_client: Optional[Callable[[], Any]] = None,
+        reload_interval: float = CONTENT_RELOAD_INTERVAL_S,
+    ):
+        self.schemas = schemas
+        self.path = path
+        self.collection = collection if get_client is not None else None
+        self._get_client = get_client
+        self.reload_interval = reload_interval
+        self._catalogs = build_catalogs(defaults, schemas)
+        self._file_signature = None
+        self._version = self._fingerprint(self._catalogs)
+        self._task: Optional[asyncio.Task] = None
+        self.source = "defaults"
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error: Optional[str] = None
+        if self.path:
+            # El archivo se carga ya al importar: es local y rápido; Firestore espera al arranque
+            self._apply(self._load_file(force=True), "file")
+
+    def catalog(self, name: str) -> ContentCatalog:
+        return self._catalogs[name]
+
+    @staticmethod
+    def _fingerprint(catalogs: Dict[str, ContentCatalog]) -> str:
+        return content_key(*(f"{name}:{entry.id}:{entry.weight}:{entry.etag}"
+                             for name, catalog in sorted(catalogs.items()) for entry in catalog.entries))
+
+    def _load_file(self, force: bool = False) -> Optional[Dict[str, ContentCatalog]]:
+        try:
+            stat = os.stat(self.path)
+            signature, error = (stat.st_mtime_ns, stat.st_size), None
+        except OSError as e:
+            signature, error = None, e
+        # Cada versión del archivo (o su ausencia) se procesa una vez: un archivo roto no avisa en cada vuelta
+        if not force and signature == self._file_signature:
+            return None
+        self._file_signature = signature
+        if error is not None:
+            self._fail(error)
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                return build_catalogs(json.load(handle), self.schemas)
+        except (OSError, ValueError) as e:
+            self._fail(e)
+            return None
+
+    def _load_firestore(self) -> Optional[Dict[str, ContentCatalog]]:
+        # Un documento por entrada: {"catalog": "holograms", "weight": 2, ...campos del modelo}
+        db = self._get_client()
+        if db is None:
+            return None
+        try:
+            payload: Dict[str, List[dict]] = {}
+            for doc in sorted(db.collection(self.collection).stream(), key=lambda doc: doc.id):
+                data = doc.to_dict() or {}
+                data.setdefault("id", doc.id)
+                payload.setdefault(data.get("catalog", ""), []).append(data)
+            return build_catalogs(payload, self.schemas)
+        except Exception as e:
+            self._fail(e)
+            return None
+
+    def _fail(self, error: Exception) -> None:
+        self.failed_reloads += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        print(f"⚠️ Catálogo del oráculo: recarga rechazada, se conserva el anterior ({self.last_error}).")
+
+    def _apply(self, catalogs: Optional[Dict[str, ContentCatalog]], source: str) -> bool:
+        if catalogs is None:
+            return False
+        version = self._fingerprint(catalogs)
+        if version == self._version:
+            return False
+        # Una sola asignación: las peticiones ven el catálogo viejo o el nuevo, nunca una mezcla
+        self._catalogs = catalogs
+        self._version = version
+        self.source = source
+        self.reloads += 1
+        print(f"🔮 Catálogo del oráculo recargado desde {source}: "
+              + ", ".join(f"{name}={len(catalog)}" for name, catalog in catalogs.items()))
+        return True
+
+    async def reload(self) -> bool:
+        """Relee el origen configurado (en un hilo) y sustituye el catálogo si cambió."""
+        if self.collection:
+            return self._apply(await asyncio.to_thread(self._load_firestore), "firestore")
+        if self.path:
+            return self._apply(await asyncio.to_thread(self._load_file), "file")
+        return False
+
+    async def _watch(self) -> None:
+        while True:
+            await self.reload()
+            await asyncio.sleep(self.reload_interval)
+
+    def start(self) -> None:
+        if (self.path or self.collection) and self.reload_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "version": self._version[:16],
+            "catalogs": {name: len(catalog) for name, catalog in self._catalogs.items()},
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "last_error": self.last_error,
+            "brotli": brotli is not None,
+        }
@@ -0,0 +1,122 @@
+# -----------------------------------------------------
+# GEOMETRÍA CUÁNTICA ARMÓNICA VECTORIZADA (COSMIC ARCHITECT)
+# -----------------------------------------------------
+# Mismas fórmulas que los generadores originales, evaluadas con NumPy sobre
+# todos los nodos a la vez y, en lote, sobre muchas frecuencias a la vez
+# (matriz frecuencias x nodos). El orden de las operaciones se conserva
+# término a término para que las coordenadas redondeadas sean idénticas.
+
+import math
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+PHI = (1 + math.sqrt(5)) / 2
+CENTER_X, CENTER_Y = 150, 150
+
+GEOMETRY_TYPES = ("fractal_starburst", "rose_of_grandi", "fermat_spiral", "chaotic_glitch", "merkaba_matrix")
+
+
+def _polar(r: np.ndarray, angle: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    return CENTER_X + r * np.cos(angle), CENTER_Y + r * np.sin(angle)
+
+
+def _sacred_arrays(freq: np.ndarray, nodes_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Dos órbitas concéntricas (Merkaba / Matriz Sagrada)
+    nodes_per_layer = max(nodes_count // 2, 4)
+    i = np.arange(nodes_per_layer)
+    base_radius = 65 + (freq % 35)
+    xs, ys = [], []
+    for layer_idx, scale in enumerate((0.55, 1.0)):
+        current_radius = base_radius * scale
+        angular_offset = (layer_idx * math.pi / nodes_per_layer) * PHI if layer_idx > 0 else 0
+        angle = (i * 2 * math.pi / nodes_per_layer) + angular_offset
+        r = current_radius * (1 + 0.06 * np.sin(i * PHI + (freq * 0.02)))
+        x, y = _polar(r, angle)
+        xs.append(x)
+        ys.append(y)
+    return np.concatenate(xs, axis=1), np.concatenate(ys, axis=1)
+
+
+def _advanced_arrays(geometry_type: str, freq: np.ndarray, nodes_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    base_radius = 75 + (freq % 30)
+    i = np.arange(nodes_count)
+
+    if geometry_type == "fractal_starburst":
+        angle = (i * 2 * math.pi / nodes_count)
+        petal = np.where(i % 2 == 0, 1.2, 0.45)
+        r = base_radius * petal * (1 + 0.12 * np.sin(i * PHI + freq))
+        return _polar(r, np.broadcast_to(angle, r.shape))
+
+    if geometry_type == "rose_of_grandi":
+        k = np.maximum(3, ((freq % 5) + 3).astype(np.int64))
+        angle = (i * 2 * math.pi / nodes_count)
+        r = base_radius * (np.cos(k * angle) * 0.85 + 0.45)
+        return _polar(r, np.broadcast_to(angle, r.shape))
+
+    if geometry_type == "fermat_spiral":
+        theta = i * (2 * math.pi / nodes_count) * PHI
+        r = np.sqrt(i + 1) * (base_radius / math.sqrt(nodes_count)) * 1.3
+        r = r * (1 + 0.15 * np.sin(i * 2.0 + freq))
+        return _polar(r, np.broadcast_to(theta, r.shape))
+
+    if geometry_type == "chaotic_glitch":
+        angle = (i * 2 * math.pi / nodes_count) + (np.cos(freq + i) * 0.25)
+        r = base_radius * (0.55 + 0.65 * np.cos(i * PHI + (freq * 0.05)))
+        return _polar(r, angle)
+
+    if geometry_type == "merkaba_matrix":
+        layers = (0.45, 0.75, 1.1)
+        nodes_per_layer = max(nodes_count // len(layers), 4)
+        j = np.arange(nodes_per_layer)
+        xs, ys = [], []
+        for l_idx, scale in enumerate(layers):
+            current_radius = base_radius * scale
+            offset = (l_idx * math.pi / nodes_per_layer) * PHI
+            angle = (j * 2 * math.pi / nodes_per_layer) + offset
+            r = current_radius * (1 + 0.08 * np.cos(j * PHI + freq))
+            x, y = _polar(r, np.broadcast_to(angle, r.shape))
+            xs.append(x)
+            ys.append(y)
+        return np.concatenate(xs, axis=1), np.concatenate(ys, axis=1)
+
+    return _sacred_arrays(freq, nodes_count)
+
+
+def round_coordinates(values: np.ndarray) -> np.ndarray:
+    """Redondea a 2 decimales con la misma semántica que `round(x, 2)` de Python.
+
+    np.round escala por 100 y puede diferir de Python justo en los empates
+    (x.xx5); esos casos, muy raros, se corrigen con el redondeo exacto.
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for idx in zip(*np.nonzero(near_tie)):
+        rounded[idx] = round(float(values[idx]), 2)
+    return rounded
+
+
+def geometry_batch_arrays(geometry_type: str, frequencies: Iterable[float], nodes_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Coordenadas redondeadas (frecuencias x puntos) para muchas mandalas del mismo tipo y nodos."""
+    freq = np.asarray(list(frequencies), dtype=np.float64).reshape(-1, 1)
+    xs, ys = _advanced_arrays(geometry_type, freq, nodes_count)
+    return round_coordinates(xs), round_coordinates(ys)
+
+
+def points_from_arrays(xs: np.ndarray, ys: np.ndarray) -> list:
+    return [{"x": x, "y": y} for x, y in zip(xs.tolist(), ys.tolist())]
+
+
+def generate_geometry_batch(geometry_type: str, frequencies: Iterable[float], nodes_count: int) -> List[list]:
+    xs, ys = geometry_batch_arrays(geometry_type, frequencies, nodes_count)
+    return [points_from_arrays(row_x, row_y) for row_x, row_y in zip(xs, ys)]
+
+
+def generate_sacred_geometry(frequency: float, nodes_count: int) -> list:
+    xs, ys = _sacred_arrays(np.array([[float(frequency)]]), nodes_count)
+    return points_from_arrays(round_coordinates(xs[0]), round_coordinates(ys[0]))
+
+
+def generate_advanced_cosmic_geometry(geometry_type: str, frequency: float, nodes_count: int) -> list:
+    return generate_geometry_batch(geometry_type, [frequency], nodes_count)[0]
@@ -0,0 +1,584 @@
+# -----------------------------------------------------
+# GRABACIÓN Y REPETICIÓN DE DIVINE FLOW (REGISTRO COLUMNAR EN SEGMENTOS)
+# -----------------------------------------------------
+# Una sala puede grabar cada tick (partículas + entrada del observador) en un
+# archivo de solo-añadir; la repetición lo lee con mmap y envía los frames
+# sin ejecutar la simulación.
+#
+# Disposición del archivo (little-endian):
+#
+#   cabecera   "DFRC" | version u8 | meta_len u16 | count u32 | tick_hz f32 | created f64 | meta (JSON)
+#   segmento   "DFSG" | first_tick u32 | ticks u32 | t_first_ms u32 | t_last_ms u32
+#              | raw_len u32 | comp_len u32 | crc32 u32 | zlib(columnas)
+#   ...
+#   índice     (first_tick u32, ticks u32, t_first_ms u32, t_last_ms u32, offset u64) por segmento
+#   cola       index_offset u64 | segmentos u32 | "DFIX"
+#
+# Columnas de un segmento de K ticks y N partículas: tick u32[K], t_ms u32[K],
+# obs_x f32[K], obs_y f32[K], active u8[K], modo u8[K] y después x, y i32[K,N]
+# y energy u8[K,N] (misma escala que divine-flow.bin.v1, pero las posiciones
+# sin recortar: las partículas rebasan el dominio; en diferencias entre
+# ticks) y vx, vy f16[K,N] (XOR con el tick anterior). Cada columna de
+# partículas se separa en planos de bytes antes de comprimir: ~1,2 KB por tick
+# con 200 partículas frente a ~26 KB del frame JSON.
+#
+# Los segmentos se comprimen y escriben en un hilo aparte. El índice se añade
+# al cerrar la grabación; si el proceso muere antes, el lector lo reconstruye
+# recorriendo las cabeceras de segmento. Las repeticiones codifican cada
+# segmento una vez por protocolo y comparten esos bytes entre espectadores.
+
+import asyncio
+import bisect
+import json
+import mmap
+import os
+import re
+import secrets
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from cosmic_cache import TTLCache
+from frame_protocol import BINARY_PROTOCOL, DELTA_PROTOCOL, ENERGY_SCALE, POSITION_SCALE, BinaryFrameEncoder, encode_json_frame
+from quantum_engine import PHYSICS_MODES, STATE_FIELDS, QuantumEngine
+
+RECORDINGS_DIR = os.getenv(
+    "DIVINE_FLOW_RECORDINGS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+)
+# Salas que se graban al crearse: "*" para todas o una lista separada por comas
+RECORD_ROOMS = os.getenv("DIVINE_FLOW_RECORD_ROOMS", "")
+SEGMENT_TICKS = int(os.getenv("DIVINE_FLOW_SEGMENT_TICKS", 50))
+MAX_RECORDING_MB = float(os.getenv("DIVINE_FLOW_MAX_RECORDING_MB", 256))
+# Tope del directorio entero: cada inicio/parada crea un archivo nuevo, sin esto se llena el disco
+MAX_RECORDINGS = int(os.getenv("DIVINE_FLOW_MAX_RECORDINGS", 100))
+MAX_RECORDINGS_MB = float(os.getenv("DIVINE_FLOW_MAX_RECORDINGS_MB", 2048))
+# Por debajo de esto no merece la pena empezar una grabación
+MIN_RECORDING_BYTES = 1024 * 1024
+# Segmentos ya codificados (por protocolo) compartidos entre repeticiones
+REPLAY_CACHE_SEGMENTS = int(os.getenv("DIVINE_FLOW_REPLAY_CACHE_SEGMENTS", 64))
+MIN_REPLAY_SPEED = 0.1
+MAX_REPLAY_SPEED = 32.0
+# Más atrasada que esto, la repetición se reprograma desde ahora en vez de enviar en ráfaga
+REPLAY_MAX_LAG_S = 0.25
+COMPRESSION_LEVEL = 6
+# Cota de las posiciones cuantizadas (i32) ante valores no finitos o desbocados
+POSITION_LIMIT = 2.0 ** 30
+
+FILE_MAGIC = b"DFRC"
+SEGMENT_MAGIC = b"DFSG"
+INDEX_MAGIC = b"DFIX"
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct("<4sBHIfd")
+SEGMENT_HEADER = struct.Struct("<4sIIIIIII")
+INDEX_ENTRY = struct.Struct("<IIIIQ")
+TRAILER = struct.Struct("<QI4s")
+EXTENSION = ".dfr"
+
+RECORDING_ID = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+# Modo de física por tick: 0 = ninguno, 1.. = PHYSICS_MODES
+MODE_CODES = {mode: idx + 1 for idx, mode in enumerate(PHYSICS_MODES)}
+# (columna, dtype, diferencia entre ticks: "sub" modular o "xor" de bits)
+PARTICLE_COLUMNS = (("x", np.dtype("<i4"), "sub"), ("y", np.dtype("<i4"), "sub"), ("energy", np.uint8, "sub"),
+                    ("vx", np.uint16, "xor"), ("vy", np.uint16, "xor"))
+
+# Un solo hilo: los segmentos de cada archivo se escriben en orden
+_writer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="divine-flow-recorder")
+
+
+def should_record(room_id: str, rooms: str = RECORD_ROOMS) -> bool:
+    wanted = {name.strip() for name in rooms.split(",") if name.strip()}
+    return "*" in wanted or room_id in wanted
+
+
+def recording_path(recording_id: str, directory: str = RECORDINGS_DIR) -> str:
+    if not RECORDING_ID.match(recording_id):
+        raise ValueError("Identificador de grabación inválido")
+    return os.path.join(directory, recording_id + EXTENSION)
+
+
+def new_recording_id(room_id: str) -> str:
+    safe_room = re.sub(r"[^A-Za-z0-9_-]", "_", room_id)[:48] or "room"
+    return f"{safe_room}-{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}-{secrets.token_hex(3)}"
+
+
+def _shuffle(values: np.ndarray) -> bytes:
+    """Separa los bytes de cada valor en planos (todos los bytes bajos, luego los altos...)."""
+    size = values.dtype.itemsize
+    return values.view(np.uint8).reshape(-1, size).T.tobytes() if size > 1 else values.tobytes()
+
+
+def _unshuffle(data, dtype, shape) -> np.ndarray:
+    size = np.dtype(dtype).itemsize
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(size, -1)
+    return planes.T.copy().view(dtype).reshape(shape)
+
+
+def _quantize(values: np.ndarray, scale: float, low: float, high: float, dtype) -> np.ndarray:
+    # Mismas operaciones en float32 que BinaryFrameEncoder: al recodificar, los frames
+    # binarios repetidos son idénticos a los emitidos en vivo
+    scaled = np.multiply(values, scale, dtype=np.float32)
+    scaled += np.float32(0.5)
+    np.floor(scaled, out=scaled)
+    np.clip(scaled, low, high, out=scaled)
+    return scaled.astype(dtype)
+
+
+def _quantize_state(state: dict) -> list:
+    """Columnas de partículas (en el orden de PARTICLE_COLUMNS) a partir del estado float32 de K ticks."""
+    return [
+        # Posiciones sin recortar al dominio: el codificador binario las recorta al repetir
+        _quantize(state["x"], POSITION_SCALE, -POSITION_LIMIT, POSITION_LIMIT, "<i4"),
+        _quantize(state["y"], POSITION_SCALE, -POSITION_LIMIT, POSITION_LIMIT, "<i4"),
+        _quantize(state["energy"], ENERGY_SCALE, 0, 255, np.uint8),
+        state["vx"].astype(np.float16).view(np.uint16),
+        state["vy"].astype(np.float16).view(np.uint16),
+    ]
+
+
+class FrameRecorder:
+    """Graba los ticks de una sala en un archivo .dfr; append() sólo copia el estado del tick."""
+
+    def __init__(
+        self,
+        path: str,
+        room_id: str,
+        count: int,
+        tick_hz: float,
+        segment_ticks: int = SEGMENT_TICKS,
+        max_bytes: int = int(MAX_RECORDING_MB * 1024 * 1024),
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.path = path
+        self.recording_id = os.path.basename(path)[: -len(EXTENSION)]
+        self.count = count
+        self.segment_ticks = max(1, segment_ticks)
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "xb")
+        meta = json.dumps({"room": room_id}).encode("utf-8")
+        self._file.write(FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION, len(meta), count, tick_hz, time.time()) + meta)
+        self._offset = FILE_HEADER.size + len(meta)
+        self._index: List[tuple] = []
+        self._clock = clock
+        self._started = clock()
+        self._last_write: Optional[asyncio.Future] = None
+
+        k = self.segment_ticks
+        self._tick = np.empty(k, dtype="<u4")
+        self._t_ms = np.empty(k, dtype="<u4")
+        self._obs_x = np.empty(k, dtype="<f4")
+        self._obs_y = np.empty(k, dtype="<f4")
+        self._active = np.empty(k, dtype=np.uint8)
+        self._mode = np.empty(k, dtype=np.uint8)
+        self._state = {name: np.empty((k, count), dtype=np.float32) for name in STATE_FIELDS}
+        self._rows = 0
+
+        self.ticks = 0
+        self.segments = 0
+        self.bytes_written = self._offset
+        self.raw_bytes = 0
+        self.closed = False
+        self.error: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return not self.closed and self.error is None and self.bytes_written < self.max_bytes
+
+    def append(self, engine, tick: int, obs_x: float, obs_y: float, is_active: bool) -> None:
+        """Copia el estado del tick al segmento en curso; cuantizar y comprimir queda para el hilo."""
+        if not self.active:
+            return
+        row = self._rows
+        for name, values in self._state.items():
+            values[row] = getattr(engine, name)
+        self._tick[row] = tick & 0xFFFFFFFF
+        self._t_ms[row] = int((self._clock() - self._started) * 1000)
+        self._obs_x[row] = obs_x
+        self._obs_y[row] = obs_y
+        self._active[row] = bool(is_active)
+        self._mode[row] = MODE_CODES.get(engine.physics_mode, 0)
+        self._rows += 1
+        self.ticks += 1
+        if self._rows == self.segment_ticks:
+            self._flush()
+
+    def _flush(self) -> None:
+        rows, self._rows = self._rows, 0
+        if rows == 0:
+            return
+        # Copias: el buffer se reutiliza para el siguiente segmento mientras el hilo comprime
+        header_columns = [column[:rows].copy() for column in (self._tick, self._t_ms, self._obs_x, self._obs_y, self._active, self._mode)]
+        state = {name: values[:rows].copy() for name, values in self._state.items()}
+        self._submit(self._write_segment, rows, header_columns, state)
+
+    def _submit(self, fn, *args) -> None:
+        self._last_write = asyncio.get_running_loop().run_in_executor(_writer_pool, fn, *args)
+
+    def _write_segment(self, rows: int, header_columns: list, state: dict) -> None:
+        if self.error is not None:
+            return
+        try:
+            parts = [column.tobytes() for column in header_columns]
+            for (_, _, mode), values in zip(PARTICLE_COLUMNS, _quantize_state(state)):
+                diff = values.copy()
+                if mode == "sub":
+                    np.subtract(values[1:], values[:-1], out=diff[1:])
+                else:
+                    np.bitwise_xor(values[1:], values[:-1], out=diff[1:])
+                parts.append(_shuffle(diff))
+            raw = b"".join(parts)
+            compressed = zlib.compress(raw, COMPRESSION_LEVEL)
+            ticks, t_ms = header_columns[0], header_columns[1]
+            entry = (int(ticks[0]), rows, int(t_ms[0]), int(t_ms[-1]), self._offset)
+            self._file.write(SEGMENT_HEADER.pack(
+                SEGMENT_MAGIC, entry[0], rows, entry[2], entry[3], len(raw), len(compressed), zlib.crc32(compressed)
+            ))
+            self._file.write(compressed)
+            self._file.flush()
+        except OSError as e:
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Grabación de Divine Flow {self.recording_id} detenida ({self.error}).")
+            return
+        self._index.append(entry)
+        self._offset += SEGMENT_HEADER.size + len(compressed)
+        self.bytes_written = self._offset
+        self.raw_bytes += len(raw)
+        self.segments += 1
+
+    def _finish(self) -> None:
+        try:
+            if self.error is None:
+                index_offset = self._offset
+                self._file.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in self._index))
+                self._file.write(TRAILER.pack(index_offset, len(self._index), INDEX_MAGIC))
+                self.bytes_written = self._file.tell()
+        except OSError as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self._file.close()
+
+    async def close(self) -> None:
+        """Escribe el segmento parcial, el índice y la cola, y cierra el archivo."""
+        if self.closed:
+            return
+        if self.error is None:
+            self._flush()
+        self.closed = True
+        self._submit(self._finish)
+        await self._last_write
+
+    def stats(self) -> dict:
+        return {
+            "recording_id": self.recording_id,
+            "ticks": self.ticks,
+            "segments": self.segments,
+            "bytes": self.bytes_written,
+            "bytes_per_tick": round(self.bytes_written / self.ticks, 1) if self.ticks else 0.0,
+            "compression_ratio": round(self.raw_bytes / max(1, self.bytes_written), 2),
+            "recording": self.active,
+            "error": self.error,
+        }
+
+
+class RecordedFrame:
+    """Un tick grabado con la interfaz del motor que usan los codificadores de frames."""
+
+    particles = QuantumEngine.particles
+
+    def __init__(self, ids, x, y, vx, vy, energy, physics_mode):
+        self.count = len(ids)
+        self.ids, self.x, self.y, self.vx, self.vy, self.energy = ids, x, y, vx, vy, energy
+        self.physics_mode = physics_mode
+
+
+class Recording:
+    """Grabación abierta con mmap: cabecera, índice de segmentos y decodificación por segmento."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.recording_id = os.path.basename(path)[: -len(EXTENSION)]
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except struct.error as e:
+            # Más corto que la cabecera o con el índice truncado (caída, o grabación que empieza)
+            self._map.close()
+            raise ValueError(f"Archivo de grabación de Divine Flow truncado: {e}") from e
+        except ValueError:
+            self._map.close()
+            raise
+
+    def _parse(self) -> None:
+        magic, version, meta_len, self.count, self.tick_hz, self.created = FILE_HEADER.unpack_from(self._map, 0)
+        if magic != FILE_MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Archivo de grabación de Divine Flow inválido")
+        start = FILE_HEADER.size
+        self.meta = json.loads(self._map[start:start + meta_len] or b"{}")
+        self.segments = self._read_index(start + meta_len)
+        self._starts = [entry[2] for entry in self.segments]
+
+    def _read_index(self, data_start: int) -> List[tuple]:
+        size = len(self._map)
+        if size >= data_start + TRAILER.size:
+            index_offset, count, magic = TRAILER.unpack_from(self._map, size - TRAILER.size)
+            if magic == INDEX_MAGIC and index_offset + count * INDEX_ENTRY.size == size - TRAILER.size:
+                self.complete = True
+                return [INDEX_ENTRY.unpack_from(self._map, index_offset + i * INDEX_ENTRY.size) for i in range(count)]
+        # Sin índice (grabación en curso o cortada): se recorren las cabeceras de segmento
+        self.complete = False
+        segments, offset = [], data_start
+        while offset + SEGMENT_HEADER.size <= size:
+            magic, first_tick, ticks, t_first, t_last, _, comp_len, _ = SEGMENT_HEADER.unpack_from(self._map, offset)
+            if magic != SEGMENT_MAGIC or offset + SEGMENT_HEADER.size + comp_len > size:
+                break
+            segments.append((first_tick, ticks, t_first, t_last, offset))
+            offset += SEGMENT_HEADER.size + comp_len
+        return segments
+
+    @property
+    def ticks(self) -> int:
+        return sum(entry[1] for entry in self.segments)
+
+    @property
+    def duration_ms(self) -> int:
+        return self.segments[-1][3] if self.segments else 0
+
+    def segment_at(self, t_ms: float) -> int:
+        """Segmento que contiene el instante `t_ms` (la búsqueda del índice)."""
+        return max(0, bisect.bisect_right(self._starts, t_ms) - 1)
+
+    def decode_segment(self, idx: int) -> dict:
+        offset = self.segments[idx][4]
+        try:
+            magic, _, ticks, _, _, raw_len, comp_len, crc = SEGMENT_HEADER.unpack_from(self._map, offset)
+        except struct.error as e:
+            raise ValueError(f"Segmento {idx} de {self.recording_id} fuera del archivo") from e
+        body = memoryview(self._map)[offset + SEGMENT_HEADER.size: offset + SEGMENT_HEADER.size + comp_len]
+        try:
+            if magic != SEGMENT_MAGIC or zlib.crc32(body) != crc:
+                raise ValueError(f"Segmento {idx} de {self.recording_id} corrupto")
+            raw = zlib.decompress(body)
+        finally:
+            body.release()
+        if len(raw) != raw_len:
+            raise ValueError(f"Segmento {idx} de {self.recording_id} corrupto")
+
+        segment, cursor = {}, 0
+        for name, dtype in (("tick", "<u4"), ("t_ms", "<u4"), ("obs_x", "<f4"), ("obs_y", "<f4"),
+                            ("active", np.uint8), ("mode", np.uint8)):
+            nbytes = ticks * np.dtype(dtype).itemsize
+            segment[name] = np.frombuffer(raw, dtype=dtype, count=ticks, offset=cursor)
+            cursor += nbytes
+        for name, dtype, mode in PARTICLE_COLUMNS:
+            nbytes = ticks * self.count * np.dtype(dtype).itemsize
+            diff = _unshuffle(raw[cursor:cursor + nbytes], dtype, (ticks, self.count))
+            cursor += nbytes
+            if mode == "sub":
+                segment[name] = np.cumsum(diff, axis=0, dtype=dtype)
+            else:
+                segment[name] = np.bitwise_xor.accumulate(diff, axis=0)
+        return segment
+
+    def encode_segment(self, idx: int, protocol: Optional[str]) -> List[Tuple[int, object]]:
+        """(t_ms, frame) de cada tick del segmento, en el mismo formato que la sala en vivo."""
+        segment = self.decode_segment(idx)
+        ids = np.arange(self.count, dtype=np.int32)
+        # Los frames delta empiezan cada segmento con un frame clave: se puede entrar por cualquier segmento
+        encoder = BinaryFrameEncoder(self.count, delta=protocol == DELTA_PROTOCOL) if protocol else None
+        x = segment["x"].astype(np.float32) / np.float32(POSITION_SCALE)
+        y = segment["y"].astype(np.float32) / np.float32(POSITION_SCALE)
+        energy = segment["energy"].astype(np.float32) / np.float32(ENERGY_SCALE)
+        vx = segment["vx"].view(np.float16).astype(np.float32)
+        vy = segment["vy"].view(np.float16).astype(np.float32)
+        frames = []
+        for row in range(len(segment["tick"])):
+            code = int(segment["mode"][row])
+            state = RecordedFrame(ids, x[row], y[row], vx[row], vy[row], energy[row],
+                                  PHYSICS_MODES[code - 1] if code else None)
+            if encoder is None:
+                frame = encode_json_frame(state)
+            else:
+                frame = bytes(encoder.encode(state, int(segment["tick"][row])))
+            frames.append((int(segment["t_ms"][row]), frame))
+        return frames
+
+    def info(self) -> dict:
+        return {
+            "recording_id": self.recording_id,
+            "room": self.meta.get("room"),
+            "particles": self.count,
+            "tick_hz": round(self.tick_hz, 2),
+            "created": self.created,
+            "ticks": self.ticks,
+            "segments": len(self.segments),
+            "duration_s": round(self.duration_ms / 1000, 3),
+            "bytes": len(self._map),
+            "complete": self.complete,
+        }
+
+
+class ReplayLibrary:
+    """Grabaciones abiertas y segmentos ya codificados, compartidos entre todas las repeticiones."""
+
+    def __init__(
+        self,
+        directory: str = RECORDINGS_DIR,
+        cache_segments: int = REPLAY_CACHE_SEGMENTS,
+        max_recordings: int = MAX_RECORDINGS,
+        max_total_bytes: int = int(MAX_RECORDINGS_MB * 1024 * 1024),
+    ):
+        self.directory = directory
+        self.max_recordings = max_recordings
+        self.max_total_bytes = max_total_bytes
+        self.frames = TTLCache(maxsize=cache_segments, ttl=None)
+        self._recordings: Dict[str, Tuple[tuple, Recording]] = {}
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self.segments_encoded = 0
+        self.encode_seconds = 0.0
+        self.replays = 0
+        self.frames_sent = 0
+
+    def open(self, recording_id: str) -> Recording:
+        """Grabación por id (FileNotFoundError si no existe); se reabre si el archivo creció."""
+        path = recording_path(recording_id, self.directory)
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        cached = self._recordings.get(recording_id)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        recording = Recording(path)
+        self._recordings[recording_id] = (signature, recording)
+        return recording
+
+    def list(self) -> List[dict]:
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith(EXTENSION))
+        except FileNotFoundError:
+            return []
+        listing = []
+        for name in names:
+            try:
+                listing.append(self.open(name[: -len(EXTENSION)]).info())
+            except (OSError, ValueError):
+                continue
+        return listing
+
+    def usage(self) -> Tuple[int, int]:
+        """(archivos, bytes) de las grabaciones del directorio."""
+        files = total = 0
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(EXTENSION):
+                        try:
+                            total += entry.stat().st_size
+                        except OSError:
+                            continue
+                        files += 1
+        except FileNotFoundError:
+            pass
+        return files, total
+
+    def recording_budget(self, active: Iterable[FrameRecorder] = ()) -> int:
+        """Bytes que puede ocupar una grabación nueva (0 si no cabe ninguna).
+
+        Lo que aún pueden crecer las grabaciones en curso cuenta como ocupado, así
+        que el directorio nunca pasa de `max_total_bytes`.
+        """
+        files, total = self.usage()
+        if files >= self.max_recordings:
+            return 0
+        reserved = sum(max(0, recorder.max_bytes - recorder.bytes_written) for recorder in active if recorder.active)
+        budget = min(int(MAX_RECORDING_MB * 1024 * 1024), self.max_total_bytes - total - reserved)
+        return budget if budget >= MIN_RECORDING_BYTES else 0
+
+    def _encode(self, recording: Recording, idx: int, protocol: Optional[str]) -> list:
+        start = time.perf_counter()
+        frames = recording.encode_segment(idx, protocol)
+        self.encode_seconds += time.perf_counter() - start
+        self.segments_encoded += 1
+        return frames
+
+    async def segment_frames(self, recording: Recording, idx: int, protocol: Optional[str]) -> list:
+        """Frames del segmento `idx`: de la caché o codificados una sola vez en un hilo."""
+        key = (recording.recording_id, idx, protocol)
+        frames = self.frames.get(key)
+        if frames is not None:
+            return frames
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            frames = await asyncio.to_thread(self._encode, recording, idx, protocol)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        # Un segmento escrito no cambia nunca: vale para toda la vida del proceso
+        self.frames.set(key, frames)
+        future.set_result(frames)
+        return frames
+
+    async def stream(self, websocket, recording: Recording, protocol: Optional[str], speed: float = 1.0, start_s: float = 0.0) -> int:
+        """Envía la grabación al ritmo original (o acelerado); el inicio se redondea al segmento."""
+        speed = min(max(speed, MIN_REPLAY_SPEED), MAX_REPLAY_SPEED)
+        loop = asyncio.get_running_loop()
+        first = recording.segment_at(start_s * 1000)
+        if first >= len(recording.segments):
+            return 0
+        self.replays += 1
+        sent = 0
+        origin = base = None
+        upcoming = asyncio.ensure_future(self.segment_frames(recording, first, protocol))
+        try:
+            for idx in range(first, len(recording.segments)):
+                frames = await upcoming
+                # Mientras se envía este segmento se prepara el siguiente
+                if idx + 1 < len(recording.segments):
+                    upcoming = asyncio.ensure_future(self.segment_frames(recording, idx + 1, protocol))
+                for t_ms, frame in frames:
+                    if origin is None:
+                        origin, base = loop.time(), t_ms
+                    delay = origin + (t_ms - base) / 1000 / speed - loop.time()
+                    if delay < -REPLAY_MAX_LAG_S:
+                        # Cliente o servidor atrasados: se reprograma desde ahora en vez de enviar en ráfaga
+                        origin, base, delay = loop.time(), t_ms, 0
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    if isinstance(frame, str):
+                        await websocket.send_text(frame)
+                    else:
+                        await websocket.send_bytes(frame)
+                    sent += 1
+        finally:
+            if not upcoming.done():
+                upcoming.cancel()
+            self.frames_sent += sent
+        return sent
+
+    def stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "max_recordings": self.max_recordings,
+            "max_total_mb": round(self.max_total_bytes / (1024 * 1024), 1),
+            "open_recordings": len(self._recordings),
+            "segment_cache": self.frames.stats(),
+            "segments_encoded": self.segments_encoded,
+            "avg_segment_encode_ms": (
+                round(1000 * self.encode_seconds / self.segments_encoded, 2) if self.segments_encoded else 0.0
+            ),
+            "replays": self.replays,
+            "frames_sent": self.frames_sent,
+        }
@@ -0,0 +1,414 @@
+# -----------------------------------------------------
+# SALAS DE DIVINE FLOW (SIMULACIÓN COMPARTIDA + DIFUSIÓN)
+# -----------------------------------------------------
+# Cada sala tiene un único motor y una única tarea de fondo que avanza la
+# simulación a ritmo fijo. Los clientes sólo publican su última posición de
+# observador; el frame se serializa una vez por tick y los mismos bytes se
+# envían a todos los suscriptores. El costo de simular no crece con el
+# número de espectadores.
+#
+# Cada conexión tiene su propia tarea de envío con un buzón de un solo frame:
+# si el cliente va atrasado, el frame pendiente se reemplaza (y se cuenta como
+# descartado) en lugar de encolarse, y su ritmo de envío se adapta a la
+# latencia medida. Un cliente lento nunca frena la simulación ni a los demás.
+
+import asyncio
+import math
+import os
+import time
+from typing import Callable, Dict, Optional
+
+from fastapi import WebSocket
+
+from frame_protocol import BINARY_PROTOCOL, DELTA_PROTOCOL, BinaryFrameEncoder, encode_json_frame
+from quantum_engine import DEFAULT_PARTICLE_COUNT, QuantumEngine
+
+DEFAULT_TICK_HZ = float(os.getenv("DIVINE_FLOW_TICK_HZ", 50))
+MIN_CLIENT_HZ = float(os.getenv("DIVINE_FLOW_MIN_CLIENT_HZ", 5))
+DEFAULT_ROOM = "default"
+# Cada sala es una tarea de simulación a DEFAULT_TICK_HZ: se acota cuántas puede haber a la vez
+MAX_ROOMS = int(os.getenv("DIVINE_FLOW_MAX_ROOMS", 64))
+
+# Peso de la media móvil exponencial de la latencia de envío
+LATENCY_EWMA_ALPHA = 0.2
+
+
+def parse_observer_input(data: dict) -> Optional[dict]:
+    """Entrada de un cliente validada (x/y finitos, active bool); None si no es utilizable.
+
+    Las entradas de todos los clientes se suman en la tarea de la sala: un valor
+    que no sea numérico la detendría para todos los espectadores, no sólo para
+    quien lo envió.
+    """
+    try:
+        x = float(data.get("x", 50))
+        y = float(data.get("y", 50))
+    except (TypeError, ValueError):
+        return None
+    if not (math.isfinite(x) and math.isfinite(y)):
+        return None
+    active = data.get("active", False)
+    if not isinstance(active, (bool, int, float)):
+        return None
+    return {"x": x, "y": y, "active": bool(active)}
+
+
+def merge_observer_inputs(inputs: Dict[int, dict]) -> tuple:
+    """Fusiona las entradas de todos los observadores en un único punto de atracción.
+
+    Si hay observadores activos, el punto es el centroide de los activos y la
+    fuerza es la activa; si no, el centroide de todos con la fuerza en reposo.
+    Con un solo cliente el resultado es idéntico al bucle original.
+    """
+    if not inputs:
+        return 50, 50, False
+    active = [d for d in inputs.values() if d.get("active", False)]
+    pool = active or list(inputs.values())
+    obs_x = sum(d.get("x", 50) for d in pool) / len(pool)
+    obs_y = sum(d.get("y", 50) for d in pool) / len(pool)
+    return obs_x, obs_y, bool(active)
+
+
+class ClientChannel:
+    """Mitad de envío de una conexión: buzón de un frame, tarea propia y contadores."""
+
+    def __init__(self, websocket: WebSocket, protocol: Optional[str], tick_interval: float):
+        self.websocket = websocket
+        self.protocol = protocol
+        self.min_interval = tick_interval
+        self.max_interval = max(tick_interval, 1.0 / MIN_CLIENT_HZ)
+        self.send_interval = tick_interval
+        self.needs_keyframe = False
+        self.closed = False
+        self._pending = None
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.inputs_received = 0
+        self.send_latency_ms = 0.0
+        self.max_send_latency_ms = 0.0
+        self.bytes_sent = 0
+
+    @property
+    def wire_protocol(self) -> Optional[str]:
+        # Un cliente delta que perdió frames se resincroniza con un frame binario completo
+        if self.protocol == DELTA_PROTOCOL and self.needs_keyframe:
+            return BINARY_PROTOCOL
+        return self.protocol
+
+    @property
+    def queue_depth(self) -> int:
+        return 0 if self._pending is None else 1
+
+    def start(self, on_error) -> None:
+        self._task = asyncio.create_task(self._run(on_error))
+
+    def stop(self) -> None:
+        self.closed = True
+        if self._task is not None:
+            self._task.cancel()
+
+    def offer(self, frames: dict) -> None:
+        """Deja el frame más reciente en el buzón; el anterior sin enviar se descarta."""
+        if self._pending is not None:
+            self.frames_dropped += 1
+            if self.protocol == DELTA_PROTOCOL:
+                # Perder un delta rompe la continuidad: se espera al siguiente frame completo
+                self.needs_keyframe = True
+                self._pending = None
+        payload = frames.get(self.wire_protocol)
+        if payload is None:
+            # El frame completo de resincronización llega en el siguiente tick
+            return
+        if self.protocol == DELTA_PROTOCOL:
+            self.needs_keyframe = False
+        self._pending = payload
+        self._ready.set()
+
+    def _adapt(self, latency: float) -> None:
+        """Ajusta el ritmo de envío: el doble de la latencia media, acotado a [tick, 1/MIN_CLIENT_HZ]."""
+        latency_ms = latency * 1000
+        self.send_latency_ms += LATENCY_EWMA_ALPHA * (latency_ms - self.send_latency_ms)
+        self.max_send_latency_ms = max(self.max_send_latency_ms, latency_ms)
+        target = 2 * self.send_latency_ms / 1000
+        self.send_interval = min(max(target, self.min_interval), self.max_interval)
+
+    async def _run(self, on_error) -> None:
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                payload, self._pending = self._pending, None
+                if payload is None:
+                    continue
+
+                start = time.perf_counter()
+                if isinstance(payload, str):
+                    await self.websocket.send_text(payload)
+                else:
+                    await self.websocket.send_bytes(payload)
+                latency = time.perf_counter() - start
+                self.frames_sent += 1
+                self.bytes_sent += len(payload)
+                self._adapt(latency)
+
+                # Un cliente lento recibe menos frames en vez de acumular cola
+                remaining = self.send_interval - latency
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.closed = True
+            on_error()
+
+    def stats(self) -> dict:
+        return {
+            "protocol": self.protocol or "json",
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "inputs_received": self.inputs_received,
+            "bytes_sent": self.bytes_sent,
+            "queue_depth": self.queue_depth,
+            "send_latency_ms": round(self.send_latency_ms, 3),
+            "max_send_latency_ms": round(self.max_send_latency_ms, 3),
+            "send_hz": round(1.0 / self.send_interval, 2),
+        }
+
+
+class DivineFlowRoom:
+    """Sala aislada: un motor, una tarea de simulación y N suscriptores."""
+
+    def __init__(
+        self,
+        room_id: str,
+        particle_count: int = DEFAULT_PARTICLE_COUNT,
+        tick_hz: float = DEFAULT_TICK_HZ,
+        physics_mode: Optional[str] = None,
+    ):
+        self.room_id = room_id
+        self.engine = self.create_engine(particle_count, physics_mode)
+        self.tick_interval = 1.0 / tick_hz
+        self.subscribers: Dict[int, ClientChannel] = {}
+        self.inputs: Dict[int, dict] = {}
+        self.tick_count = 0
+        self._encoders = {
+            BINARY_PROTOCOL: BinaryFrameEncoder(particle_count),
+            DELTA_PROTOCOL: BinaryFrameEncoder(particle_count, delta=True),
+        }
+        self._task: Optional[asyncio.Task] = None
+        # Recibe la duración de cada tick (segundos); lo asigna el RoomManager
+        self.tick_observer: Optional[Callable[[float], None]] = None
+        # Grabación opcional de cada tick (divine_flow_recording.FrameRecorder)
+        self.recorder = None
+
+    def create_engine(self, particle_count: int, physics_mode: Optional[str]) -> QuantumEngine:
+        return QuantumEngine(particle_count, physics_mode=physics_mode)
+
+    def join(
+        self,
+        client_id: int,
+        websocket: WebSocket,
+        protocol: Optional[str] = None,
+        on_error: Optional[Callable[[], None]] = None,
+    ) -> ClientChannel:
+        """Suscribe un cliente; `on_error` se llama si su envío falla (por defecto sólo sale de la sala)."""
+        channel = ClientChannel(websocket, protocol, self.tick_interval)
+        self.subscribers[client_id] = channel
+        channel.start(on_error or (lambda: self.leave(client_id)))
+        if protocol == DELTA_PROTOCOL:
+            # El recién llegado necesita una base completa antes de aplicar deltas
+            self._encoders[DELTA_PROTOCOL].request_keyframe()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"divine-flow:{self.room_id}")
+        return channel
+
+    def leave(self, client_id: int) -> None:
+        channel = self.subscribers.pop(client_id, None)
+        if channel is not None:
+            channel.stop()
+        self.inputs.pop(client_id, None)
+
+    def set_physics_mode(self, mode: Optional[str]) -> bool:
+        """Cambia el modo de física de la sala; devuelve False si el modo no existe."""
+        try:
+            self.engine.set_physics_mode(mode)
+        except ValueError:
+            return False
+        return True
+
+    def update_input(self, client_id: int, data: dict) -> None:
+        # Sólo se conserva la entrada más reciente de cada cliente
+        self.inputs[client_id] = data
+        channel = self.subscribers.get(client_id)
+        if channel is not None:
+            channel.inputs_received += 1
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.subscribers
+
+    def encode_frame(self, protocol: Optional[str]):
+        if protocol is None:
+            return encode_json_frame(self.engine)
+        # Una sola copia por tick: los bytes se comparten entre todos los suscriptores
+        return bytes(self._encoders[protocol].encode(self.engine, self.tick_count))
+
+    async def advance(self, obs_x: float, obs_y: float, is_active: bool) -> None:
+        # En proceso; las salas repartidas entre workers sobrescriben este paso
+        self.engine.step(obs_x, obs_y, is_active)
+
+    async def tick(self) -> dict:
+        """Avanza la simulación y codifica el frame una vez por cada protocolo en uso."""
+        observer = merge_observer_inputs(self.inputs)
+        await self.advance(*observer)
+        self.tick_count += 1
+        if self.recorder is not None:
+            self.recorder.append(self.engine, self.tick_count, *observer)
+        protocols = {channel.wire_protocol for channel in self.subscribers.values()}
+        return {protocol: self.encode_frame(protocol) for protocol in protocols}
+
+    def broadcast(self, frames: dict) -> None:
+        # No espera a ningún cliente: cada canal envía desde su propia tarea
+        for channel in list(self.subscribers.values()):
+            channel.offer(frames)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        try:
+            while self.subscribers:
+                start = time.perf_counter()
+                frames = await self.tick()
+                if self.tick_observer is not None:
+                    self.tick_observer(time.perf_counter() - start)
+                self.broadcast(frames)
+                next_tick += self.tick_interval
+                delay = next_tick - loop.time()
+                if delay < 0:
+                    # Vamos atrasados: se reprograma desde ahora en lugar de acumular ticks
+                    next_tick = loop.time()
+                    delay = 0
+                await asyncio.sleep(delay)
+        except Exception as e:
+            # Una sala que no puede avanzar no debe dejar a sus clientes mirando un frame congelado:
+            # se les cierra la conexión y sus handlers la retiran del RoomManager
+            print(f"💥 La sala {self.room_id} de Divine Flow se detuvo: {e!r}")
+            for channel in list(self.subscribers.values()):
+                try:
+                    await channel.websocket.close(code=1011)
+                except Exception:
+                    pass
+        finally:
+            self._task = None
+
+    async def close(self) -> None:
+        for client_id in list(self.subscribers):
+            self.leave(client_id)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.stop_recording()
+        self.release()
+
+    def start_recording(self, recorder) -> bool:
+        """Empieza a grabar los ticks; False si la sala ya está grabando."""
+        if self.recorder is not None:
+            return False
+        self.recorder = recorder
+        return True
+
+    async def stop_recording(self):
+        """Cierra la grabación en curso (índice incluido) y la devuelve."""
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            await recorder.close()
+        return recorder
+
+    def release(self) -> None:
+        """Libera recursos externos de la sala (memoria compartida en salas repartidas)."""
+
+    def stats(self) -> dict:
+        return {
+            "room": self.room_id,
+            "particles": self.engine.count,
+            "tick_hz": round(1.0 / self.tick_interval, 2),
+            "tick_count": self.tick_count,
+            "physics_mode": self.engine.physics_mode,
+            "recording": self.recorder.stats() if self.recorder is not None else None,
+            "clients": {str(client_id): channel.stats() for client_id, channel in self.subscribers.items()},
+        }
+
+
+class RoomManager:
+    """Registro de salas activas; una sala se crea con su primer cliente y se libera con el último."""
+
+    def __init__(
+        self,
+        particle_count: int = DEFAULT_PARTICLE_COUNT,
+        tick_hz: float = DEFAULT_TICK_HZ,
+        room_factory: Callable[..., DivineFlowRoom] = DivineFlowRoom,
+        tick_observer: Optional[Callable[[float], None]] = None,
+        recorder_factory: Optional[Callable[[DivineFlowRoom], object]] = None,
+        max_rooms: int = MAX_ROOMS,
+    ):
+        self.particle_count = particle_count
+        self.tick_hz = tick_hz
+        self.room_factory = room_factory
+        self.tick_observer = tick_observer
+        # Devuelve el grabador de una sala recién creada (o None si no se graba)
+        self.recorder_factory = recorder_factory
+        self.max_rooms = max_rooms
+        self.rooms: Dict[str, DivineFlowRoom] = {}
+        self._next_client_id = 0
+        self._leaving = set()
+
+    def can_join(self, room_id: str) -> bool:
+        """False si unirse a `room_id` obligaría a crear una sala por encima de `max_rooms`."""
+        return room_id in self.rooms or len(self.rooms) < self.max_rooms
+
+    def join(
+        self,
+        room_id: str,
+        websocket: WebSocket,
+        protocol: Optional[str] = None,
+        physics_mode: Optional[str] = None,
+    ) -> tuple:
+        room = self.rooms.get(room_id)
+        if room is None:
+            room = self.rooms[room_id] = self.room_factory(room_id, self.particle_count, self.tick_hz)
+            room.tick_observer = self.tick_observer
+            if self.recorder_factory is not None:
+                room.start_recording(self.recorder_factory(room))
+        if physics_mode is not None:
+            room.set_physics_mode(physics_mode)
+        self._next_client_id += 1
+        client_id = self._next_client_id
+        # Si el envío falla, la salida pasa por el manager: una sala que se queda vacía se detiene y se retira
+        room.join(client_id, websocket, protocol, on_error=lambda: self._leave_later(room, client_id))
+        return room, client_id
+
+    def _leave_later(self, room: DivineFlowRoom, client_id: int) -> None:
+        task = asyncio.create_task(self.leave(room, client_id))
+        # Referencia fuerte hasta que termine (el event loop sólo guarda referencias débiles)
+        self._leaving.add(task)
+        task.add_done_callback(self._leaving.discard)
+
+    async def leave(self, room: DivineFlowRoom, client_id: int) -> None:
+        room.leave(client_id)
+        if room.is_empty and self.rooms.get(room.room_id) is room:
+            del self.rooms[room.room_id]
+            await room.close()
+
+    def stats(self) -> dict:
+        return {room_id: room.stats() for room_id, room in self.rooms.items()}
+
+    async def shutdown(self) -> None:
+        rooms, self.rooms = list(self.rooms.values()), {}
+        for room in rooms:
+            await room.close()
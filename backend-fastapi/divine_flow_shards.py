@@ -0,0 +1,307 @@
+# -----------------------------------------------------
+# REPARTO DE SALAS DE DIVINE FLOW ENTRE PROCESOS WORKER
+# -----------------------------------------------------
+# Con DIVINE_FLOW_SHARDS=N (>0) las simulaciones se ejecutan en N procesos.
+# Cada sala se asigna siempre al mismo worker (crc32 del id de la sala) y su
+# estado vive en un bloque de memoria compartida: el worker avanza el motor
+# directamente sobre ese bloque y el proceso que sirve los WebSockets lee las
+# mismas páginas para codificar los frames. Por la tubería sólo viajan
+# órdenes diminutas (sala, observador, modo); nunca listas de partículas.
+#
+# El acceso es en lockstep por sala: el servidor envía "step", espera la
+# respuesta y sólo entonces lee el estado, así que no hay lecturas a medias.
+
+import asyncio
+import itertools
+import multiprocessing
+import os
+import time
+import zlib
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, List, Optional
+
+from divine_flow_rooms import DEFAULT_TICK_HZ, DivineFlowRoom
+from quantum_engine import DEFAULT_PARTICLE_COUNT, STATE_FIELDS, QuantumEngine
+
+DEFAULT_SHARDS = int(os.getenv("DIVINE_FLOW_SHARDS", 0))
+
+
+def shard_for_room(room_id: str, shard_count: int) -> int:
+    """Ruteo estable sala -> worker (idéntico entre reinicios y procesos)."""
+    return zlib.crc32(room_id.encode("utf-8")) % shard_count
+
+
+def _worker_main(conn) -> None:
+    """Bucle del proceso worker: crea, avanza y libera motores sobre memoria compartida.
+
+    Cada respuesta es (request_id, segundos, error): un fallo en una orden se
+    devuelve al servidor en lugar de tumbar el worker con todas sus salas.
+    """
+    engines: Dict[str, QuantumEngine] = {}
+    blocks: Dict[str, SharedMemory] = {}
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            # El servidor se fue sin despedirse
+            break
+        if message is None:
+            break
+        command, request_id = message[0], message[1]
+        start = time.perf_counter()
+        try:
+            if command == "step":
+                _, _, room_id, obs_x, obs_y, is_active, physics_mode = message
+                engine = engines[room_id]
+                if engine.physics_mode != physics_mode:
+                    engine.set_physics_mode(physics_mode)
+                start = time.perf_counter()
+                engine.step(obs_x, obs_y, is_active)
+            elif command == "create":
+                _, _, room_id, shm_name, count, physics_mode = message
+                block = SharedMemory(name=shm_name)
+                blocks[room_id] = block
+                engines[room_id] = QuantumEngine(count, physics_mode=physics_mode, state_buffer=block.buf)
+            elif command == "close":
+                _, _, room_id = message
+                engine = engines.pop(room_id, None)
+                block = blocks.pop(room_id, None)
+                del engine
+                if block is not None:
+                    block.close()
+            else:
+                raise ValueError(f"Orden desconocida: {command}")
+            reply = (request_id, time.perf_counter() - start, None)
+        except Exception as e:
+            reply = (request_id, 0.0, f"{type(e).__name__}: {e}")
+        try:
+            conn.send(reply)
+        except (BrokenPipeError, OSError):
+            break
+    for block in blocks.values():
+        block.close()
+
+
+class ShardWorkerDied(ConnectionError):
+    """El proceso worker terminó: sus órdenes pendientes ya no tendrán respuesta."""
+
+
+class ShardCommandError(RuntimeError):
+    """Una orden falló dentro del worker (el worker sigue vivo)."""
+
+
+class ShardWorker:
+    """Extremo del servidor de un worker: envía órdenes y resuelve futuros al llegar las respuestas."""
+
+    def __init__(self, index: int, context, on_death: Optional[Callable[["ShardWorker"], None]] = None, restarts: int = 0):
+        self.index = index
+        self.on_death = on_death
+        self.dead = False
+        self.restarts = restarts
+        self._conn, child_conn = context.Pipe(duplex=True)
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn,), name=f"divine-flow-shard-{index}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self._ids = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.rooms = 0
+        self.steps = 0
+        self.step_seconds = 0.0
+
+    def _ensure_reader(self) -> None:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._loop.add_reader(self._conn.fileno(), self._on_readable)
+
+    def _on_readable(self) -> None:
+        try:
+            while self._conn.poll():
+                request_id, elapsed, error = self._conn.recv()
+                future = self._pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if error is None:
+                    future.set_result(elapsed)
+                else:
+                    future.set_exception(ShardCommandError(error))
+        except (EOFError, OSError):
+            # Tubería cerrada: el worker murió. Sin quitar el lector, poll() reportaría EOF sin fin
+            self._fail()
+
+    def _fail(self) -> None:
+        if self.dead:
+            return
+        self.dead = True
+        if self._loop is not None:
+            self._loop.remove_reader(self._conn.fileno())
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ShardWorkerDied(f"El worker {self.index} de Divine Flow terminó."))
+        print(f"💥 Worker {self.index} de Divine Flow caído (exitcode={self.process.exitcode}).")
+        if self.on_death is not None:
+            self.on_death(self)
+
+    def request(self, *message) -> asyncio.Future:
+        if self.dead:
+            raise ShardWorkerDied(f"El worker {self.index} de Divine Flow terminó.")
+        self._ensure_reader()
+        request_id = next(self._ids)
+        future = self._loop.create_future()
+        self._pending[request_id] = future
+        try:
+            self._conn.send((message[0], request_id) + message[1:])
+        except (BrokenPipeError, OSError):
+            self._fail()
+        return future
+
+    async def step(self, room_id: str, obs_x: float, obs_y: float, is_active: bool, physics_mode: Optional[str]) -> None:
+        elapsed = await self.request("step", room_id, float(obs_x), float(obs_y), bool(is_active), physics_mode)
+        self.steps += 1
+        self.step_seconds += elapsed
+
+    def stop(self) -> None:
+        if self._loop is not None and not self.dead:
+            self._loop.remove_reader(self._conn.fileno())
+        self._loop = None
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+        try:
+            self._conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "pid": self.process.pid,
+            "alive": self.process.is_alive() and not self.dead,
+            "rooms": self.rooms,
+            "restarts": self.restarts,
+            "steps": self.steps,
+            "avg_step_ms": round(self.step_seconds / self.steps * 1000, 3) if self.steps else 0.0,
+        }
+
+
+class ShardedDivineFlowRoom(DivineFlowRoom):
+    """Sala cuyo motor corre en un worker; aquí sólo quedan vistas sobre la memoria compartida."""
+
+    def __init__(self, pool: "ShardPool", room_id: str, *args, **kwargs):
+        self.pool = pool
+        self.worker = pool.worker_for(room_id)
+        self._block: Optional[SharedMemory] = None
+        self._created: Optional[asyncio.Future] = None
+        super().__init__(room_id, *args, **kwargs)
+
+    def create_engine(self, particle_count: int, physics_mode: Optional[str]) -> QuantumEngine:
+        self._block = SharedMemory(create=True, size=max(1, QuantumEngine.state_nbytes(particle_count)))
+        engine = QuantumEngine(particle_count, physics_mode=physics_mode, state_buffer=self._block.buf)
+        self.worker.rooms += 1
+        return engine
+
+    async def advance(self, obs_x: float, obs_y: float, is_active: bool) -> None:
+        worker = self.pool.worker_for(self.room_id)
+        if worker is not self.worker:
+            # El worker anterior murió y el pool lo reemplazó: la sala se recrea en el nuevo
+            self.worker.rooms -= 1
+            worker.rooms += 1
+            self.worker, self._created = worker, None
+        if self._created is None:
+            # Al crear el motor el worker inicializa el bloque: se conserva el estado que ya había
+            snapshot = [getattr(self.engine, field).copy() for field in STATE_FIELDS] if self.tick_count else None
+            # La tubería es FIFO: el primer "step" siempre llega después de "create"
+            self._created = self.worker.request(
+                "create", self.room_id, self._block.name, self.engine.count, self.engine.physics_mode
+            )
+            try:
+                await self._created
+            except ShardWorkerDied:
+                # Este tick se pierde; el siguiente va al worker de reemplazo
+                self._created = None
+                return
+            if snapshot is not None:
+                for field, values in zip(STATE_FIELDS, snapshot):
+                    getattr(self.engine, field)[:] = values
+        try:
+            await self.worker.step(self.room_id, obs_x, obs_y, is_active, self.engine.physics_mode)
+        except ShardWorkerDied:
+            pass
+
+    def release(self) -> None:
+        if self._block is None:
+            return
+        if self._created is not None and not self.worker.dead and self.worker.process.is_alive():
+            try:
+                future = self.worker.request("close", self.room_id)
+            except (BrokenPipeError, OSError, RuntimeError):
+                pass
+            else:
+                # Nadie espera la respuesta de "close": se descarta sin avisar de excepciones
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.worker.rooms -= 1
+        # Las vistas NumPy deben soltarse antes de cerrar el bloque
+        for field in STATE_FIELDS:
+            setattr(self.engine, field, None)
+        block, self._block = self._block, None
+        try:
+            block.close()
+        except BufferError:
+            pass
+        block.unlink()
+
+
+class ShardPool:
+    """Conjunto de procesos worker con ruteo consistente de salas."""
+
+    def __init__(self, shard_count: int = DEFAULT_SHARDS):
+        self.shard_count = max(1, shard_count)
+        self.workers: List[ShardWorker] = []
+        self._context = None
+
+    def start(self) -> None:
+        if self.workers:
+            return
+        # El rastreador de memoria compartida se hereda: los workers no duplican el registro
+        resource_tracker.ensure_running()
+        self._context = multiprocessing.get_context("spawn")
+        self.workers = [ShardWorker(index, self._context, self._replace) for index in range(self.shard_count)]
+        print(f"🪐 Divine Flow repartido en {self.shard_count} workers.")
+
+    def _replace(self, worker: ShardWorker) -> None:
+        """Arranca un worker nuevo en el lugar de uno caído; sus salas se recrean en su próximo tick."""
+        if self.workers[worker.index] is not worker:
+            return
+        worker.stop()
+        replacement = ShardWorker(worker.index, self._context, self._replace, worker.restarts + 1)
+        self.workers[worker.index] = replacement
+        print(f"🪐 Worker {worker.index} de Divine Flow reiniciado ({replacement.restarts} reinicios).")
+
+    def worker_for(self, room_id: str) -> ShardWorker:
+        self.start()
+        return self.workers[shard_for_room(room_id, self.shard_count)]
+
+    def create_room(
+        self,
+        room_id: str,
+        particle_count: int = DEFAULT_PARTICLE_COUNT,
+        tick_hz: float = DEFAULT_TICK_HZ,
+        physics_mode: Optional[str] = None,
+    ) -> ShardedDivineFlowRoom:
+        return ShardedDivineFlowRoom(self, room_id, particle_count, tick_hz, physics_mode)
+
+    def stop(self) -> None:
+        workers, self.workers = self.workers, []
+        for worker in workers:
+            worker.stop()
+
+    def stats(self) -> list:
+        return [worker.stats() for worker in self.workers]
@@ -0,0 +1,63 @@
+# -----------------------------------------------------
+# RESPUESTAS JSON RÁPIDAS (CODIFICADOR COMPILADO)
+# -----------------------------------------------------
+# Con `response_model`, FastAPI vuelve a validar cada respuesta con Pydantic,
+# la pasa por jsonable_encoder (que recorre y copia todo el árbol) y sólo
+# entonces la serializa con json.dumps. En /transmute (cientos de nodos) y en
+# Star Trip eso cuesta más que el propio cálculo.
+#
+# Los endpoints calientes construyen ya el dict con la forma exacta de su
+# modelo y devuelven FastJSONResponse: un solo paso por orjson, que además
+# codifica arrays y escalares de NumPy sin convertirlos antes a listas.
+# El `response_model` se conserva en el decorador sólo para la documentación
+# (OpenAPI no cambia). Sin el paquete `orjson` se usa json.dumps con la misma
+# salida compacta.
+
+import json
+from typing import Any
+
+import numpy as np
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # Opcional: sin orjson se cae a json.dumps (más lento, misma salida)
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # Tipos que ninguno de los dos codificadores conoce de serie
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Tipo no serializable a JSON: {type(value).__name__}")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(content: Any) -> bytes:
+        """JSON compacto en UTF-8 (sin escapar no-ASCII), con soporte directo de NumPy."""
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(content: Any) -> bytes:
+        """JSON compacto en UTF-8 (sin escapar no-ASCII), con soporte directo de NumPy."""
+        return json.dumps(
+            content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+def dumps_text(content: Any) -> str:
+    """Igual que dumps() pero como str, para WebSocket.send_text (mismo formato que send_json)."""
+    return dumps(content).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializada con dumps(): sin jsonable_encoder ni revalidación del modelo."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
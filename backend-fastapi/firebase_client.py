@@ -0,0 +1,112 @@
+# -----------------------------------------------------
+# CLIENTE DE FIRESTORE PEREZOSO (UNA SOLA INICIALIZACIÓN)
+# -----------------------------------------------------
+# firebase_admin y google-cloud-firestore tardan cientos de ms en importarse
+# y, sin credenciales, `firestore.client()` revienta el arranque. Aquí nada
+# se importa hasta que alguien pide el cliente con `get_db()`; la primera
+# llamada inicializa Firebase una única vez (archivo de credenciales o
+# variables de entorno sueltas) y las siguientes devuelven el mismo cliente.
+# Sin credenciales la API arranca igual en modo degradado: `get_db()`
+# devuelve None y lo que persiste en Firestore se omite. Un fallo con
+# credenciales (red, cuota) no queda fijado: se reintenta con backoff
+# exponencial y, mientras tanto, `firestore_unavailable()` lo indica.
+
+import os
+import threading
+import time
+from typing import Optional
+
+_lock = threading.Lock()
+_client = None
+_initialized = False
+_error: Optional[str] = None
+_init_seconds = 0.0
+_failures = 0
+_retry_at = 0.0
+
+FIREBASE_RETRY_BASE_S = float(os.getenv("FIREBASE_RETRY_BASE_S", 5))
+FIREBASE_RETRY_MAX_S = float(os.getenv("FIREBASE_RETRY_MAX_S", 300))
+
+
+def firebase_configured() -> bool:
+    """¿Hay credenciales? No importa nada: sirve para decidir sin pagar la inicialización."""
+    path = os.getenv("FIREBASE_CREDENTIALS_PATH")
+    return bool((path and os.path.exists(path)) or os.getenv("FIREBASE_PROJECT_ID"))
+
+
+def _certificate_source():
+    path = os.getenv("FIREBASE_CREDENTIALS_PATH")
+    if path and os.path.exists(path):
+        return path
+    # En Render las credenciales llegan como variables individuales (pestaña 'Environment')
+    return {
+        "type": "service_account",
+        "project_id": os.getenv("FIREBASE_PROJECT_ID"),
+        "private_key_id": os.getenv("FIREBASE_PRIVATE_KEY_ID"),
+        "private_key": os.getenv("FIREBASE_PRIVATE_KEY", "").replace('\\n', '\n'),
+        "client_email": os.getenv("FIREBASE_CLIENT_EMAIL"),
+        "client_id": os.getenv("FIREBASE_CLIENT_ID"),
+        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+        "client_x509_cert_url": os.getenv("FIREBASE_CLIENT_CERT_URL"),
+    }
+
+
+def _settled() -> bool:
+    # Hay cliente, no hay credenciales (no cambia en caliente) o aún no toca reintentar
+    return _initialized and (_client is not None or _error is None or time.monotonic() < _retry_at)
+
+
+def get_db():
+    """Cliente de Firestore, creado en la primera llamada; None en modo degradado o tras un fallo reciente."""
+    global _client, _initialized, _error, _init_seconds, _failures, _retry_at
+    if _settled():
+        return _client
+    with _lock:
+        if _settled():
+            return _client
+        start = time.perf_counter()
+        if not firebase_configured():
+            print("⚠️ Firebase sin credenciales: la API funciona en modo degradado (sin persistencia).")
+        else:
+            try:
+                import firebase_admin
+                from firebase_admin import credentials, firestore
+
+                if not firebase_admin._apps:
+                    firebase_admin.initialize_app(credentials.Certificate(_certificate_source()))
+                _client = firestore.client()
+                _error, _failures = None, 0
+                print("✅ Conexión a Firebase (Firestore) exitosa.")
+            except Exception as e:
+                _error = f"{type(e).__name__}: {e}"
+                _failures += 1
+                delay = min(FIREBASE_RETRY_MAX_S, FIREBASE_RETRY_BASE_S * 2 ** (_failures - 1))
+                _retry_at = time.monotonic() + delay
+                print(f"❌ Error CRÍTICO Firebase: {e} (reintento en {delay:g} s)")
+        _init_seconds = time.perf_counter() - start
+        _initialized = True
+        return _client
+
+
+def firestore_unavailable() -> bool:
+    """True si la última inicialización falló. Cuando ya toca reintentar, el reintento se lanza
+    en un hilo (nunca en el event loop) y, hasta que termine, se sigue considerando caído."""
+    if _client is not None or _error is None:
+        return False
+    if time.monotonic() >= _retry_at and not _lock.locked():
+        threading.Thread(target=get_db, name="firebase-retry", daemon=True).start()
+    return True
+
+
+def firebase_status() -> dict:
+    return {
+        "configured": firebase_configured(),
+        "initialized": _initialized,
+        "connected": _client is not None,
+        "init_s": round(_init_seconds, 3),
+        "error": _error,
+        "failures": _failures,
+        "retry_in_s": round(max(0.0, _retry_at - time.monotonic()), 1) if _client is None and _error else None,
+    }
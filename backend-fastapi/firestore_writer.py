@@ -0,0 +1,210 @@
+# -----------------------------------------------------
+# ESCRITURA DIFERIDA (WRITE-BEHIND) HACIA FIRESTORE
+# -----------------------------------------------------
+# El cliente de Firestore es síncrono: un `.set()` dentro de un endpoint
+# async bloquea el event loop (y con él todos los WebSockets) durante el
+# viaje de ida y vuelta. Aquí los endpoints sólo encolan el documento y
+# responden; un worker en segundo plano agrupa las escrituras en batches
+# (hasta MAX_BATCH documentos) y las confirma en un hilo.
+#
+# - Disparadores: tamaño (se alcanza `max_batch`) o tiempo (`flush_interval`).
+# - Memoria acotada: como mucho `max_pending` documentos en espera; las
+#   escrituras al mismo documento se fusionan (gana la última, igual que set()).
+# - Reintentos con backoff exponencial y jitter; tras `max_retries` el lote
+#   vuelve a la cola si hay sitio y, si no, se descarta y se cuenta.
+# - Al apagar se vacía la cola antes de cerrar.
+
+import asyncio
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+# Límite de operaciones por batch de Firestore
+FIRESTORE_BATCH_LIMIT = 500
+
+DEFAULT_MAX_BATCH = int(os.getenv("FIRESTORE_WRITE_BATCH", FIRESTORE_BATCH_LIMIT))
+DEFAULT_FLUSH_INTERVAL = float(os.getenv("FIRESTORE_FLUSH_INTERVAL_S", 0.5))
+DEFAULT_MAX_PENDING = int(os.getenv("FIRESTORE_MAX_PENDING", 20000))
+DEFAULT_MAX_RETRIES = int(os.getenv("FIRESTORE_MAX_RETRIES", 5))
+DEFAULT_BASE_BACKOFF = float(os.getenv("FIRESTORE_BASE_BACKOFF_S", 0.2))
+MAX_BACKOFF = 10.0
+
+
+def document_ref(db, path: Tuple[str, ...]):
+    """Ruta alterna colección/documento, p. ej. ('star_trip_results', uid, 'sessions', sid)."""
+    ref = db
+    for idx, segment in enumerate(path):
+        ref = ref.collection(segment) if idx % 2 == 0 else ref.document(segment)
+    return ref
+
+
+class FirestoreWriteBehind:
+    """Cola acotada de escrituras `set()` que un worker confirma en batches."""
+
+    def __init__(
+        self,
+        get_client: Callable[[], Any],
+        max_batch: int = DEFAULT_MAX_BATCH,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_backoff: float = DEFAULT_BASE_BACKOFF,
+    ):
+        # El cliente se pide en el hilo del commit: la inicialización perezosa no toca el event loop
+        self._get_client = get_client
+        self.max_batch = max(1, min(max_batch, FIRESTORE_BATCH_LIMIT))
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self._pending: "OrderedDict[Tuple[str, ...], Any]" = OrderedDict()
+        # Lote que se está confirmando ahora mismo (para peek())
+        self._inflight: dict = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.enqueued = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.dropped = 0
+        self.last_commit_ms = 0.0
+        self.last_error: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        # Durante drain() no se arranca otro worker: su bucle final confirma lo que llegue entretanto
+        if self._closing:
+            return
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, path: Tuple[str, ...], data: dict) -> bool:
+        """Encola un set(); devuelve False si la cola está llena (el llamador decide qué responder)."""
+        if path in self._pending:
+            self._pending[path] = data
+            self.coalesced += 1
+            return True
+        if len(self._pending) >= self.max_pending:
+            self.rejected += 1
+            return False
+        self._pending[path] = data
+        self.enqueued += 1
+        self.start()
+        if len(self._pending) >= self.max_batch and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def peek(self, path: Tuple[str, ...]) -> Optional[Any]:
+        """Último dato aún sin confirmar para `path` (en cola o en el lote en vuelo), o None."""
+        data = self._pending.get(path)
+        return self._inflight.get(path) if data is None else data
+
+    def _take_batch(self) -> list:
+        items = []
+        while self._pending and len(items) < self.max_batch:
+            items.append(self._pending.popitem(last=False))
+        return items
+
+    def _requeue(self, items: list) -> None:
+        # Lo que se escribió después para el mismo documento es más nuevo: no se pisa
+        for path, data in reversed(items):
+            if path in self._pending:
+                continue
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                continue
+            self._pending[path] = data
+            self._pending.move_to_end(path, last=False)
+
+    def _commit_sync(self, items: list) -> None:
+        db = self._get_client()
+        if db is None:
+            raise RuntimeError("Firestore no disponible")
+        batch = db.batch()
+        for path, data in items:
+            batch.set(document_ref(db, path), data)
+        batch.commit()
+
+    async def _commit(self, items: list, retries: int) -> bool:
+        self._inflight = dict(items)
+        try:
+            return await self._commit_with_retries(items, retries)
+        finally:
+            self._inflight = {}
+
+    async def _commit_with_retries(self, items: list, retries: int) -> bool:
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._commit_sync, items)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                if attempt == retries:
+                    break
+                self.retries += 1
+                delay = min(MAX_BACKOFF, self.base_backoff * (2 ** attempt))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                continue
+            self.last_commit_ms = (time.perf_counter() - start) * 1000
+            self.written += len(items)
+            self.batches += 1
+            return True
+        print(f"⚠️ Firestore: lote de {len(items)} escrituras fallido ({self.last_error}).")
+        return False
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending:
+                items = self._take_batch()
+                if not await self._commit(items, self.max_retries):
+                    self._requeue(items)
+                    break
+                if len(self._pending) < self.max_batch:
+                    break
+
+    async def drain(self, retries: int = 2) -> None:
+        """Detiene el worker y confirma todo lo pendiente (con pocos reintentos)."""
+        self._closing = True
+        task, self._task = self._task, None
+        if task is not None:
+            self._wakeup.set()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        while self._pending:
+            items = self._take_batch()
+            if not await self._commit(items, retries):
+                self.dropped += len(items) + len(self._pending)
+                self._pending.clear()
+        self._closing = False
+        if self.written:
+            print(f"💾 Firestore: cola vaciada ({self.written} escrituras en {self.batches} batches).")
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "written": self.written,
+            "batches": self.batches,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "last_commit_ms": round(self.last_commit_ms, 2),
+            "last_error": self.last_error,
+        }
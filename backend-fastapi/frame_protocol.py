@@ -0,0 +1,181 @@
+# -----------------------------------------------------
+# PROTOCOLO DE FRAMES DE DIVINE FLOW (JSON / BINARIO COMPACTO)
+# -----------------------------------------------------
+# JSON sigue siendo el formato por defecto del frontend actual. Un cliente
+# puede pedir el formato binario a través del subprotocolo WebSocket:
+#
+#   divine-flow.bin.v1    -> frame completo cuantizado en cada tick
+#   divine-flow.delta.v1  -> sólo las partículas que se movieron más que el
+#                            umbral, con frames clave periódicos (o cuando
+#                            el delta pesaría más que el frame completo)
+#
+# Disposición del frame (little-endian, columnar):
+#
+#   cabecera (16 bytes): magic "DF" | version u8 | flags u8 | tick u32 | count u32 | total u32
+#   ids      u32[count]  (sólo en frames delta, sin FLAG_KEYFRAME)
+#   x        u16[count]  (0..100 -> 0..65535)
+#   y        u16[count]
+#   energy   u8[count]   (energy * 100, saturado en 255)
+
+import json
+import struct
+from typing import Iterable, Optional
+
+import numpy as np
+
+from quantum_engine import DOMAIN_SIZE
+
+BINARY_PROTOCOL = "divine-flow.bin.v1"
+DELTA_PROTOCOL = "divine-flow.delta.v1"
+SUPPORTED_PROTOCOLS = (BINARY_PROTOCOL, DELTA_PROTOCOL)
+
+MAGIC = b"DF"
+VERSION = 1
+FLAG_DELTA = 0x01
+FLAG_KEYFRAME = 0x02
+
+HEADER = struct.Struct("<2sBBIII")
+POSITION_SCALE = 65535.0 / DOMAIN_SIZE
+ENERGY_SCALE = 100.0
+
+# Umbral por defecto de los frames delta: ~0.1 unidades del dominio
+DEFAULT_DELTA_THRESHOLD = 66
+DEFAULT_KEYFRAME_INTERVAL = 50
+
+
+def negotiate_protocol(requested: Iterable[str]) -> Optional[str]:
+    """Devuelve el primer subprotocolo binario soportado que pidió el cliente, o None (JSON)."""
+    for protocol in requested:
+        if protocol in SUPPORTED_PROTOCOLS:
+            return protocol
+    return None
+
+
+def encode_json_frame(engine) -> str:
+    # Mismos separadores que WebSocket.send_json para no cambiar el formato del frontend
+    return json.dumps({"particles": engine.particles}, separators=(",", ":"), ensure_ascii=False)
+
+
+class BinaryFrameEncoder:
+    """Codifica el estado del motor en un buffer preasignado que se reutiliza en cada tick.
+
+    Las columnas se escriben directamente sobre vistas NumPy del buffer, sin
+    listas ni dicts intermedios. `encode` devuelve un memoryview válido hasta
+    la siguiente llamada.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        delta: bool = False,
+        threshold: int = DEFAULT_DELTA_THRESHOLD,
+        keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+    ):
+        self.capacity = capacity
+        self.delta = delta
+        self.threshold = threshold
+        self.keyframe_interval = keyframe_interval
+        self._buffer = bytearray(HEADER.size + capacity * (4 + 2 + 2 + 1))
+        self._view = memoryview(self._buffer)
+        self._qx = np.empty(capacity, dtype=np.uint16)
+        self._qy = np.empty(capacity, dtype=np.uint16)
+        self._qe = np.empty(capacity, dtype=np.uint8)
+        self._scratch = np.empty(capacity, dtype=np.float32)
+        # Última posición transmitida de cada partícula (referencia de los deltas)
+        self._ref_x = np.zeros(capacity, dtype=np.int32)
+        self._ref_y = np.zeros(capacity, dtype=np.int32)
+        self._frames_since_key = None
+
+    def request_keyframe(self) -> None:
+        self._frames_since_key = None
+
+    def _quantize(self, values: np.ndarray, scale: float, limit: int, out: np.ndarray) -> None:
+        scratch = self._scratch[: len(values)]
+        np.multiply(values, scale, out=scratch)
+        scratch += 0.5
+        np.clip(scratch, 0, limit, out=scratch)
+        np.copyto(out, scratch, casting="unsafe")
+
+    def _columns(self, offset: int, count: int, with_ids: bool) -> tuple:
+        ids = None
+        if with_ids:
+            ids = np.frombuffer(self._buffer, dtype="<u4", count=count, offset=offset)
+            offset += 4 * count
+        x = np.frombuffer(self._buffer, dtype="<u2", count=count, offset=offset)
+        y = np.frombuffer(self._buffer, dtype="<u2", count=count, offset=offset + 2 * count)
+        energy = np.frombuffer(self._buffer, dtype="u1", count=count, offset=offset + 4 * count)
+        return ids, x, y, energy, offset + 5 * count
+
+    def encode(self, engine, tick: int) -> memoryview:
+        n = engine.count
+        qx, qy, qe = self._qx[:n], self._qy[:n], self._qe[:n]
+        self._quantize(engine.x, POSITION_SCALE, 65535, qx)
+        self._quantize(engine.y, POSITION_SCALE, 65535, qy)
+        self._quantize(engine.energy, ENERGY_SCALE, 255, qe)
+
+        idx = None
+        keyframe = (
+            not self.delta
+            or self._frames_since_key is None
+            or self._frames_since_key >= self.keyframe_interval
+        )
+        if not keyframe:
+            moved = np.abs(qx - self._ref_x[:n]) > self.threshold
+            moved |= np.abs(qy - self._ref_y[:n]) > self.threshold
+            idx = np.flatnonzero(moved)
+            # Si el delta (9 bytes/partícula) pesa más que un frame completo (5), se envía el completo
+            keyframe = len(idx) * 9 >= n * 5
+
+        if keyframe:
+            flags = FLAG_KEYFRAME
+            _, x, y, energy, end = self._columns(HEADER.size, n, with_ids=False)
+            x[:] = qx
+            y[:] = qy
+            energy[:] = qe
+            count = n
+            self._frames_since_key = 0
+            if self.delta:
+                self._ref_x[:n] = qx
+                self._ref_y[:n] = qy
+        else:
+            flags = 0
+            count = len(idx)
+            ids, x, y, energy, end = self._columns(HEADER.size, count, with_ids=True)
+            ids[:] = engine.ids[idx]
+            np.take(qx, idx, out=x)
+            np.take(qy, idx, out=y)
+            np.take(qe, idx, out=energy)
+            self._ref_x[idx] = x
+            self._ref_y[idx] = y
+            self._frames_since_key += 1
+
+        if self.delta:
+            flags |= FLAG_DELTA
+        HEADER.pack_into(self._buffer, 0, MAGIC, VERSION, flags, tick & 0xFFFFFFFF, count, n)
+        return self._view[:end]
+
+
+def decode_frame(data) -> dict:
+    """Decodifica un frame binario (referencia para clientes y benchmarks)."""
+    magic, version, flags, tick, count, total = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Frame de Divine Flow inválido")
+    offset = HEADER.size
+    keyframe = bool(flags & FLAG_KEYFRAME)
+    if keyframe:
+        ids = np.arange(count, dtype=np.uint32)
+    else:
+        ids = np.frombuffer(data, dtype="<u4", count=count, offset=offset)
+        offset += 4 * count
+    x = np.frombuffer(data, dtype="<u2", count=count, offset=offset)
+    y = np.frombuffer(data, dtype="<u2", count=count, offset=offset + 2 * count)
+    energy = np.frombuffer(data, dtype="u1", count=count, offset=offset + 4 * count)
+    return {
+        "tick": tick,
+        "total": total,
+        "keyframe": keyframe,
+        "ids": ids,
+        "x": x / POSITION_SCALE,
+        "y": y / POSITION_SCALE,
+        "energy": energy / ENERGY_SCALE,
+    }
@@ -0,0 +1,126 @@
+# -----------------------------------------------------
+# DETECTOR DE PALABRAS CLAVE EN UNA SOLA PASADA (AHO-CORASICK)
+# -----------------------------------------------------
+# Un autómata multipatrón compilado una vez al arrancar encuentra todas las
+# palabras del léxico (frecuencias + vibras) recorriendo el texto una sola
+# vez, sin importar cuántos términos tenga el diccionario. La coincidencia
+# es por subcadena, igual que el `word in text_lower` original.
+
+import json
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Orden de precedencia de las vibras: gana la primera categoría con algún acierto
+VIBE_PRECEDENCE = ("DARK_EMOTION", "FUN_EMOTION", "HARMONIC_LIGHT", "CHAOTIC_VOID")
+DEFAULT_VIBE = "SACRED_GEOMETRY"
+
+
+class KeywordAutomaton:
+    """Autómata Aho-Corasick sobre caracteres; `search` admite estado para procesar por trozos."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        for pattern in dict.fromkeys(patterns):
+            if pattern:
+                self._add(pattern)
+        self._build_failure_links()
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] += (len(self.patterns),)
+        self.patterns.append(pattern)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # Las salidas se heredan del enlace de fallo: cada estado ya sabe todo lo que reconoce
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def search(self, text: str, state: int = 0, hits: Optional[Set[int]] = None) -> Tuple[int, Set[int]]:
+        """Recorre `text` desde `state` y acumula en `hits` los índices de patrón encontrados."""
+        if hits is None:
+            hits = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                hits.update(out[state])
+        return state, hits
+
+    def find(self, text: str) -> Set[str]:
+        _, hits = self.search(text)
+        return {self.patterns[idx] for idx in hits}
+
+
+class CosmicLexicon:
+    """Léxico de Cosmic Architect: palabras vibracionales y palabras de cada vibra, en un solo autómata."""
+
+    def __init__(self, vibrational: Dict[str, dict], vibes: Dict[str, Iterable[str]]):
+        # Las claves se normalizan a minúsculas porque el texto se compara en minúsculas
+        self.vibrational: Dict[str, dict] = {}
+        for word, data in vibrational.items():
+            self.vibrational.setdefault(word.lower(), data)
+        self.vibes: Dict[str, Set[str]] = {
+            category: {word.lower() for word in vibes.get(category, ())} for category in VIBE_PRECEDENCE
+        }
+        self._vibrational_words = list(self.vibrational)
+        self._vibrational_order = {word: idx for idx, word in enumerate(self._vibrational_words)}
+        terms = list(self.vibrational)
+        for category in VIBE_PRECEDENCE:
+            terms.extend(sorted(self.vibes[category]))
+        self.automaton = KeywordAutomaton(terms)
+
+    @classmethod
+    def from_file(cls, path: str, vibrational: Dict[str, dict], vibes: Dict[str, Iterable[str]]) -> "CosmicLexicon":
+        """Carga un JSON {"vibrational": {...}, "vibes": {"DARK_EMOTION": [...]}} que extiende los valores base."""
+        with open(path, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        merged_vibrational = dict(vibrational)
+        merged_vibrational.update(data.get("vibrational", {}))
+        merged_vibes = {category: list(vibes.get(category, ())) for category in VIBE_PRECEDENCE}
+        for category, words in data.get("vibes", {}).items():
+            if category not in merged_vibes:
+                raise ValueError(f"Categoría de vibra desconocida en el léxico: {category}")
+            merged_vibes[category].extend(words)
+        return cls(merged_vibrational, merged_vibes)
+
+    def scan(self, text_lower: str) -> Set[str]:
+        return self.automaton.find(text_lower)
+
+    def hits_from_indices(self, indices: Iterable[int]) -> Set[str]:
+        patterns = self.automaton.patterns
+        return {patterns[idx] for idx in indices}
+
+    def vibrational_matches(self, hits: Set[str]) -> List[Tuple[str, dict]]:
+        # Orden del diccionario (afecta al orden de los elementos detectados), sin recorrerlo entero
+        order = self._vibrational_order
+        matched = sorted((order[word] for word in hits if word in order))
+        return [(self._vibrational_words[idx], self.vibrational[self._vibrational_words[idx]]) for idx in matched]
+
+    def classify(self, hits: Set[str]) -> str:
+        for category in VIBE_PRECEDENCE:
+            if not self.vibes[category].isdisjoint(hits):
+                return category
+        return DEFAULT_VIBE
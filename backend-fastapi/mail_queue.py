@@ -0,0 +1,343 @@
+# -----------------------------------------------------
+# COLA DE CORREO SALIENTE CON POOL SMTP Y SPOOL EN DISCO
+# -----------------------------------------------------
+# El formulario de contacto ya no abre un SMTP_SSL (handshake TLS + login)
+# por mensaje: el endpoint deja el mensaje en el spool y responde, y unos
+# pocos workers lo entregan reutilizando conexiones ya autenticadas.
+#
+# - Spool: un JSON por mensaje (escritura atómica con os.replace y fsync del
+#   archivo y del directorio, en un hilo: el endpoint responde cuando el
+#   mensaje ya es durable). Se borra al entregarse; al arrancar se recarga lo
+#   pendiente, así que ni un reinicio ni una caída pierden mensajes. Los
+#   rechazos definitivos van a `failed/`.
+# - Concurrencia acotada: tantos workers como conexiones del pool, en un
+#   executor propio (no ocupan el pool de hilos por defecto de asyncio).
+# - Reintentos con backoff exponencial para errores transitorios; la
+#   conexión que falla se descarta y la siguiente se abre de nuevo.
+
+import asyncio
+import json
+import os
+import smtplib
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+SMTP_HOST = os.getenv("ZOHO_SMTP_HOST", "smtp.zoho.com")
+SMTP_PORT = int(os.getenv("ZOHO_SMTP_PORT", 465))
+MAIL_SPOOL_DIR = os.getenv("MAIL_SPOOL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "mail_spool"))
+MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", 2))
+MAIL_QUEUE_MAX = int(os.getenv("MAIL_QUEUE_MAX", 10000))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 8))
+MAIL_BASE_BACKOFF_S = float(os.getenv("MAIL_BASE_BACKOFF_S", 2.0))
+MAIL_MAX_BACKOFF_S = 600.0
+# Conexiones inactivas más tiempo que esto se comprueban con NOOP antes de reusarse
+MAIL_IDLE_CHECK_S = float(os.getenv("MAIL_IDLE_CHECK_S", 30))
+MAIL_DRAIN_TIMEOUT_S = float(os.getenv("MAIL_DRAIN_TIMEOUT_S", 10))
+
+
+def _is_permanent(error: Exception) -> bool:
+    # Respuestas 5xx del servidor (destinatario o contenido rechazados): reintentar no sirve
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600 and not isinstance(error, smtplib.SMTPAuthenticationError)
+    return False
+
+
+def _fsync_dir(path: str) -> None:
+    if os.name != "posix":
+        # Windows no permite abrir un directorio para hacerle fsync
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SMTPConnectionPool:
+    """Conexiones SMTP autenticadas reutilizables; se usan desde hilos del executor."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        size: int = MAIL_POOL_SIZE,
+        connect: Optional[Callable[[str, int], smtplib.SMTP]] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = size
+        self._connect = connect or (lambda host, port: smtplib.SMTP_SSL(host, port, timeout=30))
+        self._idle: List[tuple] = []
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    def acquire(self) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                break
+            server, released_at = entry
+            if time.monotonic() - released_at < MAIL_IDLE_CHECK_S:
+                self.reused += 1
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    self.reused += 1
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.discard(server)
+        server = self._connect(self.host, self.port)
+        server.login(self.user, self.password)
+        self.opened += 1
+        return server
+
+    def release(self, server: smtplib.SMTP) -> None:
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((server, time.monotonic()))
+                return
+        self.discard(server)
+
+    def discard(self, server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self.discard(server)
+
+
+class MailQueue:
+    """Cola persistente de correo saliente entregada por `workers` tareas en segundo plano."""
+
+    def __init__(
+        self,
+        pool: SMTPConnectionPool,
+        spool_dir: str = MAIL_SPOOL_DIR,
+        workers: int = MAIL_POOL_SIZE,
+        max_queued: int = MAIL_QUEUE_MAX,
+        max_attempts: int = MAIL_MAX_ATTEMPTS,
+        base_backoff: float = MAIL_BASE_BACKOFF_S,
+    ):
+        self.pool = pool
+        self.spool_dir = spool_dir
+        self.failed_dir = os.path.join(spool_dir, "failed")
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._timers: List[asyncio.TimerHandle] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._spooled = 0
+        self._in_flight = 0
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+        self.rejected = 0
+        self.spool_errors = 0
+        self.last_error: Optional[str] = None
+
+    def _path(self, message_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{message_id}.json")
+
+    def _write(self, record: dict) -> None:
+        """Escritura durable (bloqueante: se llama desde un hilo)."""
+        path = self._path(record["id"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(record, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+        # Sin fsync del directorio el rename puede perderse en una caída
+        _fsync_dir(self.spool_dir)
+
+    def _read(self, message_id: str) -> Optional[dict]:
+        try:
+            with open(self._path(message_id), "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        os.makedirs(self.failed_dir, exist_ok=True)
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="smtp")
+        # Lo que quedó en el spool de una ejecución anterior se reprograma
+        pending = []
+        for name in os.listdir(self.spool_dir):
+            if name.endswith(".json"):
+                record = self._read(name[:-5])
+                if record is not None:
+                    pending.append(record)
+        pending.sort(key=lambda record: record["created_at"])
+        for record in pending:
+            self._schedule(record["id"], max(0.0, record.get("next_attempt_at", 0) - time.time()))
+        self._spooled = len(pending)
+        if pending:
+            print(f"📬 Cola de correo: {len(pending)} mensajes recuperados del spool.")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def enqueue(self, sender: str, recipients: List[str], raw_message: str) -> Optional[str]:
+        """Guarda el mensaje en el spool (ya en disco al volver) y lo encola; None si la cola está llena."""
+        if self._spooled >= self.max_queued:
+            self.rejected += 1
+            return None
+        self.start()
+        record = {
+            "id": uuid.uuid4().hex,
+            "from": sender,
+            "to": recipients,
+            "raw": raw_message,
+            "attempts": 0,
+            "created_at": time.time(),
+            "next_attempt_at": 0,
+        }
+        # Se cuenta antes de esperar al disco para que max_queued valga también con escrituras concurrentes
+        self._spooled += 1
+        try:
+            await asyncio.to_thread(self._write, record)
+        except OSError:
+            self._spooled -= 1
+            raise
+        self._queue.put_nowait(record["id"])
+        return record["id"]
+
+    def _schedule(self, message_id: str, delay: float) -> None:
+        if delay <= 0:
+            self._queue.put_nowait(message_id)
+            return
+        loop = asyncio.get_running_loop()
+        self._timers.append(loop.call_later(delay, self._queue.put_nowait, message_id))
+        self._timers = [timer for timer in self._timers if not timer.cancelled() and timer.when() > loop.time()]
+
+    def _deliver(self, record: dict) -> None:
+        server = self.pool.acquire()
+        try:
+            server.sendmail(record["from"], record["to"], record["raw"])
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+            # El servidor respondió: la conexión sigue sana, sólo falló este mensaje
+            try:
+                server.rset()
+            except (smtplib.SMTPException, OSError):
+                self.pool.discard(server)
+            else:
+                self.pool.release(server)
+            raise
+        except Exception:
+            self.pool.discard(server)
+            raise
+        self.pool.release(server)
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            message_id = await self._queue.get()
+            record = await asyncio.to_thread(self._read, message_id)
+            if record is None:
+                # Borrado o ilegible: deja de contar como pendiente para que drain() no lo espere
+                self._spooled -= 1
+                print(f"⚠️ Cola de correo: mensaje {message_id} ilegible en el spool, se omite.")
+                continue
+            self._in_flight += 1
+            try:
+                await self._attempt(loop, message_id, record)
+            except Exception as e:
+                # Un fallo inesperado no debe parar el worker: la cola seguiría aceptando sin entregar
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"⚠️ Cola de correo: error procesando {message_id} ({self.last_error}).")
+            finally:
+                self._in_flight -= 1
+
+    async def _attempt(self, loop, message_id: str, record: dict) -> None:
+        try:
+            await loop.run_in_executor(self._executor, self._deliver, record)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            record["attempts"] += 1
+            if _is_permanent(e) or record["attempts"] >= self.max_attempts:
+                self._spooled -= 1
+                self.failed += 1
+                print(f"❌ Cola de correo: mensaje {message_id} descartado ({self.last_error}).")
+                await self._spool_op(message_id, os.replace, self._path(message_id),
+                                     os.path.join(self.failed_dir, f"{message_id}.json"))
+                return
+            delay = min(MAIL_MAX_BACKOFF_S, self.base_backoff * (2 ** (record["attempts"] - 1)))
+            record["next_attempt_at"] = time.time() + delay
+            if not await self._spool_op(message_id, self._write, record):
+                # Sin el intento apuntado en disco no se reprograma aquí: se retoma en el próximo arranque
+                self._spooled -= 1
+                return
+            self.retries += 1
+            self._schedule(message_id, delay)
+            return
+        self._spooled -= 1
+        self.sent += 1
+        await self._spool_op(message_id, os.remove, self._path(message_id))
+
+    async def _spool_op(self, message_id: str, operation, *args) -> bool:
+        """Operación de disco sobre el spool en un hilo; un OSError se registra y devuelve False."""
+        try:
+            await asyncio.to_thread(operation, *args)
+        except OSError as e:
+            self.spool_errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Cola de correo: error de spool con {message_id} ({self.last_error}).")
+            return False
+        return True
+
+    async def drain(self, timeout: float = MAIL_DRAIN_TIMEOUT_S) -> None:
+        """Espera (con límite) a que se entregue lo pendiente, reintentos incluidos; el resto sigue en el spool."""
+        if not self._tasks:
+            return
+        deadline = time.monotonic() + timeout
+        while self._spooled:
+            if time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(0.05)
+        for timer in self._timers:
+            timer.cancel()
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Esperar al envío en curso (y cerrar las conexiones con QUIT) bloquea: fuera del event loop
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+        await asyncio.to_thread(self.pool.close)
+        if self._spooled:
+            print(f"📪 Cola de correo: {self._spooled} mensajes quedan en el spool para el próximo arranque.")
+
+    def stats(self) -> dict:
+        return {
+            "spooled": self._spooled,
+            "ready": self._queue.qsize() if self._queue else 0,
+            "max_queued": self.max_queued,
+            "sent": self.sent,
+            "retries": self.retries,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "spool_errors": self.spool_errors,
+            "connections_opened": self.pool.opened,
+            "connections_reused": self.pool.reused,
+            "last_error": self.last_error,
+        }
@@ -1,24 +1,61 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response, JSONResponse 
-from pydantic import BaseModel
-from typing import List, Literal, Optional 
-import firebase_admin
-from firebase_admin import credentials, firestore
+from fastapi.responses import Response, JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional 
 import os 
 from dotenv import load_dotenv 
 import time
-import random
-import math
 import asyncio
 import json
-# --- Importaciones para el motor de arte (Optimizadas) ---
+from contextlib import asynccontextmanager
+
+# .env se carga antes que los módulos locales: varios leen su configuración con os.getenv al importarse
+load_dotenv() 
+
+# --- NumPy es el núcleo de Divine Flow, Cosmic Architect y Star Trip: se carga siempre ---
 import numpy as np 
-from PIL import Image 
-from io import BytesIO 
-import requests 
-import base64
-import re 
+# Firebase, SMTP y el rasterizado se importan sólo cuando un endpoint los necesita
+from firebase_client import firebase_configured, firebase_status, firestore_unavailable, get_db
+
+# --- Control de admisión: límites por cliente y por ruta antes de enrutar ---
+from admission import WS_TRY_AGAIN_LATER, AdmissionController, AdmissionMiddleware
+
+# --- Métricas estilo Prometheus: latencias, lag del event loop y perfilador por muestreo ---
+from metrics import (
+    PROFILER_ENABLED, TICK_BUCKETS, LoopLagMonitor, MetricsMiddleware, MetricsRegistry, SamplingProfiler,
+)
+
+# --- Motor vectorizado de partículas y salas compartidas de Divine Flow ---
+from divine_flow_rooms import DEFAULT_ROOM, DivineFlowRoom, RoomManager, parse_observer_input
+from divine_flow_shards import DEFAULT_SHARDS, ShardPool
+from frame_protocol import negotiate_protocol
+# Grabación columnar de salas y repetición sin simular
+from divine_flow_recording import FrameRecorder, ReplayLibrary, new_recording_id, recording_path, should_record
+
+# --- Caché LRU con TTL y geometría vectorizada para Cosmic Architect ---
+from cosmic_cache import TTLCache
+from cosmic_geometry import generate_advanced_cosmic_geometry, generate_geometry_batch
+from keyword_matcher import CosmicLexicon
+from transmutation_stream import TransmutationStream
+from mandala_render import MAX_RENDER_SIZE, MEDIA_TYPES, MIN_RENDER_SIZE, RENDER_VERSION, encode_image, render_mandala
+from render_cache import RenderCache, content_key, etag_matches
+# Serialización JSON compilada (orjson) para las respuestas calientes
+from fast_json import FastJSONResponse, dumps_text
+
+# --- Catálogo pre-codificado del oráculo (hologramas y misterios) ---
+from content_store import ContentStore
+
+# --- Escritura diferida en batches hacia Firestore (Star Trip) ---
+from firestore_writer import FirestoreWriteBehind
+
+# --- Análisis espectral vectorizado de las sesiones de Star Trip ---
+from star_trip_analysis import DEFAULT_SAMPLE_RATE_HZ, MAX_SAMPLE_RATE_HZ, analyze_session, finite_samples, samples_from_bytes
+from star_trip_ingest import MAX_CHUNK_BYTES, IngestError, IngestSessionStore
+# Historial y estadísticas por usuario con agregados precalculados
+from star_trip_history import HISTORY_RECENT_SESSIONS, MAX_HISTORY_PAGE, HistoryError, StarTripHistory
+# Síntesis de la sinfonía en el servidor (PCM/WAV por bloques) con caché de clips
+from symphony_audio import DEFAULT_SAMPLE_RATE, MAX_NOTES, MAX_RENDER_MINUTES, MEDIA_TYPES as AUDIO_MEDIA_TYPES, SymphonyClipCache, SymphonyRenderer
 
 # --- IMPORTACIONES DE TENSORFLOW (Eliminar o comentar todas estas) ---
 # import tensorflow as tf                                           ### COMENTAR ESTO
@@ -27,7 +64,6 @@ import re
 # from tensorflow.python.framework.errors_impl import NotFoundError as TFNotFoundError ### COMENTAR ESTO
 
 # --- Importaciones añadidas para el puente SMTP de Zoho ---
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
@@ -35,58 +71,38 @@ from email.mime.multipart import MIMEMultipart
 # 1. SETUP INICIAL
 # -----------------------------------------------------
 
-load_dotenv() 
-app = FastAPI(title="Cosmic Imagination API - Divine Flow Interstellar", version="5.1.0")
-
-# Inicialización de Firebase
-try:
-    SERVICE_ACCOUNT_PATH = os.getenv("FIREBASE_CREDENTIALS_PATH")
-    db = None 
-    if SERVICE_ACCOUNT_PATH and os.path.exists(SERVICE_ACCOUNT_PATH):
-        cred = credentials.Certificate(SERVICE_ACCOUNT_PATH)
-        if not firebase_admin._apps:
-            firebase_admin.initialize_app(cred)
-        db = firestore.client()
-        print("✅ Conexión a Firebase (Firestore) exitosa.")
-    else:
-        print("❌ Firebase no inicializado.")
-except Exception as e:
-    print(f"❌ Error CRÍTICO Firebase: {e}")
-    db = None
-
-
-# --- INICIALIZACIÓN SEGURA DE FIREBASE ---
-def inicializar_firebase():
-    try:
-        # Intentamos obtener las variables de entorno
-        # Si estás en Render, estas deben estar definidas en la pestaña 'Environment'
-        project_id = os.getenv("FIREBASE_PROJECT_ID")
-        
-        if project_id:
-            # Opción A: Configuración desde variables individuales
-            cred = credentials.Certificate({
-                "type": "service_account",
-                "project_id": project_id,
-                "private_key_id": os.getenv("FIREBASE_PRIVATE_KEY_ID"),
-                "private_key": os.getenv("FIREBASE_PRIVATE_KEY", "").replace('\\n', '\n'),
-                "client_email": os.getenv("FIREBASE_CLIENT_EMAIL"),
-                "client_id": os.getenv("FIREBASE_CLIENT_ID"),
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-                "client_x509_cert_url": os.getenv("FIREBASE_CLIENT_CERT_URL")
-            })
-            firebase_admin.initialize_app(cred)
-            print("✅ Firebase inicializado desde variables de entorno.")
-        else:
-            # Opción B: Fallback (solo si el archivo existiera, pero no es tu caso)
-            print("⚠️ No se encontraron variables de entorno para Firebase.")
-            
-    except Exception as e:
-        print(f"❌ Error al inicializar Firebase: {e}")
-
-inicializar_firebase()
-db = firestore.client()
+# Calentar Firebase en segundo plano al arrancar (la API responde mientras tanto)
+FIREBASE_WARMUP = os.getenv("FIREBASE_WARMUP", "1") not in ("0", "false", "False")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if FIREBASE_WARMUP and firebase_configured():
+        asyncio.get_running_loop().run_in_executor(None, get_db)
+    loop_lag_monitor.start()
+    await start_divine_flow_shards()
+    await start_star_trip_writer()
+    await resume_mail_queue()
+    content_store.start()
+    yield
+    await content_store.stop()
+    await drain_mail_queue()
+    await drain_star_trip_writer()
+    await shutdown_divine_flow_rooms()
+    profiler.stop()
+    await loop_lag_monitor.stop()
+
+app = FastAPI(title="Cosmic Imagination API - Divine Flow Interstellar", version="5.1.0", lifespan=lifespan,
+              default_response_class=FastJSONResponse)
+
+# Firebase (Firestore) se inicializa una sola vez y de forma perezosa: ver firebase_client.get_db()
+
+# Métricas: el registro se crea antes que los módulos que lo alimentan
+metrics_registry = MetricsRegistry()
+loop_lag_monitor = LoopLagMonitor(metrics_registry)
+divine_flow_tick_seconds = metrics_registry.histogram(
+    "cosmic_divine_flow_tick_seconds", "Duración de un tick de Divine Flow (física + codificación).", buckets=TICK_BUCKETS
+)
+profiler = SamplingProfiler()
 
 
 # -----------------------------------------------------
@@ -102,6 +118,14 @@ origins = [
     
 ]
 
+# Admisión por dentro de las métricas (los 429/503 se miden) y de CORS (los rechazos llevan cabeceras CORS).
+# Los límites de cada ruta se declaran junto a su endpoint con admission.limit(...)
+admission = AdmissionController()
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+# Se registra antes que CORS para que CORS quede por fuera y la latencia incluya toda la app
+app.add_middleware(MetricsMiddleware, registry=metrics_registry)
+
 app.add_middleware(
     CORSMiddleware, 
     allow_origins=origins,  
@@ -123,6 +147,9 @@ app.add_middleware(
 class TransmutationRequest(BaseModel):
     text: str
 
+class TransmutationBatchRequest(BaseModel):
+    texts: List[str]
+
 # Nuevo Modelo de Datos para el Formulario de Contacto Cósmico
 class ContactMessageInput(BaseModel):
     name: str
@@ -166,6 +193,15 @@ class StarTripDataInput(BaseModel):
     algorithm_version: str = "STV1" 
     max_duration_minutes: int = 5 
     mode: Literal["Focus", "Relax", "Sleep"] = "Focus" 
+    sample_rate_hz: float = Field(DEFAULT_SAMPLE_RATE_HZ, gt=0, le=MAX_SAMPLE_RATE_HZ)
+
+class StarTripUploadOpen(BaseModel):
+    user_id: str
+    session_id: str
+    algorithm_version: str = "STV1"
+    max_duration_minutes: int = 5
+    mode: Literal["Focus", "Relax", "Sleep"] = "Focus"
+    sample_rate_hz: float = Field(DEFAULT_SAMPLE_RATE_HZ, gt=0, le=MAX_SAMPLE_RATE_HZ)
 
 class CosmicSymphonyOutput(BaseModel):
     pitch: List[int] 
@@ -173,6 +209,22 @@ class CosmicSymphonyOutput(BaseModel):
     tempo_bpm: int 
     instrument: str 
 
+class SymphonyRenderRequest(BaseModel):
+    pitch: List[int] = Field(..., min_length=1, max_length=MAX_NOTES)
+    duration_ms: List[int] = Field(..., min_length=1, max_length=MAX_NOTES)
+    tempo_bpm: int = Field(120, ge=20, le=300)
+    instrument: str = Field("Cosmic Synth - Focus", max_length=64)
+    max_duration_minutes: int = Field(MAX_RENDER_MINUTES, ge=1, le=MAX_RENDER_MINUTES)
+    loop: bool = False
+    sample_rate: Literal[22050, 24000, 44100, 48000] = DEFAULT_SAMPLE_RATE
+    format: Literal["wav", "pcm"] = "wav"
+
+class StarTripAnalysis(BaseModel):
+    sample_rate_hz: float
+    windows: int
+    band_powers: Dict[str, float]
+    dominant_hz: float
+
 class StarTripOutput(BaseModel):
     user_id: str
     session_id: str
@@ -181,59 +233,158 @@ class StarTripOutput(BaseModel):
     result_score: float
     message: str
     symphony_data: CosmicSymphonyOutput
+    analysis: Optional[StarTripAnalysis] = None
 
 # -----------------------------------------------------
-# 4. MOTOR MEJORADO: DIVINE FLOW (DENSIDAD ALTA - SIN CAMBIOS)
+# 4. MOTOR MEJORADO: DIVINE FLOW (DENSIDAD ALTA - VECTORIZADO)
 # -----------------------------------------------------
 
-class QuantumEngine:
-    """Motor de partículas de alta densidad para efectos neuronales/Interestelares"""
-    def __init__(self, count=200): 
-        self.particles = [
-            {
-                "id": i,
-                "x": random.uniform(0, 100),
-                "y": random.uniform(0, 100),
-                "vx": random.uniform(-0.15, 0.15),
-                "vy": random.uniform(-0.15, 0.15),
-                "energy": random.uniform(0.6, 2.2)
-            } for i in range(count)
-        ]
-
-engine = QuantumEngine()
+# Una simulación por sala, compartida por todos sus espectadores.
+# Con DIVINE_FLOW_SHARDS>0 las salas se reparten entre procesos worker.
+shard_pool = ShardPool() if DEFAULT_SHARDS > 0 else None
+replay_library = ReplayLibrary()
+
+def divine_flow_recording_budget() -> int:
+    """Bytes disponibles para una grabación nueva, descontando lo que aún pueden crecer las activas."""
+    active = [flow_room.recorder for flow_room in room_manager.rooms.values() if flow_room.recorder is not None]
+    return replay_library.recording_budget(active)
+
+def create_divine_flow_recorder(flow_room: DivineFlowRoom) -> Optional[FrameRecorder]:
+    """Grabador para una sala nueva; None si no se pudo crear el archivo o no queda espacio."""
+    budget = divine_flow_recording_budget()
+    if not budget:
+        print(f"⚠️ Sin espacio de grabaciones: la sala {flow_room.room_id} no se graba.")
+        return None
+    try:
+        path = recording_path(new_recording_id(flow_room.room_id), replay_library.directory)
+        return FrameRecorder(path, flow_room.room_id, flow_room.engine.count, 1.0 / flow_room.tick_interval, max_bytes=budget)
+    except OSError as e:
+        print(f"⚠️ No se pudo iniciar la grabación de la sala {flow_room.room_id}: {e}")
+        return None
+
+room_manager = RoomManager(
+    room_factory=shard_pool.create_room if shard_pool else DivineFlowRoom,
+    tick_observer=divine_flow_tick_seconds.observe,
+    # DIVINE_FLOW_RECORD_ROOMS: salas que se graban desde que se crean
+    recorder_factory=lambda flow_room: create_divine_flow_recorder(flow_room) if should_record(flow_room.room_id) else None,
+)
+
+# Cada sala nueva es un bucle de 50 Hz: se limitan las conexiones y, en el handler, las salas
+admission.limit("/ws/divine-flow", websocket=True, rate=2, burst=10, max_connections=500, max_connections_per_client=8)
 
 @app.websocket("/ws/divine-flow")
-async def websocket_divine_flow(websocket: WebSocket):
-    await websocket.accept()
+async def websocket_divine_flow(websocket: WebSocket, room: str = DEFAULT_ROOM, mode: Optional[str] = None):
+    if not room_manager.can_join(room):
+        # Aceptar antes de cerrar: cerrado en el handshake el cliente sólo vería un 403, no el 1013
+        await websocket.accept()
+        await websocket.close(code=WS_TRY_AGAIN_LATER, reason="Límite de salas de Divine Flow alcanzado")
+        return
+    # JSON por defecto; los clientes binarios lo piden vía Sec-WebSocket-Protocol
+    protocol = negotiate_protocol(websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=protocol)
+    flow_room, client_id = room_manager.join(room, websocket, protocol, physics_mode=mode)
     try:
         while True:
             data = await websocket.receive_json()
-            obs_x = data.get("x", 50)
-            obs_y = data.get("y", 50)
-            is_active = data.get("active", False)
-
-            for p in engine.particles:
-                dx = obs_x - p["x"]
-                dy = obs_y - p["y"]
-                dist = math.sqrt(dx**2 + dy**2) + 0.1
-                
-                force = (4.5 if is_active else 0.3) / dist
-                p["vx"] += (dx / dist) * force
-                p["vy"] += (dy / dist) * force
-                
-                p["x"] += p["vx"]
-                p["y"] += p["vy"]
-                
-                p["vx"] *= 0.94
-                p["vy"] *= 0.94
-                
-                if p["x"] < 0 or p["x"] > 100: p["vx"] *= -1
-                if p["y"] < 0 or p["y"] > 100: p["vy"] *= -1
-
-            await websocket.send_json({"particles": engine.particles})
-            await asyncio.sleep(0.02)
+            # La entrada va a la simulación compartida: lo que no se pueda usar se ignora
+            if not isinstance(data, dict):
+                continue
+            physics_mode = data.get("physics_mode")
+            if "physics_mode" in data and (physics_mode is None or isinstance(physics_mode, str)):
+                # Modos del oráculo (COSMIC_HOLOGRAMS): QUANTUM_MIRROR y GRAVITATIONAL_COLLAPSE activan vecinos
+                flow_room.set_physics_mode(physics_mode)
+            observer = parse_observer_input(data)
+            if observer is not None:
+                flow_room.update_input(client_id, observer)
     except WebSocketDisconnect:
         print("🌑 Conexión de Divine Flow cerrada.")
+    finally:
+        await room_manager.leave(flow_room, client_id)
+
+@app.get("/api/v1/divine-flow/stats")
+async def divine_flow_stats():
+    # Contadores por conexión: frames descartados, latencia de envío y profundidad de cola
+    return {
+        "rooms": room_manager.stats(),
+        "shards": shard_pool.stats() if shard_pool else [],
+    }
+
+# Cada inicio crea un archivo nuevo en disco: pocos por cliente, y el directorio tiene su propio tope
+admission.limit("/api/v1/divine-flow/rooms/{room_id}/recording", methods=("POST", "DELETE"), rate=5 / 60, burst=5,
+                max_concurrency=4)
+
+@app.post("/api/v1/divine-flow/rooms/{room_id}/recording")
+async def start_divine_flow_recording(room_id: str):
+    flow_room = room_manager.rooms.get(room_id)
+    if flow_room is None:
+        raise HTTPException(status_code=404, detail="La sala no está activa.")
+    if flow_room.recorder is not None:
+        raise HTTPException(status_code=409, detail="La sala ya se está grabando.")
+    if not divine_flow_recording_budget():
+        raise HTTPException(
+            status_code=507,
+            detail="Espacio de grabaciones agotado (DIVINE_FLOW_MAX_RECORDINGS / DIVINE_FLOW_MAX_RECORDINGS_MB).",
+        )
+    recorder = create_divine_flow_recorder(flow_room)
+    if recorder is None:
+        raise HTTPException(status_code=503, detail="No se pudo crear el archivo de grabación.")
+    flow_room.start_recording(recorder)
+    return recorder.stats()
+
+@app.delete("/api/v1/divine-flow/rooms/{room_id}/recording")
+async def stop_divine_flow_recording(room_id: str):
+    flow_room = room_manager.rooms.get(room_id)
+    recorder = await flow_room.stop_recording() if flow_room is not None else None
+    if recorder is None:
+        raise HTTPException(status_code=404, detail="La sala no se está grabando.")
+    return recorder.stats()
+
+@app.get("/api/v1/divine-flow/recordings")
+async def list_divine_flow_recordings():
+    # Abrir una grabación sólo lee su cabecera e índice (mmap)
+    return {"recordings": await asyncio.to_thread(replay_library.list), "replay": replay_library.stats()}
+
+admission.limit("/ws/divine-flow/replay/{recording_id}", websocket=True, rate=2, burst=10,
+                max_connections=200, max_connections_per_client=4)
+
+@app.websocket("/ws/divine-flow/replay/{recording_id}")
+async def websocket_divine_flow_replay(websocket: WebSocket, recording_id: str, speed: float = 1.0, start: float = 0.0):
+    # Mismos frames y subprotocolos que la sala en vivo, servidos desde segmentos ya codificados
+    protocol = negotiate_protocol(websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=protocol)
+    try:
+        recording = replay_library.open(recording_id)
+    except (OSError, ValueError):
+        await websocket.close(code=4404, reason="Grabación no encontrada")
+        return
+
+    async def drain_client():
+        # Sólo para detectar la desconexión: la repetición no acepta entradas
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    replay = asyncio.create_task(replay_library.stream(websocket, recording, protocol, speed, start))
+    listener = asyncio.create_task(drain_client())
+    try:
+        await asyncio.wait({replay, listener}, return_when=asyncio.FIRST_COMPLETED)
+        if replay.done() and replay.exception() is None:
+            await websocket.close()
+    except Exception:
+        pass
+    finally:
+        replay.cancel()
+        listener.cancel()
+        print("🌑 Repetición de Divine Flow cerrada.")
+
+async def start_divine_flow_shards():
+    # Los workers se levantan al inicio para no pagar su arranque con la primera sala
+    if shard_pool:
+        shard_pool.start()
+
+async def shutdown_divine_flow_rooms():
+    await room_manager.shutdown()
+    if shard_pool:
+        shard_pool.stop()
 
 
 # -----------------------------------------------------
@@ -252,99 +403,33 @@ VIBRATIONAL_DICT = {
     "iluminacion": {"freq": 963, "polaridad": 1, "elemento": "éter"},
 }
 
-def generate_sacred_geometry(frequency: float, nodes_count: int) -> list:
-    points = []
-    center_x, center_y = 150, 150
-    phi = (1 + math.sqrt(5)) / 2  # Proporción Áurea para escalado armónico
-    
-    # Dividimos los nodos en 2 órbitas concéntricas perfectas (Efecto Merkaba / Matriz Sagrada)
-    layers = [0.55, 1.0] # Órbita interna y órbita externa
-    nodes_per_layer = max(nodes_count // 2, 4)
-    
-    base_radius = 65 + (frequency % 35) # Radio balanceado para que no toque los bordes
-    
-    for layer_idx, scale in enumerate(layers):
-        current_radius = base_radius * scale
-        angular_offset = (layer_idx * math.pi / nodes_per_layer) * phi if layer_idx > 0 else 0
-        
-        for i in range(nodes_per_layer):
-            angle = (i * 2 * math.pi / nodes_per_layer) + angular_offset
-            r = current_radius * (1 + 0.06 * math.sin(i * phi + (frequency * 0.02)))
-            
-            x = center_x + r * math.cos(angle)
-            y = center_y + r * math.sin(angle)
-            points.append({"x": round(x, 2), "y": round(y, 2)})
-            
-    return points
-
-# --- NUEVOS ALGORITMOS MULTI-GEOMÉTRICOS INTEGRADOS SIN ALTERACIÓN DE FIRMA ---
-def generate_advanced_cosmic_geometry(geometry_type: str, frequency: float, nodes_count: int) -> list:
-    points = []
-    center_x, center_y = 150, 150
-    phi = (1 + math.sqrt(5)) / 2
-    base_radius = 75 + (frequency % 30)
-
-    if geometry_type == "fractal_starburst":
-        for i in range(nodes_count):
-            angle = (i * 2 * math.pi / nodes_count)
-            # Oscilación armónica pura para pétalos estelares entrelazados de alta definición
-            r = base_radius * (1.2 if i % 2 == 0 else 0.45) * (1 + 0.12 * math.sin(i * phi + frequency))
-            x = center_x + r * math.cos(angle)
-            y = center_y + r * math.sin(angle)
-            points.append({"x": round(x, 2), "y": round(y, 2)})
-
-    elif geometry_type == "rose_of_grandi":
-        # Ecuación de Rosa Espectral Sagrada: R = cos(k * theta) + armónicos polares distribuidos
-        k = max(3, int((frequency % 5) + 3))
-        for i in range(nodes_count):
-            angle = (i * 2 * math.pi / nodes_count)
-            r = base_radius * (math.cos(k * angle) * 0.85 + 0.45)
-            x = center_x + r * math.cos(angle)
-            y = center_y + r * math.sin(angle)
-            points.append({"x": round(x, 2), "y": round(y, 2)})
-
-    elif geometry_type == "fermat_spiral":
-        # Remapeo de espirales polares de difracción multifacetada
-        for i in range(nodes_count):
-            theta = i * (2 * math.pi / nodes_count) * phi
-            r = math.sqrt(i + 1) * (base_radius / math.sqrt(nodes_count)) * 1.3
-            # Inyección de modulación armónica simétrica para evitar formas rocosas
-            r = r * (1 + 0.15 * math.sin(i * 2.0 + frequency))
-            x = center_x + r * math.cos(theta)
-            y = center_y + r * math.sin(theta)
-            points.append({"x": round(x, 2), "y": round(y, 2)})
-
-    elif geometry_type == "chaotic_glitch":
-        # Geometría de torsión fractal hipercompleja basada en interferencia cuántica
-        for i in range(nodes_count):
-            angle = (i * 2 * math.pi / nodes_count) + (math.cos(frequency + i) * 0.25)
-            r = base_radius * (0.55 + 0.65 * math.cos(i * phi + (frequency * 0.05)))
-            x = center_x + r * math.cos(angle)
-            y = center_y + r * math.sin(angle)
-            points.append({"x": round(x, 2), "y": round(y, 2)})
-
-    elif geometry_type == "merkaba_matrix":
-        # Solución al Bug de Caída: Ejecución de matriz estelar de doble órbita densa con entrelazado áureo
-        layers = [0.45, 0.75, 1.1]  # Triple anillo de difracción cuántica para el patrón por defecto
-        nodes_per_layer = max(nodes_count // len(layers), 4)
-        for l_idx, scale in enumerate(layers):
-            current_radius = base_radius * scale
-            offset = (l_idx * math.pi / nodes_per_layer) * phi
-            for i in range(nodes_per_layer):
-                angle = (i * 2 * math.pi / nodes_per_layer) + offset
-                r = current_radius * (1 + 0.08 * math.cos(i * phi + frequency))
-                x = center_x + r * math.cos(angle)
-                y = center_y + r * math.sin(angle)
-                points.append({"x": round(x, 2), "y": round(y, 2)})
-    else:
-        return generate_sacred_geometry(frequency, nodes_count)
+# --- Diccionario expandido de intenciones emocionales (motor semántico JoyBoy Vibe) ---
+VIBE_KEYWORDS = {
+    "DARK_EMOTION": ["dolor", "ira", "miedo", "muerte", "tristeza", "odio", "caos", "sufrimiento", "oscuridad", "bloqueo", "pain"],
+    "FUN_EMOTION": ["joyboy", "musica", "baile", "risa", "fiesta", "alegria", "ritmo", "flow", "rap", "fuego", "magia"],
+    "HARMONIC_LIGHT": ["amor", "paz", "luz", "iluminacion", "conciencia", "abundancia", "divino", "esencia", "creacion", "dios"],
+    "CHAOTIC_VOID": ["vacio", "nada", "abismo", "quantum", "singularidad", "entropia"],
+}
 
-    return points
+# Léxico compilado una sola vez. COSMIC_LEXICON_PATH (JSON) permite ampliarlo a miles de términos
+# sin costo extra por petición: {"vibrational": {"palabra": {...}}, "vibes": {"DARK_EMOTION": [...]}}
+COSMIC_LEXICON_PATH = os.getenv("COSMIC_LEXICON_PATH")
+if COSMIC_LEXICON_PATH:
+    COSMIC_LEXICON = CosmicLexicon.from_file(COSMIC_LEXICON_PATH, VIBRATIONAL_DICT, VIBE_KEYWORDS)
+    print(f"📖 Léxico cósmico cargado: {len(COSMIC_LEXICON.automaton.patterns)} términos.")
+else:
+    COSMIC_LEXICON = CosmicLexicon(VIBRATIONAL_DICT, VIBE_KEYWORDS)
+
+# Los generadores de geometría (generate_sacred_geometry / generate_advanced_cosmic_geometry)
+# viven vectorizados con NumPy en cosmic_geometry.py, con coordenadas idénticas a las originales.
 
 # Auxiliar para construir colores infinitos pseudo-aleatorios basados en hashes
 def get_infinite_color_profile(text: str, vibe: str):
     text_hash = sum(ord(c) * (idx + 1) for idx, c in enumerate(text))
-    
+    return color_profile_from_hash(text_hash, vibe)
+
+def color_profile_from_hash(text_hash: int, vibe: str):
+    # Separado del hash para que el modo streaming pueda acumularlo por trozos
     if vibe == "DARK_EMOTION":
         # Paleta roja/carmesí/oscura infinita
         hue = (text_hash % 20) + (340 if text_hash % 2 == 0 else 0) 
@@ -396,29 +481,186 @@ def get_infinite_color_profile(text: str, vibe: str):
     
     return primary_hex, secondary_hex
 
+# --- Cachés de Cosmic Architect: respuestas completas por texto y geometrías por parámetros ---
+TRANSMUTE_CACHE_SIZE = int(os.getenv("TRANSMUTE_CACHE_SIZE", 4096))
+GEOMETRY_CACHE_SIZE = int(os.getenv("GEOMETRY_CACHE_SIZE", 8192))
+COSMIC_CACHE_TTL = float(os.getenv("COSMIC_CACHE_TTL", 3600))
+# Textos más largos no se cachean: acotan la memoria de las claves
+TRANSMUTE_CACHE_MAX_TEXT = int(os.getenv("TRANSMUTE_CACHE_MAX_TEXT", 2048))
+MAX_TRANSMUTE_BATCH = int(os.getenv("MAX_TRANSMUTE_BATCH", 1000))
+MAX_TRANSMUTE_STREAM_BYTES = int(os.getenv("MAX_TRANSMUTE_STREAM_BYTES", 64 * 1024 * 1024))
+
+transmute_cache = TTLCache(maxsize=TRANSMUTE_CACHE_SIZE, ttl=COSMIC_CACHE_TTL)
+geometry_cache = TTLCache(maxsize=GEOMETRY_CACHE_SIZE, ttl=COSMIC_CACHE_TTL)
+
+def cached_cosmic_geometry(geometry_type: str, frequency: float, nodes_count: int) -> list:
+    # La geometría sólo depende de (tipo, frecuencia, nodos): unas pocas miles de combinaciones
+    return geometry_cache.get_or_compute(
+        (geometry_type, frequency, nodes_count),
+        lambda: generate_advanced_cosmic_geometry(geometry_type, frequency, nodes_count),
+    )
+
+admission.limit("/api/v1/cosmic-architect/transmute", rate=30, burst=60, max_body_bytes=1024 * 1024)
+admission.limit("/api/v1/cosmic-architect/transmute/batch", rate=2, burst=5, max_concurrency=4, max_body_bytes=8 * 1024 * 1024)
+# El stream aplica su propio límite al leer: aquí sólo se mira Content-Length
+admission.limit("/api/v1/cosmic-architect/transmute/stream", rate=2, burst=5, max_concurrency=4,
+                max_body_bytes=MAX_TRANSMUTE_STREAM_BYTES, stream_body=True)
+
 @app.post("/api/v1/cosmic-architect/transmute")
 async def transmute_energy(payload: TransmutationRequest):
-    text_lower = payload.text.lower()
+    # La respuesta es determinista dado el texto exacto (el color usa el texto sin normalizar)
+    if len(payload.text) > TRANSMUTE_CACHE_MAX_TEXT:
+        return FastJSONResponse(build_transmutation(payload.text))
+    return FastJSONResponse(transmute_cache.get_or_compute(payload.text, lambda: build_transmutation(payload.text)))
+
+@app.post("/api/v1/cosmic-architect/transmute/batch")
+async def transmute_energy_batch(payload: TransmutationBatchRequest):
+    if len(payload.texts) > MAX_TRANSMUTE_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote demasiado grande: máximo {MAX_TRANSMUTE_BATCH} textos por petición."
+        )
+
+    results = [None] * len(payload.texts)
+    # Mandalas pendientes agrupadas por (tipo, nodos): una sola evaluación NumPy por grupo
+    pending = {}
+    for idx, text in enumerate(payload.texts):
+        cacheable = len(text) <= TRANSMUTE_CACHE_MAX_TEXT
+        cached = transmute_cache.get(text) if cacheable else None
+        if cached is not None:
+            results[idx] = cached
+            continue
+        profile = analyze_transmutation(text)
+        points = geometry_cache.get((profile["geometry_type"], profile["frequency_hz"], profile["nodes"]))
+        if points is not None:
+            results[idx] = assemble_transmutation(profile, points)
+            if cacheable:
+                transmute_cache.set(text, results[idx])
+            continue
+        pending.setdefault((profile["geometry_type"], profile["nodes"]), []).append((idx, profile, cacheable))
+
+    for (geometry_type, nodes), items in pending.items():
+        frequencies = [profile["frequency_hz"] for _, profile, _ in items]
+        for (idx, profile, cacheable), points in zip(items, generate_geometry_batch(geometry_type, frequencies, nodes)):
+            geometry_cache.set((geometry_type, profile["frequency_hz"], nodes), points)
+            results[idx] = assemble_transmutation(profile, points)
+            if cacheable:
+                transmute_cache.set(profile["original_text"], results[idx])
+
+    return FastJSONResponse({"count": len(results), "results": results})
+
+@app.post("/api/v1/cosmic-architect/transmute/stream")
+async def transmute_energy_stream(request: Request):
+    """Transmuta un texto largo enviado como cuerpo crudo (text/plain UTF-8), leído por trozos.
+
+    Misma respuesta que /transmute, salvo `original_text`, que aquí es un
+    extracto de los primeros caracteres; `text_length` indica la longitud total.
+    """
+    stream = TransmutationStream(COSMIC_LEXICON)
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > MAX_TRANSMUTE_STREAM_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Texto demasiado grande: máximo {MAX_TRANSMUTE_STREAM_BYTES} bytes."
+            )
+        stream.feed(chunk)
+    stream.finish()
+
+    profile = profile_from_scan(stream.preview, stream.hits, stream.lower_sum, stream.color_hash)
+    points = cached_cosmic_geometry(profile["geometry_type"], profile["frequency_hz"], profile["nodes"])
+    result = assemble_transmutation(profile, points)
+    result["text_length"] = stream.length
+    return FastJSONResponse(result)
+
+@app.get("/api/v1/cosmic-architect/cache-stats")
+async def cosmic_architect_cache_stats():
+    return {"responses": transmute_cache.stats(), "geometry": geometry_cache.stats(), "renders": render_cache.stats()}
+
+# --- Mandalas rasterizadas en el servidor (móviles lentos y previews para redes sociales) ---
+RENDER_MAX_AGE_S = int(os.getenv("RENDER_MAX_AGE_S", 86400))
+render_cache = RenderCache()
+admission.limit("/api/v1/cosmic-architect/render", methods=("GET",), rate=5, burst=20, max_concurrency=8)
+
+@app.get("/api/v1/cosmic-architect/render")
+async def render_transmutation(
+    request: Request,
+    text: str = Query(..., min_length=1, max_length=TRANSMUTE_CACHE_MAX_TEXT),
+    size: int = Query(512, ge=MIN_RENDER_SIZE, le=MAX_RENDER_SIZE),
+    format: Literal["png", "webp"] = "png",
+    transparent: bool = False,
+):
+    """Imagen PNG/WebP de la mandala de `text`, con las mismas capas y brillo que dibuja el cliente web."""
+    result = transmute_cache.get_or_compute(text, lambda: build_transmutation(text))
+    xs = [point["x"] for point in result["geometry_nodes"]]
+    ys = [point["y"] for point in result["geometry_nodes"]]
+    # La clave depende sólo de lo que se dibuja: textos distintos con la misma mandala comparten imagen
+    key = content_key(
+        RENDER_VERSION, format, size, int(transparent), result["frequency_hz"],
+        result["glow_color"], result["secondary_color"], np.asarray(xs + ys, dtype=np.float64).tobytes(),
+    )
+    headers = {"ETag": f'"{key}"', "Cache-Control": f"public, max-age={RENDER_MAX_AGE_S}"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    def render() -> bytes:
+        pixels = render_mandala(xs, ys, result["frequency_hz"], result["glow_color"], result["secondary_color"], size, transparent)
+        return encode_image(pixels, format, transparent)
+
+    image = await render_cache.get_or_render(key, format, render)
+    return Response(content=image, media_type=MEDIA_TYPES[format], headers=headers)
+
+def build_transmutation(text: str) -> dict:
+    profile = analyze_transmutation(text)
+    points = cached_cosmic_geometry(profile["geometry_type"], profile["frequency_hz"], profile["nodes"])
+    return assemble_transmutation(profile, points)
+
+def assemble_transmutation(profile: dict, geometry_points: list) -> dict:
+    # Mantener los retornos estructurales exactamente idénticos para no romper el tipado del page.tsx original
+    return {
+        "original_text": profile["original_text"],
+        "frequency_hz": profile["frequency_hz"],
+        "geometry_nodes": geometry_points,
+        "glow_color": profile["glow_color"],
+        "secondary_color": profile["secondary_color"],
+        "elements": profile["elements"],
+        "alchemy_status": profile["alchemy_status"],
+    }
+
+def analyze_transmutation(text: str) -> dict:
+    """Análisis textual de la transmutación (todo salvo la geometría)."""
+    text_lower = text.lower()
+    # Una sola pasada del autómata sobre el texto detecta todas las palabras del léxico
+    hits = COSMIC_LEXICON.scan(text_lower)
+    return profile_from_scan(
+        text,
+        hits,
+        lower_char_sum=lambda: sum(ord(char) for char in text_lower),
+        color_hash=sum(ord(c) * (idx + 1) for idx, c in enumerate(text)),
+    )
+
+def profile_from_scan(original_text: str, hits: set, lower_char_sum, color_hash: int) -> dict:
+    """Perfil a partir de lo extraído del texto; `lower_char_sum` es un int o un callable perezoso."""
     final_frequency = 432.0 
     detected_elements = []
     nodes = 12  # Elevada la base inicial para dar mayor densidad y entrelazado como el de ayer
     matched_words = 0
-    
+
     # Conservación estricta de la lógica analítica original para no dañar retrocompatibilidad
-    for word, data in VIBRATIONAL_DICT.items():
-        if word in text_lower:
-            matched_words += 1
-            if data["polaridad"] == -1:
-                final_frequency += (data["freq"] * 0.5)
-                nodes += 4
-            else:
-                final_frequency += data["freq"]
-                nodes += 6
-            if data["elemento"] not in detected_elements:
-                detected_elements.append(data["elemento"])
-                
+    for word, data in COSMIC_LEXICON.vibrational_matches(hits):
+        matched_words += 1
+        if data["polaridad"] == -1:
+            final_frequency += (data["freq"] * 0.5)
+            nodes += 4
+        else:
+            final_frequency += data["freq"]
+            nodes += 6
+        if data["elemento"] not in detected_elements:
+            detected_elements.append(data["elemento"])
+
     if matched_words == 0:
-        text_hash = sum(ord(char) for char in text_lower)
+        text_hash = lower_char_sum() if callable(lower_char_sum) else lower_char_sum
         final_frequency = 432 + (text_hash % 531)
         nodes = 12 + (text_hash % 12)
 
@@ -429,42 +671,33 @@ async def transmute_energy(payload: TransmutationRequest):
     final_frequency = round(final_frequency, 1)
 
     # --- INYECCIÓN DEL MOTOR SEMÁNTICO JOYBOY VIBE ---
-    # Diccionario expandido de intenciones emocionales
-    dark_keywords = ["dolor", "ira", "miedo", "muerte", "tristeza", "odio", "caos", "sufrimiento", "oscuridad", "bloqueo", "pain"]
-    fun_keywords = ["joyboy", "musica", "baile", "risa", "fiesta", "alegria", "ritmo", "flow", "rap", "fuego", "magia"]
-    light_keywords = ["amor", "paz", "luz", "iluminacion", "conciencia", "abundancia", "divino", "esencia", "creacion", "dios"]
-    void_keywords = ["vacio", "nada", "abismo", "quantum", "singularidad", "entropia"]
-
-    if any(dk in text_lower for dk in dark_keywords):
-        vibe_category = "DARK_EMOTION"
+    # Precedencia: oscuridad > diversión > luz > vacío > geometría sagrada
+    vibe_category = COSMIC_LEXICON.classify(hits)
+
+    if vibe_category == "DARK_EMOTION":
         geometry_type = "fractal_starburst" if final_frequency % 2 == 0 else "chaotic_glitch"
         alchemy_status = "⚔️ Calcinación Extrema: Desintegrando densidades y mutando el dolor profundo"
-    elif any(fk in text_lower for fk in fun_keywords):
-        vibe_category = "FUN_EMOTION"
+    elif vibe_category == "FUN_EMOTION":
         geometry_type = "rose_of_grandi" if final_frequency % 2 == 0 else "fractal_starburst"
         alchemy_status = "⚡ Ritmo JoyBoy Sónico: Frecuencias dinámicas elevando el pulso creativo"
-    elif any(lk in text_lower for lk in light_keywords):
-        vibe_category = "HARMONIC_LIGHT"
+    elif vibe_category == "HARMONIC_LIGHT":
         geometry_type = "fermat_spiral"
         alchemy_status = "✨ Crisopeya Pura: Transmutación completa hacia el espectro áureo"
-    elif any(vk in text_lower for vk in void_keywords):
-        vibe_category = "CHAOTIC_VOID"
+    elif vibe_category == "CHAOTIC_VOID":
         geometry_type = "chaotic_glitch"
         alchemy_status = "🕳️ Inversión de Espacio-Tiempo: Reconfigurando la matriz en el vacío absoluto"
     else:
-        vibe_category = "SACRED_GEOMETRY"
         geometry_type = "merkaba_matrix"
         alchemy_status = "💠 Geometría Matricial Estándar: Alineando estructuras vectoriales estables"
 
-    # Generación dinámica avanzada e infinitas combinaciones de color
-    geometry_points = generate_advanced_cosmic_geometry(geometry_type, final_frequency, nodes)
-    glow_color, secondary_color = get_infinite_color_profile(payload.text, vibe_category)
+    # Infinitas combinaciones de color; la geometría se genera aparte (individual o en lote)
+    glow_color, secondary_color = color_profile_from_hash(color_hash, vibe_category)
 
-    # Mantener los retornos estructurales exactamente idénticos para no romper el tipado del page.tsx original
     return {
-        "original_text": payload.text,
+        "original_text": original_text,
         "frequency_hz": final_frequency,
-        "geometry_nodes": geometry_points,
+        "nodes": nodes,
+        "geometry_type": geometry_type,
         "glow_color": glow_color,
         "secondary_color": secondary_color,
         "elements": detected_elements if detected_elements else ["éter"],
@@ -472,37 +705,297 @@ async def transmute_energy(payload: TransmutationRequest):
     }
 
 # -----------------------------------------------------
-# 7. MÓDULO STAR TRIP (MANTENIDO SIN CAMBIOS)
+# 7. MÓDULO STAR TRIP (ANÁLISIS ESPECTRAL REAL)
 # -----------------------------------------------------
 
-@app.post("/api/v1/star-trip/analyze-data", response_model=StarTripOutput)
-async def analyze_star_trip_data(input_data: StarTripDataInput):
-    user_id = input_data.user_id
-    mode = input_data.mode
+# Sin credenciales de Firebase (modo degradado) las sesiones no se persisten
+star_trip_writer = FirestoreWriteBehind(get_db) if firebase_configured() else None
+
+async def start_star_trip_writer():
+    if star_trip_writer is not None:
+        star_trip_writer.start()
+
+async def drain_star_trip_writer():
+    # Nada encolado se pierde en un reinicio ordenado
+    if star_trip_writer is not None:
+        await star_trip_writer.drain()
+
+@app.get("/api/v1/star-trip/write-queue-stats")
+async def star_trip_write_queue_stats():
+    return star_trip_writer.stats() if star_trip_writer is not None else {"enabled": False}
+
+# Los agregados se actualizan al encolar cada sesión y viajan en el mismo write-behind
+star_trip_history = StarTripHistory(get_db, star_trip_writer) if star_trip_writer is not None else None
+
+MAX_STAR_TRIP_UPLOAD_BYTES = int(os.getenv("MAX_STAR_TRIP_UPLOAD_BYTES", 256 * 1024 * 1024))
+# A partir de aquí la FFT se ejecuta en un hilo para no frenar los WebSockets
+STAR_TRIP_THREAD_THRESHOLD = 65536
+
+async def run_star_trip_session(user_id: str, session_id: str, mode: str, samples: np.ndarray, sample_rate_hz: float) -> dict:
     start_time = time.time()
-    star_trip_score = round(random.uniform(93.0, 99.5), 2)
-    symphony_data = {
-        "pitch": [random.randint(60, 90) for _ in range(80)],
-        "duration_ms": [200 for _ in range(80)],
-        "tempo_bpm": 120 if mode == "Focus" else 85,
-        "instrument": f"Cosmic Synth - {mode}"
-    }
-    if db:
-        db.collection('star_trip_results').document(user_id).collection('sessions').document(input_data.session_id).set({
-            "timestamp": int(time.time()), "score": star_trip_score, "mode": mode
-        })
+    try:
+        if samples.size >= STAR_TRIP_THREAD_THRESHOLD:
+            result = await asyncio.to_thread(analyze_session, samples, mode, sample_rate_hz)
+        else:
+            result = analyze_session(samples, mode, sample_rate_hz)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return complete_star_trip_session(user_id, session_id, mode, int(samples.size), result, start_time)
+
+# Las sesiones de Star Trip se devuelven como FastJSONResponse: el dict ya tiene la forma
+# exacta de StarTripOutput (que queda en el decorador sólo para OpenAPI) y las notas de la
+# sinfonía van como arrays de NumPy directos al codificador
+def complete_star_trip_session(user_id: str, session_id: str, mode: str, points: int, result: dict, start_time: float) -> dict:
+    star_trip_score = result["score"]
+    # Con Firestore caído (inicialización fallida, reintentándose en segundo plano) no se encola:
+    # la cola sólo se llenaría de reintentos hasta rechazar todas las sesiones con 503
+    if star_trip_writer is not None and not firestore_unavailable():
+        # Se encola y se responde ya; el worker lo confirma en batch fuera del event loop
+        session_doc = {"timestamp": int(time.time()), "score": star_trip_score, "mode": mode}
+        accepted = star_trip_writer.enqueue(('star_trip_results', user_id, 'sessions', session_id), session_doc)
+        if not accepted:
+            raise HTTPException(status_code=503, detail="Cola de persistencia de Star Trip saturada. Reintenta en unos segundos.")
+        if star_trip_history is not None:
+            star_trip_history.record(user_id, session_id, session_doc)
     return {
-        "user_id": user_id, "session_id": input_data.session_id,
-        "processed_points": len(input_data.raw_frequency_points),
+        "user_id": user_id, "session_id": session_id,
+        "processed_points": points,
         "duration_s": round(time.time() - start_time, 3),
         "result_score": star_trip_score, "message": "Success",
-        "symphony_data": symphony_data
+        "symphony_data": result["symphony"],
+        "analysis": result["analysis"],
     }
 
+# El JSON se valida entero antes de llegar al endpoint: su tamaño se corta antes de parsearlo
+STAR_TRIP_MAX_JSON_BYTES = int(os.getenv("STAR_TRIP_MAX_JSON_BYTES", 16 * 1024 * 1024))
+admission.limit("/api/v1/star-trip/analyze-data", rate=2, burst=10, max_concurrency=4, max_body_bytes=STAR_TRIP_MAX_JSON_BYTES)
+admission.limit("/api/v1/star-trip/analyze-data/binary", rate=2, burst=10, max_concurrency=4,
+                max_body_bytes=MAX_STAR_TRIP_UPLOAD_BYTES, stream_body=True)
+
+@app.post("/api/v1/star-trip/analyze-data", response_model=StarTripOutput)
+async def analyze_star_trip_data(input_data: StarTripDataInput):
+    samples = finite_samples(input_data.raw_frequency_points)
+    return FastJSONResponse(await run_star_trip_session(
+        input_data.user_id, input_data.session_id, input_data.mode, samples, input_data.sample_rate_hz
+    ))
+
+@app.post("/api/v1/star-trip/analyze-data/binary", response_model=StarTripOutput)
+async def analyze_star_trip_binary(
+    request: Request,
+    user_id: str,
+    session_id: str,
+    mode: Literal["Focus", "Relax", "Sleep"] = "Focus",
+    sample_rate_hz: float = Query(DEFAULT_SAMPLE_RATE_HZ, gt=0, le=MAX_SAMPLE_RATE_HZ),
+):
+    """Misma sesión que /analyze-data, con las muestras como float32 little-endian crudos
+    (application/octet-stream): 4 bytes por punto y sin parseo de JSON."""
+    payload = bytearray()
+    async for chunk in request.stream():
+        if len(payload) + len(chunk) > MAX_STAR_TRIP_UPLOAD_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Sesión demasiado grande: máximo {MAX_STAR_TRIP_UPLOAD_BYTES} bytes."
+            )
+        payload += chunk
+    if len(payload) % 4:
+        raise HTTPException(status_code=400, detail="El cuerpo debe ser una secuencia de float32 (múltiplo de 4 bytes).")
+    return FastJSONResponse(
+        await run_star_trip_session(user_id, session_id, mode, samples_from_bytes(payload), sample_rate_hz)
+    )
+
+# --- Ingesta por trozos (HTTP o WebSocket) para grabaciones largas ---
+star_trip_uploads = IngestSessionStore()
+
+def star_trip_chunk_samples(payload: bytes) -> np.ndarray:
+    if len(payload) > MAX_CHUNK_BYTES:
+        raise IngestError(413, f"Trozo demasiado grande: máximo {MAX_CHUNK_BYTES} bytes.")
+    if len(payload) % 4:
+        raise IngestError(400, "El trozo debe ser una secuencia de float32 (múltiplo de 4 bytes).")
+    return samples_from_bytes(payload)
+
+admission.limit("/api/v1/star-trip/sessions", rate=2, burst=10, max_body_bytes=16 * 1024)
+admission.limit("/api/v1/star-trip/sessions/{upload_id}/chunks/{seq}", methods=("PUT",), rate=50, burst=100,
+                max_body_bytes=MAX_CHUNK_BYTES)
+admission.limit("/api/v1/star-trip/sessions/{upload_id}/finalize", rate=2, burst=10, max_concurrency=4)
+admission.limit("/ws/star-trip/{upload_id}", websocket=True, rate=2, burst=10, max_connections=200, max_connections_per_client=4)
+
+@app.post("/api/v1/star-trip/sessions")
+async def open_star_trip_upload(payload: StarTripUploadOpen):
+    try:
+        session = star_trip_uploads.open(
+            payload.user_id, payload.session_id, payload.mode, payload.sample_rate_hz, payload.max_duration_minutes
+        )
+    except IngestError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return session.status()
+
+@app.get("/api/v1/star-trip/sessions/{upload_id}")
+async def star_trip_upload_status(upload_id: str):
+    # Para reanudar: `next_seq` es el siguiente trozo que el servidor espera
+    try:
+        return star_trip_uploads.get(upload_id).status()
+    except IngestError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@app.put("/api/v1/star-trip/sessions/{upload_id}/chunks/{seq}")
+async def append_star_trip_chunk(upload_id: str, seq: int, request: Request):
+    """Trozo `seq` (0, 1, 2...) como float32 little-endian crudos (application/octet-stream)."""
+    try:
+        samples = star_trip_chunk_samples(await request.body())
+        return FastJSONResponse(await star_trip_uploads.append(upload_id, seq, samples))
+    except IngestError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@app.post("/api/v1/star-trip/sessions/{upload_id}/finalize", response_model=StarTripOutput)
+async def finalize_star_trip_upload(upload_id: str):
+    start_time = time.time()
+
+    async def persist(session, result):
+        # Un HTTPException aquí (p. ej. 503) deja la subida abierta para reintentar el finalize
+        return complete_star_trip_session(
+            session.user_id, session.session_id, session.mode, session.accumulator.samples, result, start_time
+        )
+
+    try:
+        return FastJSONResponse(await star_trip_uploads.finalize(upload_id, persist))
+    except IngestError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@app.delete("/api/v1/star-trip/sessions/{upload_id}")
+async def abort_star_trip_upload(upload_id: str):
+    if star_trip_uploads.abort(upload_id) is None:
+        raise HTTPException(status_code=404, detail="Subida de Star Trip desconocida o caducada.")
+    return {"status": "aborted", "upload_id": upload_id}
+
+@app.get("/api/v1/star-trip/ingest-stats")
+async def star_trip_ingest_stats():
+    return star_trip_uploads.stats()
+
+# --- Historial y estadísticas para los paneles (O(1) lecturas por visita) ---
+def require_star_trip_history() -> StarTripHistory:
+    if star_trip_history is None:
+        raise HTTPException(status_code=503, detail="Historial de Star Trip no disponible: Firestore no está configurado.")
+    return star_trip_history
+
+@app.get("/api/v1/star-trip/users/{user_id}/sessions")
+async def star_trip_user_history(
+    user_id: str,
+    limit: int = Query(HISTORY_RECENT_SESSIONS, ge=1, le=MAX_HISTORY_PAGE),
+    cursor: Optional[str] = Query(None, max_length=64),
+):
+    """Sesiones del usuario de la más nueva a la más antigua; `next_cursor` pide la página siguiente."""
+    try:
+        return await require_star_trip_history().history(user_id, limit, cursor)
+    except HistoryError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@app.get("/api/v1/star-trip/users/{user_id}/stats")
+async def star_trip_user_stats(user_id: str):
+    """Medias por modo, mejores puntuaciones y rachas, desde los agregados del usuario."""
+    try:
+        return await require_star_trip_history().stats(user_id)
+    except HistoryError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@app.get("/api/v1/star-trip/history-stats")
+async def star_trip_history_stats():
+    return star_trip_history.stats_summary() if star_trip_history is not None else {"enabled": False}
+
+# --- Audio de la sinfonía renderizado en el servidor ---
+symphony_clips = SymphonyClipCache()
+admission.limit("/api/v1/star-trip/symphony/render", rate=1, burst=5, max_concurrency=4, max_body_bytes=256 * 1024)
+
+@app.post("/api/v1/star-trip/symphony/render")
+async def render_star_trip_symphony(payload: SymphonyRenderRequest):
+    """`symphony_data` (más formato) -> PCM mono de 16 bits, WAV o crudo. Se transmite por bloques
+    mientras se sintetiza; con `loop` la melodía se repite hasta `max_duration_minutes`."""
+    try:
+        renderer = SymphonyRenderer(
+            payload.pitch, payload.duration_ms, payload.tempo_bpm, payload.instrument,
+            payload.sample_rate, payload.max_duration_minutes, payload.loop, payload.format,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    media_type = AUDIO_MEDIA_TYPES[payload.format]
+    clip = symphony_clips.get(renderer.key)
+    if clip is not None:
+        return Response(content=clip, media_type=media_type, headers=renderer.headers())
+    return StreamingResponse(symphony_clips.stream(renderer), media_type=media_type, headers=renderer.headers())
+
+@app.get("/api/v1/star-trip/symphony/cache-stats")
+async def star_trip_symphony_cache_stats():
+    return symphony_clips.stats()
+
+@app.websocket("/ws/star-trip/{upload_id}")
+async def websocket_star_trip_ingest(websocket: WebSocket, upload_id: str):
+    """Mensajes binarios: seq (uint32 LE) + float32 LE. Texto: {"seq", "points"} o {"action": "finalize"}.
+    Cada trozo se confirma con el estado de la subida; al finalizar se envía el resultado y se cierra."""
+    await websocket.accept()
+    try:
+        star_trip_uploads.get(upload_id)
+    except IngestError as e:
+        await websocket.close(code=4404, reason=e.detail)
+        return
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                if message.get("bytes") is not None:
+                    frame = message["bytes"]
+                    if len(frame) < 4:
+                        raise IngestError(400, "Trozo binario sin número de secuencia.")
+                    seq = int.from_bytes(frame[:4], "little")
+                    status = await star_trip_uploads.append(upload_id, seq, star_trip_chunk_samples(frame[4:]))
+                else:
+                    data = json.loads(message.get("text") or "{}")
+                    if not isinstance(data, dict):
+                        raise ValueError("Se esperaba un objeto JSON.")
+                    if data.get("action") == "finalize":
+                        start_time = time.time()
+
+                        async def persist_and_send(session, result):
+                            # La subida sólo se cierra si el resultado se encoló y llegó al cliente
+                            await websocket.send_text(dumps_text(complete_star_trip_session(
+                                session.user_id, session.session_id, session.mode,
+                                session.accumulator.samples, result, start_time,
+                            )))
+
+                        await star_trip_uploads.finalize(upload_id, persist_and_send)
+                        await websocket.close()
+                        break
+                    samples = finite_samples(data.get("points", []))
+                    status = await star_trip_uploads.append(upload_id, int(data.get("seq", -1)), samples)
+                await websocket.send_json(status)
+            except (IngestError, HTTPException) as e:
+                # HTTPException: p. ej. 503 de complete_star_trip_session con la cola de persistencia llena
+                await websocket.send_json({"error": e.detail, "status_code": e.status_code})
+            except (ValueError, TypeError):
+                await websocket.send_json({"error": "Mensaje de Star Trip inválido.", "status_code": 400})
+    except WebSocketDisconnect:
+        # La subida sigue abierta: el cliente puede reconectarse y continuar desde next_seq
+        pass
+
 # -----------------------------------------------------
-# 8. PUENTE SMTP NATIVO PARA ZOHO MAIL (AMORTIGUADO - SIN CAMBIOS)
+# 8. PUENTE SMTP NATIVO PARA ZOHO MAIL (COLA CON POOL Y SPOOL EN DISCO)
 # -----------------------------------------------------
 
+mail_queue = None
+
+def get_mail_queue(zoho_user: str, zoho_password: str):
+    global mail_queue
+    if mail_queue is None:
+        # smtplib y la cola sólo se cargan cuando hay correo que enviar
+        from mail_queue import SMTP_HOST, SMTP_PORT, MailQueue, SMTPConnectionPool
+        mail_queue = MailQueue(SMTPConnectionPool(SMTP_HOST, SMTP_PORT, zoho_user, zoho_password))
+    return mail_queue
+
+# Un formulario humano: pocas por minuto por cliente y un tope de cuerpos pequeños
+admission.limit("/api/v1/contact", rate=5 / 60, burst=5, max_concurrency=16, max_body_bytes=32 * 1024)
+
 @app.post("/api/v1/contact")
 async def submit_contact_form(payload: ContactMessageInput):
     zoho_user = os.getenv("ZOHO_USER")
@@ -543,15 +1036,7 @@ async def submit_contact_form(payload: ContactMessageInput):
         """
         
         msg.attach(MIMEText(html_body, 'html'))
-        
-        def send_email_sync():
-            with smtplib.SMTP_SSL('smtp.zoho.com', 465) as server:
-                server.login(zoho_user, zoho_password)
-                server.sendmail(zoho_user, zoho_user, msg.as_string())
-        
-        await asyncio.to_thread(send_email_sync)
-        return {"success": True, "message": "Transmisión enviada correctamente."}
-        
+        raw_message = msg.as_string()
     except Exception as e:
         print(f"Error crítico en el túnel SMTP de Zoho: {e}")
         raise HTTPException(
@@ -559,8 +1044,31 @@ async def submit_contact_form(payload: ContactMessageInput):
             detail="Interferencia en el puente SMTP del servidor."
         )
 
+    # La entrega (pool de conexiones autenticadas + reintentos) ocurre en segundo plano
+    if await get_mail_queue(zoho_user, zoho_password).enqueue(zoho_user, [zoho_user], raw_message) is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Cola de transmisiones saturada. Reintenta en unos minutos."
+        )
+    return {"success": True, "message": "Transmisión enviada correctamente."}
+
+@app.get("/api/v1/contact/queue-stats")
+async def contact_queue_stats():
+    return mail_queue.stats() if mail_queue is not None else {"enabled": False}
+
+async def resume_mail_queue():
+    # Con credenciales, lo que quedó en el spool se reenvía sin esperar a un nuevo mensaje
+    zoho_user = os.getenv("ZOHO_USER")
+    zoho_password = os.getenv("ZOHO_PASSWORD")
+    if zoho_user and zoho_password:
+        get_mail_queue(zoho_user, zoho_password).start()
+
+async def drain_mail_queue():
+    if mail_queue is not None:
+        await mail_queue.drain()
+
 # -----------------------------------------------------
-# 8.5. SISTEMA DEL ORÁCULO INTERACTIVO DE DIVINE FLOW (SIN CAMBIOS)
+# 8.5. SISTEMA DEL ORÁCULO INTERACTIVO DE DIVINE FLOW (CATÁLOGO PRE-CODIFICADO)
 # -----------------------------------------------------
 
 COSMIC_HOLOGRAMS = [
@@ -585,13 +1093,52 @@ COSMIC_MYSTERIES = [
     }
 ]
 
-@app.get("/api/v1/cosmic-hologram", response_model=HologramResponse)
-async def get_cosmic_hologram():
-    return random.choice(COSMIC_HOLOGRAMS)
+# Catálogo validado y serializado una vez (ver content_store.py); estas listas son el contenido por defecto
+# y CONTENT_CATALOG_PATH / CONTENT_FIRESTORE_COLLECTION lo sustituyen con recarga en caliente.
+CONTENT_MAX_AGE_S = int(os.getenv("CONTENT_MAX_AGE_S", 300))
+content_store = ContentStore(
+    {"holograms": HologramResponse, "mysteries": MysteryResponse},
+    {"holograms": COSMIC_HOLOGRAMS, "mysteries": COSMIC_MYSTERIES},
+    get_client=get_db,
+)
+
+# `seed` se lee a mano: declararlo como Query costaba más (resolución de dependencias) que servir la respuesta
+CONTENT_SEED_MAX_LENGTH = 128
+CONTENT_SEED_PARAMETER = {"parameters": [{
+    "name": "seed", "in": "query", "required": False,
+    "description": "Misma semilla, misma entrada (mientras no cambie el catálogo).",
+    "schema": {"type": "string", "maxLength": CONTENT_SEED_MAX_LENGTH},
+}]}
+
+def serve_content(request: Request, catalog: str) -> Response:
+    seed = request.query_params.get("seed")
+    if seed is not None and len(seed) > CONTENT_SEED_MAX_LENGTH:
+        raise HTTPException(status_code=422, detail=f"seed demasiado larga: máximo {CONTENT_SEED_MAX_LENGTH} caracteres.")
+    entry = content_store.catalog(catalog).pick(seed)
+    # Con semilla la respuesta es estable y se puede cachear; al azar, el cliente sólo revalida
+    headers = {
+        "ETag": entry.etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": f"public, max-age={CONTENT_MAX_AGE_S}" if seed is not None else "no-cache",
+    }
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    body, encoding = entry.encoded(request.headers.get("accept-encoding"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
 
-@app.get("/api/v1/cosmic-mystery", response_model=MysteryResponse)
-async def get_cosmic_mystery():
-    return random.choice(COSMIC_MYSTERIES)
+@app.get("/api/v1/cosmic-hologram", response_model=HologramResponse, openapi_extra=CONTENT_SEED_PARAMETER)
+async def get_cosmic_hologram(request: Request):
+    return serve_content(request, "holograms")
+
+@app.get("/api/v1/cosmic-mystery", response_model=MysteryResponse, openapi_extra=CONTENT_SEED_PARAMETER)
+async def get_cosmic_mystery(request: Request):
+    return serve_content(request, "mysteries")
+
+@app.get("/api/v1/oracle/catalog-stats")
+async def oracle_catalog_stats():
+    return content_store.stats()
 
 # -----------------------------------------------------
 # 9. ENDPOINTS DE CONTROL INTERNO
@@ -603,10 +1150,79 @@ def read_root():
 
 @app.get("/api/v1/ping-db")
 def ping_db():
-    if not db: return {"status": "error"}
+    db = get_db()
+    if not db: return {"status": "error", "firebase": firebase_status()}
     db.collection('users').limit(1).get() 
     return {"status": "success"}
 
+# --- Métricas (formato de texto de Prometheus) ---
+
+def _cache_families():
+    for name, stats in (
+        ("responses", transmute_cache.stats()),
+        ("geometry", geometry_cache.stats()),
+        ("renders", render_cache.memory.stats()),
+    ):
+        yield name, stats
+
+def collect_runtime_metrics():
+    caches = list(_cache_families())
+    yield ("cosmic_cache_entries", "gauge", "Entradas en las cachés de Cosmic Architect.",
+           [({"cache": name}, stats["size"]) for name, stats in caches])
+    for field in ("hits", "misses", "evictions", "expirations"):
+        yield (f"cosmic_cache_{field}_total", "counter", f"Cachés de Cosmic Architect: {field}.",
+               [({"cache": name}, stats[field]) for name, stats in caches])
+
+    rooms = list(room_manager.rooms.values())
+    channels = [channel for room in rooms for channel in room.subscribers.values()]
+    yield ("cosmic_divine_flow_rooms", "gauge", "Salas de Divine Flow activas.", [({}, len(rooms))])
+    yield ("cosmic_divine_flow_clients", "gauge", "Espectadores conectados a Divine Flow.", [({}, len(channels))])
+    yield ("cosmic_divine_flow_frames_dropped", "gauge", "Frames descartados por clientes lentos (conexiones actuales).",
+           [({}, sum(channel.frames_dropped for channel in channels))])
+
+    queues = [({"queue": "star_trip_uploads"}, star_trip_uploads.stats()["open"])]
+    if star_trip_writer is not None:
+        queues.append(({"queue": "firestore_write_behind"}, len(star_trip_writer)))
+    if mail_queue is not None:
+        queues.append(({"queue": "mail_spool"}, mail_queue.stats()["spooled"]))
+    yield ("cosmic_queue_depth", "gauge", "Elementos pendientes por cola.", queues)
+
+    yield ("cosmic_admission_rejections_total", "counter", "Peticiones y conexiones rechazadas por el control de admisión.",
+           [({"route": route, "reason": reason}, count) for route, reason, count in admission.rejections()])
+
+metrics_registry.add_collector(collect_runtime_metrics)
+
+@app.get("/api/v1/admission/stats")
+async def admission_stats():
+    return admission.stats()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    body = metrics_registry.render()
+    loop_lag_monitor.reset_max()
+    return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/api/v1/metrics/profiler/start")
+async def start_profiler(seconds: float = Query(30, gt=0, le=600), hz: float = Query(100, gt=0, le=1000)):
+    # Desactivado salvo METRICS_PROFILER=1: expone la estructura interna del código
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=403, detail="Perfilador desactivado (METRICS_PROFILER=1 para habilitarlo).")
+    profiler.start(seconds, hz)
+    return profiler.status()
+
+@app.post("/api/v1/metrics/profiler/stop")
+async def stop_profiler():
+    profiler.stop()
+    return profiler.status()
+
+@app.get("/api/v1/metrics/profiler")
+async def profiler_report(format: Literal["json", "collapsed"] = "json"):
+    if format == "collapsed":
+        return Response(content=profiler.collapsed(), media_type="text/plain; charset=utf-8")
+    status = profiler.status()
+    status["top_stacks"] = [{"stack": stack, "samples": count} for stack, count in profiler.top(20)]
+    return status
+
 # -----------------------------------------------------
 # 10. INICIALIZACIÓN DINÁMICA DEL PUERTO (ÚNICO CAMBIO REALIZADO)
 # -----------------------------------------------------
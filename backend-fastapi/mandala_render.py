@@ -0,0 +1,263 @@
+# -----------------------------------------------------
+# RASTERIZADO DE MANDALAS EN EL SERVIDOR (COSMIC ARCHITECT)
+# -----------------------------------------------------
+# Reproduce en NumPy las capas que dibuja app/geometry/page.tsx sobre el
+# viewBox de 300x300: tres redes de líneas entre nodos (paso 1, paso según la
+# frecuencia y paso de media vuelta), los nodos de conciencia y su brillo.
+#
+# - Líneas: cada segmento se muestrea cada <= 0.5 px y las muestras se
+#   reparten con pesos bilineales (np.bincount) sobre un mapa de densidad;
+#   un filtro de caja del ancho del trazo da líneas antialiasadas de
+#   cualquier grosor, todas a la vez y sin bucles por píxel.
+# - Nodos: distancia al centro en un parche pequeño por nodo (relleno y aro).
+# - Brillo: los feGaussianBlur del SVG se aproximan con tres pasadas de
+#   filtro de caja por eje (sumas acumuladas, coste independiente del
+#   radio); los desenfoques anchos se calculan a resolución reducida.
+# - Pillow sólo se importa al codificar (PNG / WebP).
+
+import math
+from io import BytesIO
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Cambiar al modificar el dibujo: forma parte de la clave de caché y del ETag
+RENDER_VERSION = 1
+VIEWBOX = 300.0
+MIN_RENDER_SIZE = 64
+MAX_RENDER_SIZE = 2048
+MEDIA_TYPES = {"png": "image/png", "webp": "image/webp"}
+BACKGROUND = (0, 0, 0)
+WHITE = (1.0, 1.0, 1.0)
+
+# feGaussianBlur de los filtros cosmic-glow-heavy (4 y 1.5) y cosmic-glow-light (1), en unidades del viewBox
+HEAVY_GLOW = (4.0, 1.5)
+LIGHT_GLOW = (1.0,)
+
+
+def hex_to_rgb(color: str) -> Tuple[float, float, float]:
+    color = color.lstrip("#")
+    if len(color) == 3:
+        color = "".join(c * 2 for c in color)
+    return tuple(int(color[idx:idx + 2], 16) / 255.0 for idx in (0, 2, 4))
+
+
+def _box_blur(img: np.ndarray, radius: int, axis: int) -> np.ndarray:
+    if radius <= 0:
+        return img
+    width = 2 * radius + 1
+    pad = [(0, 0)] * img.ndim
+    pad[axis] = (radius + 1, radius)
+    summed = np.cumsum(np.pad(img, pad), axis=axis, dtype=np.float32)
+    n = img.shape[axis]
+    upper = [slice(None)] * img.ndim
+    lower = [slice(None)] * img.ndim
+    upper[axis] = slice(width, width + n)
+    lower[axis] = slice(0, n)
+    return (summed[tuple(upper)] - summed[tuple(lower)]) / width
+
+
+def _gaussian_blur(img: np.ndarray, sigma: float) -> np.ndarray:
+    """Tres filtros de caja por eje ≈ gaussiana de desviación `sigma` (en píxeles)."""
+    if sigma < 0.5:
+        return img
+    factor = 1
+    while sigma / (factor * 2) >= 1.5 and factor < 4:
+        factor *= 2
+    height, width = img.shape[:2]
+    if factor > 1:
+        # Brillo ancho a resolución reducida: es suave, la diferencia no se ve
+        pad_h, pad_w = -height % factor, -width % factor
+        padded = np.pad(img, [(0, pad_h), (0, pad_w)] + [(0, 0)] * (img.ndim - 2))
+        small = sum(padded[dy::factor, dx::factor] for dy in range(factor) for dx in range(factor)) / factor ** 2
+    else:
+        small = img
+    box_radius = max(1, int(round((math.sqrt(12 * (sigma / factor) ** 2 / 3 + 1) - 1) / 2)))
+    for _ in range(3):
+        small = _box_blur(_box_blur(small, box_radius, 0), box_radius, 1)
+    if factor == 1:
+        return small
+    big = np.repeat(np.repeat(small, factor, axis=0), factor, axis=1)
+    big = _box_blur(_box_blur(big, factor // 2, 0), factor // 2, 1)
+    return big[:height, :width]
+
+
+def _stroke_mask(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    width_px: float,
+    shape: Tuple[int, int],
+    dash: Optional[Tuple[float, float]] = None,
+) -> np.ndarray:
+    """Cobertura [0, 1] de los segmentos `starts`→`ends` (N x 2, en píxeles) con trazo de `width_px`."""
+    height, width = shape
+    delta = ends - starts
+    lengths = np.hypot(delta[:, 0], delta[:, 1])
+    counts = np.maximum(2, np.ceil(lengths * 2).astype(np.int64) + 1)
+    segment = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.cumsum(counts) - counts
+    t = (np.arange(counts.sum()) - np.repeat(offsets, counts)) / np.repeat(counts - 1, counts)
+    weight = np.repeat(lengths / (counts - 1), counts)
+    # Las muestras de los extremos pesan la mitad (regla del trapecio): los vértices compartidos no se duplican
+    weight = np.where((t == 0) | (t == 1), weight * 0.5, weight)
+    if dash is not None:
+        on, off = dash
+        keep = (t * lengths[segment]) % (on + off) < on
+        segment, t, weight = segment[keep], t[keep], weight[keep]
+
+    px = starts[segment, 0] + t * delta[segment, 0]
+    py = starts[segment, 1] + t * delta[segment, 1]
+    x0 = np.floor(px).astype(np.int64)
+    y0 = np.floor(py).astype(np.int64)
+    fx = px - x0
+    fy = py - y0
+    density = np.zeros(height * width, dtype=np.float64)
+    for dx, dy, w in ((0, 0, (1 - fx) * (1 - fy)), (1, 0, fx * (1 - fy)), (0, 1, (1 - fx) * fy), (1, 1, fx * fy)):
+        xi, yi = x0 + dx, y0 + dy
+        inside = (xi >= 0) & (xi < width) & (yi >= 0) & (yi < height)
+        density += np.bincount(yi[inside] * width + xi[inside], weights=(w * weight)[inside], minlength=height * width)
+    density = density.reshape(height, width).astype(np.float32)
+
+    if width_px <= 1:
+        return np.clip(density * width_px, 0, 1)
+    radius = int(round((width_px - 1) / 2))
+    spread = _box_blur(_box_blur(density, radius, 0), radius, 1)
+    return np.clip(spread * width_px, 0, 1)
+
+
+def _node_masks(centers: np.ndarray, radii: Sequence[float], stroke_px: float, shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """(relleno, aro) de los nodos: círculos de radio `radii` con trazo centrado en el borde."""
+    height, width = shape
+    fill = np.zeros(shape, dtype=np.float32)
+    ring = np.zeros(shape, dtype=np.float32)
+    half = stroke_px / 2
+    for (cx, cy), radius in zip(centers, radii):
+        reach = radius + half + 1
+        x_lo, x_hi = max(0, int(cx - reach)), min(width, int(math.ceil(cx + reach)) + 1)
+        y_lo, y_hi = max(0, int(cy - reach)), min(height, int(math.ceil(cy + reach)) + 1)
+        if x_lo >= x_hi or y_lo >= y_hi:
+            continue
+        ys, xs = np.ogrid[y_lo:y_hi, x_lo:x_hi]
+        dist = np.hypot(xs - cx, ys - cy)
+        patch = (slice(y_lo, y_hi), slice(x_lo, x_hi))
+        fill[patch] = np.maximum(fill[patch], np.clip(radius - dist + 0.5, 0, 1))
+        if stroke_px > 0:
+            ring_cov = np.clip(half - np.abs(dist - radius) + 0.5, 0, 1) * min(1.0, stroke_px)
+            ring[patch] = np.maximum(ring[patch], ring_cov)
+    return fill, ring
+
+
+def _glow_alpha(mask: np.ndarray, sigmas: Sequence[float], scale: float) -> np.ndarray:
+    """feMerge(blur(σ1), …, SourceGraphic) de un trazo de un solo color: sólo cambia el alfa."""
+    transparency = 1 - mask
+    for sigma in sigmas:
+        transparency *= 1 - _gaussian_blur(mask, sigma * scale)
+    return 1 - transparency
+
+
+def _paint(rgb: np.ndarray, alpha: np.ndarray, mask: np.ndarray, color: Tuple[float, float, float]) -> None:
+    """Compone (in situ, premultiplicado) una capa de color sólido con cobertura `mask`."""
+    keep = 1 - mask
+    rgb *= keep[..., None]
+    rgb += mask[..., None] * np.asarray(color, dtype=np.float32)
+    alpha *= keep
+    alpha += mask
+
+
+def render_mandala(
+    xs: Sequence[float],
+    ys: Sequence[float],
+    frequency_hz: float,
+    glow_color: str,
+    secondary_color: Optional[str],
+    size: int = 512,
+    transparent: bool = False,
+) -> np.ndarray:
+    """Imagen RGBA uint8 (size x size) de la mandala, con las mismas capas que el cliente web."""
+    scale = size / VIEWBOX
+    # Centros de píxel en coordenadas enteras
+    points = np.column_stack([np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)]) * scale - 0.5
+    total = len(points)
+    active = hex_to_rgb(glow_color or "#22d3ee")
+    secondary = hex_to_rgb(secondary_color) if secondary_color else active
+
+    out = np.zeros((size, size, 4), dtype=np.uint8)
+    if not transparent:
+        out[..., :3] = BACKGROUND
+        out[..., 3] = 255
+    if total == 0:
+        return out
+
+    # Sólo se dibuja la caja de la mandala más el alcance del brillo (3σ del desenfoque mayor)
+    margin = int(math.ceil((3 * max(HEAVY_GLOW) + 3.5 + 1.5) * scale)) + 2
+    x_lo, y_lo = np.maximum(0, np.floor(points.min(axis=0)).astype(int) - margin)
+    x_hi, y_hi = np.minimum(size, np.ceil(points.max(axis=0)).astype(int) + margin + 1)
+    if x_lo >= x_hi or y_lo >= y_hi:
+        return out
+    shape = (int(y_hi - y_lo), int(x_hi - x_lo))
+    points = points - (x_lo, y_lo)
+
+    step2 = max(2, int(math.floor((frequency_hz % 4) + 2)))
+    step3 = max(5, total // 2)
+    idx = np.arange(total)
+
+    def links(step):
+        return points, points[(idx + step) % total]
+
+    rgb = np.zeros(shape + (3,), dtype=np.float32)
+    alpha = np.zeros(shape, dtype=np.float32)
+    # Capa de Red 3 (sin brillo), Red 2 (brillo ligero), Red 1 (brillo intenso) y nodos encima
+    line3 = _stroke_mask(*links(step3), 0.5 * scale, shape, dash=(2 * scale, 6 * scale))
+    _paint(rgb, alpha, line3 * 0.35, active)
+
+    dash2 = None if frequency_hz % 2 == 0 else (4 * scale, 3 * scale)
+    line2 = _stroke_mask(*links(step2), 0.8 * scale, shape, dash=dash2)
+    _paint(rgb, alpha, _glow_alpha(line2, LIGHT_GLOW, scale) * 0.6, secondary)
+
+    line1 = _stroke_mask(*links(1), 1.4 * scale, shape)
+    _paint(rgb, alpha, _glow_alpha(line1, HEAVY_GLOW, scale) * 0.9, active)
+
+    # Nodos: relleno blanco y aro de color; su brillo mezcla ambos colores (desenfoque del RGBA premultiplicado)
+    radii = [(3.5 if i % 2 == 0 else 2.0) * scale for i in range(total)]
+    fill, ring = _node_masks(points, radii, 1.5 * scale, shape)
+    white, colored = fill * (1 - ring), ring
+    active_rgb = np.asarray(active, dtype=np.float32)
+    # El blanco es (1, 1, 1): su aporte premultiplicado es el propio alfa en cada canal
+    node_rgb = white[..., None] + colored[..., None] * active_rgb
+    node_alpha = white + colored
+    for sigma in HEAVY_GLOW:
+        blur_white, blur_colored = np.moveaxis(_gaussian_blur(np.stack([white, colored], axis=-1), sigma * scale), -1, 0)
+        below = 1 - node_alpha
+        node_rgb += below[..., None] * (blur_white[..., None] + blur_colored[..., None] * active_rgb)
+        node_alpha += below * (blur_white + blur_colored)
+    rgb *= (1 - node_alpha)[..., None]
+    rgb += node_rgb
+    alpha *= 1 - node_alpha
+    alpha += node_alpha
+    core, _ = _node_masks(points, [1.0 * scale] * total, 0.0, shape)
+    _paint(rgb, alpha, core, WHITE)
+
+    region = out[y_lo:y_hi, x_lo:x_hi]
+    if transparent:
+        # De premultiplicado a RGBA recto para codificar
+        straight = np.divide(rgb, alpha[..., None], out=np.zeros_like(rgb), where=alpha[..., None] > 1e-6)
+        region[..., :3] = np.clip(straight * 255 + 0.5, 0, 255)
+        region[..., 3] = np.clip(alpha * 255 + 0.5, 0, 255)
+    else:
+        background = np.asarray(BACKGROUND, dtype=np.float32) / 255
+        region[..., :3] = np.clip((rgb + background * (1 - alpha[..., None])) * 255 + 0.5, 0, 255)
+    return out
+
+
+def encode_image(rgba: np.ndarray, fmt: str, transparent: bool = False) -> bytes:
+    from PIL import Image
+
+    image = Image.fromarray(rgba, "RGBA")
+    if not transparent:
+        image = image.convert("RGB")
+    buffer = BytesIO()
+    if fmt == "webp":
+        image.save(buffer, format="WEBP", quality=90, method=4)
+    else:
+        image.save(buffer, format="PNG", compress_level=6)
+    return buffer.getvalue()
@@ -0,0 +1,348 @@
+# -----------------------------------------------------
+# MÉTRICAS ESTILO PROMETHEUS (SIN DEPENDENCIAS)
+# -----------------------------------------------------
+# Contadores, gauges e histogramas en memoria con salida en el formato de
+# texto de Prometheus (0.0.4), pensados para dejarse activos en producción:
+# observar es una búsqueda binaria y dos sumas, sin locks (todo ocurre en el
+# event loop). Los valores que ya viven en otros objetos (cachés, colas,
+# salas) no se duplican: se leen al momento del scrape con "collectors".
+#
+# Incluye:
+# - MetricsMiddleware: middleware ASGI puro con latencia por ruta (plantilla,
+#   no URL concreta) y WebSockets abiertos por ruta.
+# - LoopLagMonitor: mide cuánto se retrasa el event loop respecto a lo previsto.
+# - SamplingProfiler: muestreo de la pila del hilo del event loop, activable
+#   en caliente y con salida en formato "collapsed stacks" (flamegraph).
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as StackCounter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_LAG_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+TICK_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25)
+
+LOOP_LAG_INTERVAL_S = float(os.getenv("METRICS_LOOP_LAG_INTERVAL_S", 0.1))
+PROFILER_ENABLED = os.getenv("METRICS_PROFILER", "0") in ("1", "true", "True")
+PROFILER_MAX_STACKS = 20000
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        # Sin etiquetas la serie existe desde el principio (se exporta aunque valga 0)
+        self._values: Dict[tuple, float] = {} if self.labelnames else {(): 0}
+
+    def inc(self, amount: float = 1.0, labels: tuple = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, labels: tuple = ()) -> None:
+        self._values[labels] = value
+
+    def dec(self, amount: float = 1.0, labels: tuple = ()) -> None:
+        self.inc(-amount, labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por etiquetas: [conteos por bucket (+Inf al final), suma, total]
+        self._series: Dict[tuple, list] = {}
+        if not self.labelnames:
+            self._series[()] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        bounds = [f'le="{_format_value(bound)}"' for bound in self.buckets] + ['le="+Inf"']
+        for labels, (counts, total, count) in self._series.items():
+            base = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            prefix = f"{self.name}_bucket{{{base}," if base else f"{self.name}_bucket{{"
+            cumulative = 0
+            for le, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                lines.append(f"{prefix}{le}}} {cumulative}")
+            suffix = f"{{{base}}}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {total!r}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+# Un collector devuelve [(nombre, tipo, ayuda, [(etiquetas dict, valor), ...]), ...]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[dict, float]]]]]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Collector] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                lines.append(f"# collector {getattr(collector, '__name__', collector)} falló: {type(e).__name__}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_text = _format_labels(list(labels), [str(v) for v in labels.values()])
+                    lines.append(f"{name}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Uvicorn acepta cualquier token como método: fuera de este conjunto se etiqueta "other"
+# para que un cliente no pueda crear series sin límite
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"})
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: latencia HTTP por (método, ruta, código) y WebSockets abiertos por ruta."""
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.latency = registry.histogram(
+            "cosmic_http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta.", ("method", "route", "status")
+        )
+        self.websockets = registry.gauge("cosmic_websocket_connections", "WebSockets abiertos por ruta.", ("route",))
+        self.websockets_total = registry.counter("cosmic_websocket_connections_total", "WebSockets aceptados por ruta.", ("route",))
+
+    @staticmethod
+    def _route(scope) -> str:
+        # La plantilla de la ruta (p. ej. /sessions/{upload_id}) mantiene acotadas las etiquetas
+        route = scope.get("route")
+        return getattr(route, "path", "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    async def _http(self, scope, receive, send):
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "other"
+            self.latency.observe(time.perf_counter() - start, (method, self._route(scope), str(status[0])))
+
+    async def _websocket(self, scope, receive, send):
+        accepted = []
+
+        async def send_wrapper(message):
+            if message["type"] == "websocket.accept" and not accepted:
+                labels = (self._route(scope),)
+                accepted.append(labels)
+                self.websockets.inc(1, labels)
+                self.websockets_total.inc(1, labels)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if accepted:
+                self.websockets.dec(1, accepted[0])
+
+
+class LoopLagMonitor:
+    """Duerme `interval` y mide cuánto tarda de más en despertar: eso es el bloqueo del loop."""
+
+    def __init__(self, registry: MetricsRegistry, interval: float = LOOP_LAG_INTERVAL_S):
+        self.interval = interval
+        self.histogram = registry.histogram(
+            "cosmic_event_loop_lag_seconds", "Retraso del event loop al despertar.", buckets=LOOP_LAG_BUCKETS
+        )
+        self.max_gauge = registry.gauge("cosmic_event_loop_lag_max_seconds", "Mayor retraso del event loop desde el último scrape.")
+        self._max = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.histogram.observe(lag)
+            if lag > self._max:
+                self._max = lag
+                self.max_gauge.set(lag)
+
+    def reset_max(self) -> None:
+        self._max = 0.0
+        self.max_gauge.set(0.0)
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+class SamplingProfiler:
+    """Muestrea la pila de un hilo (el del event loop) desde un hilo aparte; sin costo cuando está parado."""
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # El hilo de muestreo escribe en `stacks` mientras el event loop lo lee: ambos bajo este lock
+        self._lock = threading.Lock()
+        self.stacks: StackCounter = StackCounter()
+        self.samples = 0
+        self.hz = 0.0
+        self.started_at: Optional[float] = None
+        self.ends_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, hz: float, thread_id: Optional[int] = None) -> None:
+        if self.running:
+            return
+        with self._lock:
+            self.stacks = StackCounter()
+        self.samples = 0
+        self.hz = hz
+        self.started_at = time.time()
+        self.ends_at = self.started_at + seconds
+        self._stop.clear()
+        target = thread_id if thread_id is not None else threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, args=(target, seconds, 1.0 / hz), name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _sample(self, thread_id: int, seconds: float, interval: float) -> None:
+        deadline = time.monotonic() + seconds
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                with self._lock:
+                    if key in self.stacks or len(self.stacks) < PROFILER_MAX_STACKS:
+                        self.stacks[key] += 1
+                self.samples += 1
+            self._stop.wait(interval)
+
+    def _snapshot(self) -> StackCounter:
+        with self._lock:
+            return StackCounter(self.stacks)
+
+    def top(self, n: int) -> List[tuple]:
+        """Las `n` pilas más muestreadas, sobre una copia (el muestreo puede seguir en marcha)."""
+        return self._snapshot().most_common(n)
+
+    def collapsed(self) -> str:
+        """Formato de flamegraph.pl / speedscope: 'marco;marco;marco conteo' por línea."""
+        return "".join(f"{stack} {count}\n" for stack, count in self._snapshot().most_common())
+
+    def status(self) -> dict:
+        return {
+            "enabled": PROFILER_ENABLED,
+            "running": self.running,
+            "hz": self.hz,
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+            "started_at": self.started_at,
+            "ends_at": self.ends_at,
+        }
@@ -0,0 +1,230 @@
+# -----------------------------------------------------
+# MOTOR VECTORIZADO DE DIVINE FLOW (ESTRUCTURA DE ARREGLOS)
+# -----------------------------------------------------
+# Las posiciones, velocidades y energía viven en arreglos float32 contiguos
+# y cada tick se resuelve con operaciones sobre el arreglo completo, sin
+# recorrer partículas una por una en Python.
+
+import os
+from typing import Optional
+
+import numpy as np
+
+DOMAIN_SIZE = 100.0
+DAMPING = 0.94
+ACTIVE_FORCE = 4.5
+IDLE_FORCE = 0.3
+DIST_EPSILON = 0.1
+
+DEFAULT_PARTICLE_COUNT = int(os.getenv("DIVINE_FLOW_PARTICLES", 200))
+
+# Orden de los arreglos de estado cuando viven en un buffer externo
+STATE_FIELDS = ("x", "y", "vx", "vy", "energy")
+
+# Modos de física del oráculo (COSMIC_HOLOGRAMS). Sólo los dos primeros activan
+# interacciones entre partículas; el resto conserva la física del observador.
+PHYSICS_MODES = ("QUANTUM_MIRROR", "GRAVITATIONAL_COLLAPSE", "EXPANSION_FORCE", "CHAOS_DRIFT")
+NEIGHBOR_MODES = ("QUANTUM_MIRROR", "GRAVITATIONAL_COLLAPSE")
+
+# Radio de interacción en múltiplos de la separación media (100 / sqrt(N)):
+# mantiene ~constante el número de vecinos por partícula a cualquier densidad.
+NEIGHBOR_RADIUS_SCALE = 2.0
+MIRROR_STRENGTH = 0.02      # cohesión/repulsión tipo espejo
+MIRROR_REST_RATIO = 0.4     # por debajo de 0.4·radio repele, por encima atrae
+COLLAPSE_STRENGTH = 0.004   # atracción gravitatoria suavizada
+COLLAPSE_SOFTENING = 0.25
+
+# Mitad del vecindario 3x3: cada par de celdas se visita una sola vez
+_HALF_STENCIL = ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+
+class SpatialGrid:
+    """Rejilla uniforme (cell list) sobre el dominio 0–100, reconstruida una vez por tick.
+
+    Las partículas se ordenan por celda con un counting sort (bincount +
+    argsort estable) y los pares candidatos se generan por bloques de celdas
+    vecinas, de modo que el costo es O(N · vecinos) en lugar de O(N²).
+    """
+
+    def __init__(self, radius: float):
+        self.radius = radius
+        self.cells_per_side = max(1, int(DOMAIN_SIZE // radius))
+        self.cell_size = DOMAIN_SIZE / self.cells_per_side
+
+    def build(self, x: np.ndarray, y: np.ndarray) -> None:
+        side = self.cells_per_side
+        self.cx = np.clip((x / self.cell_size).astype(np.int64), 0, side - 1)
+        self.cy = np.clip((y / self.cell_size).astype(np.int64), 0, side - 1)
+        cell = self.cy * side + self.cx
+        self.order = np.argsort(cell, kind="stable")
+        self.counts = np.bincount(cell, minlength=side * side)
+        self.starts = np.cumsum(self.counts) - self.counts
+
+    def pairs(self):
+        """Genera (i, j) con i != j para cada par de partículas en celdas vecinas, sin repetir."""
+        side = self.cells_per_side
+        n = len(self.cx)
+        particle_idx = np.arange(n)
+        for ox, oy in _HALF_STENCIL:
+            ncx = self.cx + ox
+            ncy = self.cy + oy
+            valid = (ncx >= 0) & (ncx < side) & (ncy < side)
+            ncell = np.where(valid, ncy * side + ncx, 0)
+            per_particle = np.where(valid, self.counts[ncell], 0)
+            total = int(per_particle.sum())
+            if total == 0:
+                continue
+            i = np.repeat(particle_idx, per_particle)
+            # Posición de cada candidato dentro de su celda destino
+            first = np.cumsum(per_particle) - per_particle
+            rank = np.arange(total) - np.repeat(first, per_particle)
+            j = self.order[np.repeat(self.starts[ncell], per_particle) + rank]
+            if ox == 0 and oy == 0:
+                keep = j > i
+                i, j = i[keep], j[keep]
+            yield i, j
+
+
+class QuantumEngine:
+    """Motor de partículas de alta densidad para efectos neuronales/Interestelares"""
+
+    def __init__(
+        self,
+        count: int = DEFAULT_PARTICLE_COUNT,
+        seed: Optional[int] = None,
+        dtype=np.float32,
+        physics_mode: Optional[str] = None,
+        state_buffer=None,
+    ):
+        rng = np.random.default_rng(seed)
+        self.count = count
+        self.physics_mode = None
+        self.set_physics_mode(physics_mode)
+        self.grid = SpatialGrid(NEIGHBOR_RADIUS_SCALE * DOMAIN_SIZE / np.sqrt(max(count, 1)))
+        self.dtype = dtype = np.dtype(dtype)
+        self.ids = np.arange(count, dtype=np.int32)
+        self.x = rng.uniform(0, DOMAIN_SIZE, count).astype(dtype)
+        self.y = rng.uniform(0, DOMAIN_SIZE, count).astype(dtype)
+        self.vx = rng.uniform(-0.15, 0.15, count).astype(dtype)
+        self.vy = rng.uniform(-0.15, 0.15, count).astype(dtype)
+        self.energy = rng.uniform(0.6, 2.2, count).astype(dtype)
+        if state_buffer is not None:
+            self.bind_state(state_buffer)
+
+        # Buffers temporales reutilizados en cada tick para no asignar memoria
+        self._dx = np.empty(count, dtype=dtype)
+        self._dy = np.empty(count, dtype=dtype)
+        self._dist = np.empty(count, dtype=dtype)
+        self._force = np.empty(count, dtype=dtype)
+        self._mask = np.empty(count, dtype=bool)
+
+    def step(self, obs_x: float = 50, obs_y: float = 50, is_active: bool = False) -> None:
+        """Avanza un tick: atracción al observador, amortiguación y rebote en los bordes."""
+        dx, dy, dist, force, mask = self._dx, self._dy, self._dist, self._force, self._mask
+
+        np.subtract(self._scalar(obs_x), self.x, out=dx)
+        np.subtract(self._scalar(obs_y), self.y, out=dy)
+        np.multiply(dx, dx, out=dist)
+        np.multiply(dy, dy, out=force)
+        dist += force
+        np.sqrt(dist, out=dist)
+        dist += self._scalar(DIST_EPSILON)
+
+        np.divide(self._scalar(ACTIVE_FORCE if is_active else IDLE_FORCE), dist, out=force)
+        dx /= dist
+        dy /= dist
+        dx *= force
+        dy *= force
+        self.vx += dx
+        self.vy += dy
+
+        if self.physics_mode in NEIGHBOR_MODES:
+            self._apply_neighbor_forces()
+
+        self.x += self.vx
+        self.y += self.vy
+
+        self.vx *= self._scalar(DAMPING)
+        self.vy *= self._scalar(DAMPING)
+
+        self._bounce(self.x, self.vx, mask)
+        self._bounce(self.y, self.vy, mask)
+
+    @staticmethod
+    def state_nbytes(count: int, dtype=np.float32) -> int:
+        """Bytes necesarios para alojar el estado (STATE_FIELDS) en un buffer externo."""
+        return len(STATE_FIELDS) * count * np.dtype(dtype).itemsize
+
+    def bind_state(self, buffer) -> None:
+        """Mueve el estado a vistas sobre `buffer` (p. ej. memoria compartida) conservando sus valores.
+
+        Todas las operaciones de `step` son in-place, así que a partir de aquí
+        el motor escribe directamente en el buffer sin copias adicionales.
+        """
+        stride = self.count * self.dtype.itemsize
+        for index, field in enumerate(STATE_FIELDS):
+            view = np.frombuffer(buffer, dtype=self.dtype, count=self.count, offset=index * stride)
+            view[:] = getattr(self, field)
+            setattr(self, field, view)
+
+    def set_physics_mode(self, mode: Optional[str]) -> None:
+        if mode is not None and mode not in PHYSICS_MODES:
+            raise ValueError(f"Modo de física desconocido: {mode}")
+        self.physics_mode = mode
+
+    def _apply_neighbor_forces(self) -> None:
+        """Suma a las velocidades las fuerzas entre vecinos dentro del radio de interacción."""
+        grid = self.grid
+        grid.build(self.x, self.y)
+        radius = grid.radius
+        radius_sq = radius * radius
+        n = self.count
+        ax = np.zeros(n, dtype=np.float64)
+        ay = np.zeros(n, dtype=np.float64)
+
+        for i, j in grid.pairs():
+            dx = self.x[j] - self.x[i]
+            dy = self.y[j] - self.y[i]
+            d2 = dx * dx + dy * dy
+            near = d2 < radius_sq
+            if not near.any():
+                continue
+            i, j, dx, dy, d2 = i[near], j[near], dx[near], dy[near], d2[near]
+            dist = np.sqrt(d2) + DIST_EPSILON
+
+            if self.physics_mode == "QUANTUM_MIRROR":
+                # Positivo = cohesión hacia el vecino; negativo = repulsión
+                magnitude = MIRROR_STRENGTH * (dist / radius - MIRROR_REST_RATIO)
+            else:
+                magnitude = COLLAPSE_STRENGTH / (d2 + COLLAPSE_SOFTENING)
+
+            fx = dx / dist * magnitude
+            fy = dy / dist * magnitude
+            # Acción y reacción: cada par se aplica a ambas partículas
+            ax += np.bincount(i, weights=fx, minlength=n)
+            ax -= np.bincount(j, weights=fx, minlength=n)
+            ay += np.bincount(i, weights=fy, minlength=n)
+            ay -= np.bincount(j, weights=fy, minlength=n)
+
+        self.vx += ax.astype(self.dtype)
+        self.vy += ay.astype(self.dtype)
+
+    def _scalar(self, value: float):
+        return self.dtype.type(value)
+
+    @staticmethod
+    def _bounce(pos: np.ndarray, vel: np.ndarray, mask: np.ndarray) -> None:
+        np.less(pos, 0, out=mask)
+        mask |= pos > DOMAIN_SIZE
+        np.negative(vel, out=vel, where=mask)
+
+    @property
+    def particles(self) -> list:
+        """Vista compatible con el formato JSON original ({id, x, y, vx, vy, energy})."""
+        return [
+            {"id": i, "x": x, "y": y, "vx": vx, "vy": vy, "energy": e}
+            for i, x, y, vx, vy, e in zip(
+                self.ids.tolist(), self.x.tolist(), self.y.tolist(),
+                self.vx.tolist(), self.vy.tolist(), self.energy.tolist(),
+            )
+        ]
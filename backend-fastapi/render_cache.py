@@ -0,0 +1,187 @@
+# -----------------------------------------------------
+# CACHÉ DIRECCIONADA POR CONTENIDO DE IMÁGENES RENDERIZADAS
+# -----------------------------------------------------
+# La clave de una imagen es el SHA-256 de todo lo que determina sus bytes
+# (versión del dibujo, nodos, colores, tamaño, formato...), así que dos
+# textos que producen la misma mandala comparten entrada y la clave sirve
+# tal cual de ETag. Tres niveles:
+#
+# - Memoria: LRU acotada en número de imágenes (TTLCache sin expiración).
+# - Disco: un archivo por clave en RENDER_CACHE_DIR/<ab>/<clave>.<formato>,
+#   escrito de forma atómica; sobrevive a reinicios y se comparte entre
+#   workers. Se poda por antigüedad al superar RENDER_DISK_CACHE_MAX_MB.
+# - Vuelo único: peticiones simultáneas de la misma imagen esperan al mismo
+#   render en lugar de repetirlo.
+#
+# El render y la E/S de disco corren en hilos, con un semáforo que limita
+# los renders simultáneos para no saturar la CPU del event loop.
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from cosmic_cache import TTLCache
+
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_cache"))
+RENDER_MEMORY_CACHE_SIZE = int(os.getenv("RENDER_MEMORY_CACHE_SIZE", 256))
+RENDER_DISK_CACHE_MAX_MB = float(os.getenv("RENDER_DISK_CACHE_MAX_MB", 512))
+RENDER_CONCURRENCY = int(os.getenv("RENDER_CONCURRENCY", os.cpu_count() or 1))
+
+
+def content_key(*parts) -> str:
+    """SHA-256 hexadecimal de las partes (texto o bytes) que determinan el contenido, formato incluido."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """¿Cubre la cabecera If-None-Match a `etag`? Comparación débil, como pide RFC 9110 para GET."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in if_none_match.split(","))
+
+
+class RenderCache:
+    """Imágenes por clave de contenido en memoria y disco, con renders de vuelo único."""
+
+    def __init__(
+        self,
+        directory: str = RENDER_CACHE_DIR,
+        memory_size: int = RENDER_MEMORY_CACHE_SIZE,
+        disk_max_mb: float = RENDER_DISK_CACHE_MAX_MB,
+        concurrency: int = RENDER_CONCURRENCY,
+    ):
+        self.directory = directory
+        self.memory = TTLCache(maxsize=memory_size, ttl=None)
+        self.disk_max_bytes = int(disk_max_mb * 1024 * 1024)
+        self.concurrency = max(1, concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._disk_lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+        self.disk_hits = 0
+        self.renders = 0
+        self.coalesced = 0
+        self.pruned = 0
+        self.render_seconds = 0.0
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{ext}")
+
+    def _scan_disk(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _prune(self) -> None:
+        # Se borran las imágenes menos usadas (mtime, que se renueva en cada acierto) hasta el 90 % del límite
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        target = int(self.disk_max_bytes * 0.9)
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.pruned += 1
+        self._disk_bytes = total
+
+    def _load_or_render(self, key: str, ext: str, render: Callable[[], bytes]) -> bytes:
+        path = self._path(key, ext)
+        try:
+            with open(path, "rb") as handle:
+                data = handle.read()
+            os.utime(path)
+            self.disk_hits += 1
+            return data
+        except OSError:
+            pass
+
+        start = time.perf_counter()
+        data = render()
+        self.render_seconds += time.perf_counter() - start
+        self.renders += 1
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp_path, path)
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk()
+            else:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self.disk_max_bytes:
+                self._prune()
+        return data
+
+    async def get_or_render(self, key: str, ext: str, render: Callable[[], bytes]) -> bytes:
+        """Bytes de la imagen `key`: de memoria, de disco o renderizándola (una sola vez) en un hilo."""
+        data = self.memory.get(key)
+        if data is not None:
+            return data
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            async with self._semaphore:
+                data = await asyncio.to_thread(self._load_or_render, key, ext, render)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Si nadie más esperaba, evita el aviso de "exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self.memory.set(key, data)
+        future.set_result(data)
+        return data
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "disk_hits": self.disk_hits,
+            "disk_bytes": self._disk_bytes,
+            "disk_max_bytes": self.disk_max_bytes,
+            "renders": self.renders,
+            "coalesced": self.coalesced,
+            "pruned": self.pruned,
+            "avg_render_ms": round(1000 * self.render_seconds / self.renders, 2) if self.renders else 0.0,
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,192 @@
+# -----------------------------------------------------
+# ANÁLISIS DE SEÑAL VECTORIZADO PARA STAR TRIP
+# -----------------------------------------------------
+# Las muestras de la sesión se trocean en ventanas solapadas (Hann), se pasa
+# cada bloque de ventanas por una FFT real de una sola vez y se acumulan:
+# - la potencia relativa de las bandas clásicas (delta, theta, alfa, beta, gamma),
+# - la pista de frecuencia dominante (una por ventana).
+# Cada modo (Focus / Relax / Sleep) define qué bandas premia, el rango de
+# notas y la duración base; con eso se calcula la puntuación y la sinfonía
+# de 80 notas. Las ventanas se procesan por bloques para acotar la memoria
+# aunque la sesión tenga millones de puntos, y la señal puede llegar por
+# trozos (SpectralAccumulator) sin guardarla entera.
+
+import os
+from typing import Dict, List
+
+import numpy as np
+
+DEFAULT_SAMPLE_RATE_HZ = float(os.getenv("STAR_TRIP_SAMPLE_RATE_HZ", 256))
+# Por encima de ~11,5 kHz ningún bin de la FFT de 256 cae en 0,5-45 Hz; 2 kHz sobra para EEG/HRV
+MAX_SAMPLE_RATE_HZ = float(os.getenv("STAR_TRIP_MAX_SAMPLE_RATE_HZ", 2048))
+WINDOW_SIZE = 256
+HOP_SIZE = 128
+# Ventanas por bloque de FFT: 4096 x 256 float32 = 4 MB de temporales
+WINDOWS_PER_BLOCK = 4096
+SYMPHONY_NOTES = 80
+
+BANDS = {
+    "delta": (0.5, 4.0),
+    "theta": (4.0, 8.0),
+    "alpha": (8.0, 13.0),
+    "beta": (13.0, 30.0),
+    "gamma": (30.0, 45.0),
+}
+
+MODE_PROFILES = {
+    "Focus": {"target_bands": ("beta", "gamma"), "pitch_range": (64, 90), "base_duration_ms": 200, "tempo_bpm": 120},
+    "Relax": {"target_bands": ("alpha", "theta"), "pitch_range": (57, 81), "base_duration_ms": 300, "tempo_bpm": 85},
+    "Sleep": {"target_bands": ("delta", "theta"), "pitch_range": (48, 72), "base_duration_ms": 400, "tempo_bpm": 85},
+}
+
+# Rango de la puntuación original (93.0 - 99.5)
+SCORE_MIN, SCORE_SPAN = 93.0, 6.5
+
+
+def finite_samples(values) -> np.ndarray:
+    """float32 sin NaN/inf (sólo copia si hay algo que limpiar)."""
+    with np.errstate(over="ignore"):
+        samples = np.asarray(values, dtype=np.float32)
+    if not np.isfinite(samples).all():
+        samples = np.nan_to_num(samples, nan=0.0, posinf=0.0, neginf=0.0)
+    return samples
+
+
+def samples_from_bytes(payload: bytes) -> np.ndarray:
+    """Vista float32 little-endian sobre el cuerpo binario, sin copiar."""
+    return finite_samples(np.frombuffer(payload, dtype="<f4"))
+
+
+def _band_masks(freqs: np.ndarray) -> Dict[str, np.ndarray]:
+    return {name: (freqs >= low) & (freqs < high) for name, (low, high) in BANDS.items()}
+
+
+class SpectralAccumulator:
+    """Análisis por ventanas alimentado por trozos: sólo guarda la cola que aún no llena una ventana.
+
+    Las ventanas caen en las mismas posiciones (múltiplos de HOP_SIZE) que si
+    toda la señal llegara de una vez, así que el resultado final es el mismo.
+    """
+
+    def __init__(self, sample_rate: float = DEFAULT_SAMPLE_RATE_HZ):
+        self.sample_rate = sample_rate
+        self.freqs = np.fft.rfftfreq(WINDOW_SIZE, d=1.0 / sample_rate)
+        self._masks = _band_masks(self.freqs)
+        self._taper = np.hanning(WINDOW_SIZE).astype(np.float32)
+        # Ni la componente continua ni lo que cae fuera de las bandas cuenta para la dominante
+        self._usable = (self.freqs >= BANDS["delta"][0]) & (self.freqs < BANDS["gamma"][1])
+        if not self._usable.any():
+            raise ValueError(
+                f"sample_rate_hz={sample_rate:g} no deja ningún bin de la FFT entre "
+                f"{BANDS['delta'][0]} y {BANDS['gamma'][1]} Hz."
+            )
+        self._tail = np.empty(0, dtype=np.float32)
+        self._band_sums = {name: 0.0 for name in BANDS}
+        self._dominant: List[np.ndarray] = []
+        self._energy: List[np.ndarray] = []
+        self.samples = 0
+        self.windows = 0
+
+    def feed(self, samples: np.ndarray) -> None:
+        samples = np.asarray(samples, dtype=np.float32)
+        self.samples += samples.size
+        buffer = np.concatenate((self._tail, samples)) if self._tail.size else samples
+        if buffer.size < WINDOW_SIZE:
+            self._tail = buffer.copy()
+            return
+        frames = np.lib.stride_tricks.sliding_window_view(buffer, WINDOW_SIZE)[::HOP_SIZE]
+        for start in range(0, len(frames), WINDOWS_PER_BLOCK):
+            self._process(frames[start:start + WINDOWS_PER_BLOCK])
+        self._tail = buffer[len(frames) * HOP_SIZE:].copy()
+
+    def _process(self, block: np.ndarray) -> None:
+        block = (block - block.mean(axis=1, keepdims=True)) * self._taper
+        power = np.abs(np.fft.rfft(block, axis=1)) ** 2
+        for name, mask in self._masks.items():
+            self._band_sums[name] += float(power[:, mask].sum())
+        usable = power[:, self._usable]
+        self._dominant.append(self.freqs[self._usable][np.argmax(usable, axis=1)])
+        self._energy.append(usable.sum(axis=1))
+        self.windows += len(block)
+
+    def features(self) -> dict:
+        if not self.windows:
+            # Sesión más corta que una ventana: se completa con ceros, como el análisis de una vez
+            self._process(np.pad(self._tail, (0, WINDOW_SIZE - self._tail.size))[np.newaxis, :])
+            self._tail = np.empty(0, dtype=np.float32)
+        total = sum(self._band_sums.values())
+        band_powers = {
+            name: (value / total if total > 0 else 1.0 / len(BANDS)) for name, value in self._band_sums.items()
+        }
+        return {
+            "band_powers": band_powers,
+            "dominant_track": np.concatenate(self._dominant),
+            "energy_track": np.concatenate(self._energy),
+            "windows": self.windows,
+        }
+
+
+def spectral_features(samples: np.ndarray, sample_rate: float = DEFAULT_SAMPLE_RATE_HZ) -> dict:
+    """Potencia media por banda, pista de frecuencia dominante y energía por ventana."""
+    accumulator = SpectralAccumulator(sample_rate)
+    accumulator.feed(samples)
+    return accumulator.features()
+
+
+def _resample(track: np.ndarray, count: int) -> np.ndarray:
+    if len(track) == 1:
+        return np.full(count, track[0])
+    return np.interp(np.linspace(0, len(track) - 1, count), np.arange(len(track)), track)
+
+
+def compose_symphony(features: dict, mode: str) -> dict:
+    """Pista dominante -> notas (escala logarítmica de frecuencia); energía -> duración."""
+    profile = MODE_PROFILES[mode]
+    low_pitch, high_pitch = profile["pitch_range"]
+    low_hz, high_hz = BANDS["delta"][0], BANDS["gamma"][1]
+
+    dominant = np.clip(_resample(features["dominant_track"], SYMPHONY_NOTES), low_hz, high_hz)
+    position = np.log(dominant / low_hz) / np.log(high_hz / low_hz)
+    pitch = np.rint(low_pitch + position * (high_pitch - low_pitch)).astype(np.int64)
+
+    energy = _resample(features["energy_track"], SYMPHONY_NOTES)
+    peak = energy.max()
+    relative = energy / peak if peak > 0 else np.zeros_like(energy)
+    # Más energía en el tramo = nota más larga; cuantizado a 50 ms
+    duration = profile["base_duration_ms"] * (0.5 + relative)
+    duration_ms = (np.rint(duration / 50) * 50).astype(np.int64)
+
+    # Arrays int64 tal cual: fast_json los codifica sin convertirlos antes a listas
+    return {
+        "pitch": pitch,
+        "duration_ms": duration_ms,
+        "tempo_bpm": profile["tempo_bpm"],
+        "instrument": f"Cosmic Synth - {mode}",
+    }
+
+
+def session_score(features: dict, mode: str) -> float:
+    """Proporción de potencia en las bandas del modo (70 %) y estabilidad de la dominante (30 %)."""
+    target = sum(features["band_powers"][band] for band in MODE_PROFILES[mode]["target_bands"])
+    track = features["dominant_track"]
+    mean = track.mean()
+    stability = 1.0 - min(1.0, float(track.std() / mean)) if mean > 0 else 1.0
+    return round(SCORE_MIN + SCORE_SPAN * (0.7 * target + 0.3 * stability), 2)
+
+
+def summarize_session(features: dict, mode: str, sample_rate: float) -> dict:
+    track = features["dominant_track"]
+    return {
+        "score": session_score(features, mode),
+        "symphony": compose_symphony(features, mode),
+        "analysis": {
+            "sample_rate_hz": sample_rate,
+            "windows": features["windows"],
+            "band_powers": {name: round(value, 4) for name, value in features["band_powers"].items()},
+            "dominant_hz": round(float(np.median(track)), 3),
+        },
+    }
+
+
+def analyze_session(samples: np.ndarray, mode: str, sample_rate: float = DEFAULT_SAMPLE_RATE_HZ) -> dict:
+    return summarize_session(spectral_features(samples, sample_rate), mode, sample_rate)
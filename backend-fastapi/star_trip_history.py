@@ -0,0 +1,390 @@
+# -----------------------------------------------------
+# HISTORIAL Y ESTADÍSTICAS DE STAR TRIP (AGREGADOS PRECALCULADOS)
+# -----------------------------------------------------
+# Las sesiones se escriben en star_trip_results/{uid}/sessions/{sid}. Un
+# panel que recorriera esa subcolección en cada visita costaría O(sesiones)
+# lecturas. En su lugar, cada usuario tiene un documento de agregados en
+# star_trip_results/{uid} (campo `stats`) que se actualiza en O(1) con cada
+# sesión escrita y viaja en el mismo batch del write-behind:
+#
+# - Totales y medias por modo, mejor puntuación (global y por modo), rachas
+#   de días consecutivos (UTC) y las últimas HISTORY_RECENT_SESSIONS sesiones,
+#   que sirven la primera página del historial sin consultar la subcolección.
+# - Caché en memoria acotada por usuario (LRU con TTL) con lectura a través:
+#   un fallo lee un solo documento; si el usuario no tiene agregados todavía
+#   (sesiones anteriores a este módulo) se reconstruyen una vez recorriendo
+#   sus sesiones. Las páginas siguientes del historial se consultan ordenadas
+#   por timestamp y se cachean hasta la siguiente sesión del usuario.
+# - Reescribir una sesión reciente (mismo session_id) descuenta la versión
+#   anterior; las mejores puntuaciones sólo suben. Una sesión más antigua
+#   que la última no altera la racha.
+#
+# Con varios workers cada proceso mantiene sus propios agregados en caché:
+# el TTL acota cuánto tarda en verse lo que escribió otro proceso.
+
+import asyncio
+import datetime
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cosmic_cache import TTLCache
+from firestore_writer import document_ref
+
+HISTORY_CACHE_USERS = int(os.getenv("STAR_TRIP_HISTORY_CACHE_USERS", 10000))
+HISTORY_CACHE_TTL_S = float(os.getenv("STAR_TRIP_HISTORY_CACHE_TTL_S", 300))
+HISTORY_RECENT_SESSIONS = int(os.getenv("STAR_TRIP_HISTORY_RECENT", 20))
+# Páginas de historial cacheadas por usuario (se vacían con cada sesión nueva)
+HISTORY_PAGES_PER_USER = 16
+MAX_HISTORY_PAGE = 100
+RESULTS_COLLECTION = "star_trip_results"
+AGGREGATE_VERSION = 1
+
+
+class HistoryError(Exception):
+    """Error de consulta con su código HTTP (el endpoint lo traduce a HTTPException)."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def session_day(timestamp: float) -> int:
+    """Día UTC (ordinal) de una marca de tiempo Unix."""
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).date().toordinal()
+
+
+def empty_aggregate() -> dict:
+    return {
+        "version": AGGREGATE_VERSION,
+        "sessions": 0,
+        "total_score": 0.0,
+        "best": None,
+        "modes": {},
+        "first_timestamp": None,
+        "last_timestamp": None,
+        "streak": {"current": 0, "longest": 0, "last_day": None},
+        "recent": [],
+    }
+
+
+def _count(aggregate: dict, entry: dict, sign: int) -> None:
+    aggregate["sessions"] += sign
+    aggregate["total_score"] += sign * entry["score"]
+    mode = aggregate["modes"].setdefault(entry["mode"], {"sessions": 0, "total_score": 0.0, "best_score": None})
+    mode["sessions"] += sign
+    mode["total_score"] += sign * entry["score"]
+    if sign > 0 and (mode["best_score"] is None or entry["score"] > mode["best_score"]):
+        mode["best_score"] = entry["score"]
+
+
+def _order(entry: dict) -> Tuple[int, str]:
+    # Mismo orden que la consulta de Firestore: timestamp y, en empate, id de documento (ambos descendentes)
+    return entry["timestamp"], entry["session_id"]
+
+
+def apply_session(aggregate: dict, session_id: str, data: dict, recent_size: int = HISTORY_RECENT_SESSIONS) -> None:
+    """Suma una sesión escrita ({timestamp, score, mode}) a los agregados, en O(1)."""
+    entry = {
+        "session_id": session_id,
+        "timestamp": int(data.get("timestamp", 0)),
+        "score": float(data.get("score", 0.0)),
+        "mode": str(data.get("mode", "Focus")),
+    }
+    recent = aggregate["recent"]
+    previous = next((item for item in recent if item["session_id"] == session_id), None)
+    if previous is not None:
+        # Reescritura de una sesión reciente: se descuenta la versión anterior
+        recent.remove(previous)
+        _count(aggregate, previous, -1)
+    _count(aggregate, entry, +1)
+
+    best = aggregate["best"]
+    if best is None or entry["score"] > best["score"]:
+        aggregate["best"] = dict(entry)
+    timestamp = entry["timestamp"]
+    if aggregate["first_timestamp"] is None or timestamp < aggregate["first_timestamp"]:
+        aggregate["first_timestamp"] = timestamp
+    if aggregate["last_timestamp"] is None or timestamp > aggregate["last_timestamp"]:
+        aggregate["last_timestamp"] = timestamp
+
+    streak = aggregate["streak"]
+    day, last_day = session_day(timestamp), streak["last_day"]
+    if last_day is None or day > last_day + 1:
+        streak["current"] = 1
+    elif day == last_day + 1:
+        streak["current"] += 1
+    if last_day is None or day > last_day:
+        streak["last_day"] = day
+    streak["longest"] = max(streak["longest"], streak["current"])
+
+    # Recientes ordenadas de más nueva a más antigua; en el límite se descarta la más vieja
+    position = 0
+    while position < len(recent) and _order(recent[position]) > _order(entry):
+        position += 1
+    recent.insert(position, entry)
+    del recent[recent_size:]
+
+
+def snapshot(aggregate: dict) -> dict:
+    """Copia para el write-behind: el hilo del commit no debe ver los cambios posteriores."""
+    return {
+        **aggregate,
+        "modes": {name: dict(mode) for name, mode in aggregate["modes"].items()},
+        "streak": dict(aggregate["streak"]),
+        "recent": list(aggregate["recent"]),
+    }
+
+
+def public_stats(aggregate: dict, today: Optional[int] = None) -> dict:
+    """Vista del panel: medias, mejores puntuaciones y rachas (la actual se corta si ayer no hubo sesión)."""
+    today = session_day(datetime.datetime.now(datetime.timezone.utc).timestamp()) if today is None else today
+    streak = aggregate["streak"]
+    alive = streak["last_day"] is not None and streak["last_day"] >= today - 1
+    sessions = aggregate["sessions"]
+    return {
+        "sessions": sessions,
+        "average_score": round(aggregate["total_score"] / sessions, 2) if sessions else None,
+        "best": aggregate["best"],
+        "modes": {
+            name: {
+                "sessions": mode["sessions"],
+                "average_score": round(mode["total_score"] / mode["sessions"], 2),
+                "best_score": mode["best_score"],
+            }
+            for name, mode in sorted(aggregate["modes"].items()) if mode["sessions"] > 0
+        },
+        "streak": {
+            "current": streak["current"] if alive else 0,
+            "longest": streak["longest"],
+            "last_session_day": (
+                datetime.date.fromordinal(streak["last_day"]).isoformat() if streak["last_day"] is not None else None
+            ),
+        },
+        "first_session_at": aggregate["first_timestamp"],
+        "last_session_at": aggregate["last_timestamp"],
+    }
+
+
+def encode_cursor(page: List[dict], previous: Optional[Tuple[int, int]] = None) -> str:
+    """Cursor "timestamp.n": la siguiente página empieza en ese timestamp saltando las n ya servidas."""
+    last = page[-1]["timestamp"]
+    ties = sum(1 for entry in page if entry["timestamp"] == last)
+    if previous is not None and previous[0] == last:
+        # Toda la página compartía el timestamp del cursor anterior: los empates se acumulan
+        ties += previous[1]
+    return f"{last}.{ties}"
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        timestamp, _, ties = cursor.partition(".")
+        decoded = int(timestamp), int(ties)
+    except ValueError:
+        raise HistoryError(400, "Cursor de historial inválido.")
+    if decoded[1] < 1:
+        raise HistoryError(400, "Cursor de historial inválido.")
+    return decoded
+
+
+class UserHistory:
+    """Agregados de un usuario y las páginas de historial ya consultadas."""
+
+    __slots__ = ("aggregate", "pages")
+
+    def __init__(self, aggregate: dict):
+        self.aggregate = aggregate
+        self.pages: Dict[Tuple[Optional[str], int], dict] = {}
+
+
+class StarTripHistory:
+    """Lectura del historial y las estadísticas de Star Trip con agregados mantenidos al escribir."""
+
+    def __init__(
+        self,
+        get_client: Callable[[], Any],
+        writer,
+        cache_users: int = HISTORY_CACHE_USERS,
+        ttl: float = HISTORY_CACHE_TTL_S,
+        recent_size: int = HISTORY_RECENT_SESSIONS,
+    ):
+        self._get_client = get_client
+        self.writer = writer
+        self.recent_size = recent_size
+        self.users = TTLCache(maxsize=cache_users, ttl=ttl)
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Sesiones escritas mientras se cargan los agregados de su usuario
+        self._buffered: Dict[str, List[Tuple[str, dict]]] = {}
+        self.aggregate_reads = 0
+        self.rebuilds = 0
+        self.session_reads = 0
+        self.page_queries = 0
+        self.page_hits = 0
+        self.persist_rejected = 0
+        self.last_error: Optional[str] = None
+
+    # --- Escritura: se llama justo después de encolar la sesión en el write-behind ---
+
+    def record(self, user_id: str, session_id: str, data: dict) -> None:
+        entry = self.users.get(user_id)
+        if entry is None:
+            self._buffered.setdefault(user_id, []).append((session_id, data))
+            self._ensure_loading(user_id)
+            return
+        apply_session(entry.aggregate, session_id, data, self.recent_size)
+        entry.pages.clear()
+        self._persist(user_id, entry.aggregate)
+
+    def _persist(self, user_id: str, aggregate: dict) -> None:
+        # Misma ruta en cola = se fusiona: una ráfaga de sesiones es una sola escritura de agregados
+        if not self.writer.enqueue((RESULTS_COLLECTION, user_id), {"stats": snapshot(aggregate)}):
+            self.persist_rejected += 1
+
+    # --- Carga de agregados (lectura a través de la caché, vuelo único por usuario) ---
+
+    def _read_aggregate(self, user_id: str) -> Optional[dict]:
+        db = self._get_client()
+        if db is None:
+            raise RuntimeError("Firestore no disponible")
+        doc = document_ref(db, (RESULTS_COLLECTION, user_id)).get()
+        self.aggregate_reads += 1
+        stats = (doc.to_dict() or {}).get("stats") if doc.exists else None
+        return stats if isinstance(stats, dict) and stats.get("version") == AGGREGATE_VERSION else None
+
+    def _scan_sessions(self, user_id: str) -> List[Tuple[str, dict]]:
+        db = self._get_client()
+        if db is None:
+            raise RuntimeError("Firestore no disponible")
+        sessions = [(doc.id, doc.to_dict() or {}) for doc in document_ref(db, (RESULTS_COLLECTION, user_id, "sessions")).stream()]
+        self.session_reads += len(sessions)
+        sessions.sort(key=lambda item: (int(item[1].get("timestamp", 0)), item[0]))
+        return sessions
+
+    async def _load(self, user_id: str) -> UserHistory:
+        # Un agregado aún sin confirmar (en cola o en vuelo) es más nuevo que el de Firestore
+        pending = self.writer.peek((RESULTS_COLLECTION, user_id))
+        aggregate = snapshot(pending["stats"]) if pending is not None else None
+        scanned = set()
+        if aggregate is None:
+            aggregate = await asyncio.to_thread(self._read_aggregate, user_id)
+        if aggregate is None:
+            # Usuario sin agregados: se reconstruyen una sola vez desde sus sesiones
+            sessions = await asyncio.to_thread(self._scan_sessions, user_id)
+            aggregate = empty_aggregate()
+            for session_id, data in sessions:
+                apply_session(aggregate, session_id, data, self.recent_size)
+                scanned.add(session_id)
+            self.rebuilds += 1
+        entry = UserHistory(aggregate)
+        # Sin await desde aquí: lo registrado durante la carga se aplica antes de publicar la entrada
+        buffered = self._buffered.pop(user_id, [])
+        for session_id, data in buffered:
+            if session_id not in scanned:
+                apply_session(aggregate, session_id, data, self.recent_size)
+        if buffered or scanned:
+            self._persist(user_id, aggregate)
+        self.users.set(user_id, entry)
+        return entry
+
+    def _ensure_loading(self, user_id: str) -> asyncio.Future:
+        pending = self._loading.get(user_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load(user_id))
+            self._loading[user_id] = pending
+            pending.add_done_callback(lambda task: self._loaded(user_id, task))
+        return pending
+
+    def _loaded(self, user_id: str, task: asyncio.Future) -> None:
+        self._loading.pop(user_id, None)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            # Lo registrado sigue en _buffered: se aplica en la siguiente carga
+            self.last_error = f"{type(error).__name__}: {error}"
+            print(f"⚠️ Historial de Star Trip: no se pudieron cargar los agregados de {user_id} ({self.last_error}).")
+
+    async def _entry(self, user_id: str) -> UserHistory:
+        entry = self.users.get(user_id)
+        if entry is not None:
+            return entry
+        try:
+            return await asyncio.shield(self._ensure_loading(user_id))
+        except Exception as e:
+            raise HistoryError(503, f"Historial de Star Trip no disponible: {type(e).__name__}.")
+
+    # --- Lectura ---
+
+    async def stats(self, user_id: str) -> dict:
+        entry = await self._entry(user_id)
+        return {"user_id": user_id, **public_stats(entry.aggregate)}
+
+    def _query_page(self, user_id: str, cursor: Optional[Tuple[int, int]], limit: int) -> List[dict]:
+        db = self._get_client()
+        if db is None:
+            raise RuntimeError("Firestore no disponible")
+        query = document_ref(db, (RESULTS_COLLECTION, user_id, "sessions")).order_by("timestamp", direction="DESCENDING")
+        if cursor is not None:
+            # Firestore desempata por id de documento en el mismo sentido: el offset salta los ya servidos
+            query = query.start_at({"timestamp": cursor[0]}).offset(cursor[1])
+        page = []
+        for doc in query.limit(limit + 1).stream():
+            data = doc.to_dict() or {}
+            page.append({
+                "session_id": doc.id,
+                "timestamp": int(data.get("timestamp", 0)),
+                "score": float(data.get("score", 0.0)),
+                "mode": str(data.get("mode", "Focus")),
+            })
+        self.session_reads += len(page)
+        return page
+
+    async def history(self, user_id: str, limit: int = HISTORY_RECENT_SESSIONS, cursor: Optional[str] = None) -> dict:
+        """Sesiones de la más nueva a la más antigua; `next_cursor` pide la página siguiente."""
+        decoded = decode_cursor(cursor) if cursor is not None else None
+        entry = await self._entry(user_id)
+        aggregate = entry.aggregate
+        recent = aggregate["recent"]
+        if decoded is None and (limit <= len(recent) or aggregate["sessions"] <= len(recent)):
+            # Primera página: sale de los agregados, sin tocar Firestore
+            sessions = recent[:limit]
+            more = aggregate["sessions"] > len(sessions)
+        else:
+            key = (cursor, limit)
+            page = entry.pages.get(key)
+            if page is not None:
+                self.page_hits += 1
+            else:
+                self.page_queries += 1
+                try:
+                    rows = await asyncio.to_thread(self._query_page, user_id, decoded, limit)
+                except Exception as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    raise HistoryError(503, f"Historial de Star Trip no disponible: {type(e).__name__}.")
+                page = {"sessions": rows[:limit], "more": len(rows) > limit}
+                # La entrada pudo reemplazarse durante la consulta; sólo se cachea en la vigente
+                if self.users.get(user_id) is entry:
+                    if len(entry.pages) >= HISTORY_PAGES_PER_USER:
+                        entry.pages.pop(next(iter(entry.pages)))
+                    entry.pages[key] = page
+            sessions, more = page["sessions"], page["more"]
+        return {
+            "user_id": user_id,
+            "sessions": sessions,
+            "total_sessions": aggregate["sessions"],
+            "next_cursor": encode_cursor(sessions, decoded) if more and sessions else None,
+        }
+
+    def stats_summary(self) -> dict:
+        return {
+            "users": self.users.stats(),
+            "loading": len(self._loading),
+            "buffered_sessions": sum(len(items) for items in self._buffered.values()),
+            "aggregate_reads": self.aggregate_reads,
+            "rebuilds": self.rebuilds,
+            "session_reads": self.session_reads,
+            "page_queries": self.page_queries,
+            "page_hits": self.page_hits,
+            "persist_rejected": self.persist_rejected,
+            "last_error": self.last_error,
+        }
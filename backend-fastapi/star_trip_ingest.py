@@ -0,0 +1,163 @@
+# -----------------------------------------------------
+# INGESTA POR TROZOS Y REANUDABLE DE SESIONES STAR TRIP
+# -----------------------------------------------------
+# Una grabación larga ya no tiene que llegar en un único POST: se abre una
+# sesión de subida, se envían trozos numerados (HTTP o WebSocket) y se
+# finaliza. Cada trozo alimenta al momento el SpectralAccumulator, así que
+# en memoria sólo queda el estado del análisis (nunca la señal) y el
+# resultado está listo en cuanto llega el último trozo.
+#
+# Reanudación: los trozos llevan número de secuencia. Un trozo repetido
+# (reintento tras un corte) se confirma sin volver a procesarse; uno que se
+# adelanta se rechaza indicando cuál se espera. El estado de la subida se
+# consulta en cualquier momento para saber desde dónde continuar.
+
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import numpy as np
+
+from star_trip_analysis import DEFAULT_SAMPLE_RATE_HZ, MAX_SAMPLE_RATE_HZ, SpectralAccumulator, summarize_session
+
+INGEST_TTL_S = float(os.getenv("STAR_TRIP_INGEST_TTL_S", 900))
+MAX_INGEST_SESSIONS = int(os.getenv("STAR_TRIP_MAX_INGEST_SESSIONS", 1000))
+MAX_SESSION_MINUTES = int(os.getenv("STAR_TRIP_MAX_SESSION_MINUTES", 180))
+MAX_CHUNK_BYTES = int(os.getenv("STAR_TRIP_MAX_CHUNK_BYTES", 8 * 1024 * 1024))
+# Trozos a partir de este tamaño se analizan en un hilo para no frenar el event loop
+CHUNK_THREAD_THRESHOLD = 65536
+
+
+class IngestError(Exception):
+    """Error de la ingesta con su código HTTP (el endpoint lo traduce a HTTPException)."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class IngestSession:
+    """Estado de una subida: metadatos, secuencia esperada y análisis acumulado."""
+
+    def __init__(self, upload_id: str, user_id: str, session_id: str, mode: str, sample_rate_hz: float, max_duration_minutes: int):
+        if not 0 < sample_rate_hz <= MAX_SAMPLE_RATE_HZ:
+            # max_points escala con la frecuencia: sin tope fijo el límite de duración no limitaría nada
+            raise IngestError(422, f"sample_rate_hz debe estar entre 0 y {MAX_SAMPLE_RATE_HZ:g} Hz.")
+        self.upload_id = upload_id
+        self.user_id = user_id
+        self.session_id = session_id
+        self.mode = mode
+        self.sample_rate_hz = sample_rate_hz
+        minutes = min(max(1, max_duration_minutes), MAX_SESSION_MINUTES)
+        self.max_points = int(minutes * 60 * sample_rate_hz)
+        self.accumulator = SpectralAccumulator(sample_rate_hz)
+        self.next_seq = 0
+        self.duplicates = 0
+        self.touched_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def status(self) -> dict:
+        return {
+            "upload_id": self.upload_id,
+            "session_id": self.session_id,
+            "mode": self.mode,
+            "next_seq": self.next_seq,
+            "received_points": self.accumulator.samples,
+            "max_points": self.max_points,
+            "windows": self.accumulator.windows,
+            "duplicates": self.duplicates,
+        }
+
+
+class IngestSessionStore:
+    """Sesiones de subida abiertas, con caducidad por inactividad y límite de concurrencia."""
+
+    def __init__(self, ttl: float = INGEST_TTL_S, max_sessions: int = MAX_INGEST_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: Dict[str, IngestSession] = {}
+        self.expired = 0
+        self.finalized = 0
+
+    def _sweep(self) -> None:
+        deadline = time.monotonic() - self.ttl
+        for upload_id in [key for key, session in self._sessions.items() if session.touched_at < deadline]:
+            del self._sessions[upload_id]
+            self.expired += 1
+
+    def open(
+        self,
+        user_id: str,
+        session_id: str,
+        mode: str,
+        sample_rate_hz: float = DEFAULT_SAMPLE_RATE_HZ,
+        max_duration_minutes: int = 5,
+    ) -> IngestSession:
+        self._sweep()
+        if len(self._sessions) >= self.max_sessions:
+            raise IngestError(503, "Demasiadas subidas de Star Trip abiertas. Reintenta en unos minutos.")
+        upload_id = uuid.uuid4().hex
+        session = IngestSession(upload_id, user_id, session_id, mode, sample_rate_hz, max_duration_minutes)
+        self._sessions[upload_id] = session
+        return session
+
+    def get(self, upload_id: str) -> IngestSession:
+        self._sweep()
+        session = self._sessions.get(upload_id)
+        if session is None:
+            raise IngestError(404, "Subida de Star Trip desconocida o caducada.")
+        session.touched_at = time.monotonic()
+        return session
+
+    async def append(self, upload_id: str, seq: int, samples: np.ndarray) -> dict:
+        if seq < 0:
+            raise IngestError(400, "Número de secuencia inválido.")
+        session = self.get(upload_id)
+        async with session.lock:
+            if seq < session.next_seq:
+                # Reintento de un trozo ya procesado: se confirma sin contarlo dos veces
+                session.duplicates += 1
+                return session.status()
+            if seq > session.next_seq:
+                raise IngestError(409, f"Trozo fuera de orden: se esperaba seq={session.next_seq}.")
+            if session.accumulator.samples + samples.size > session.max_points:
+                raise IngestError(413, f"La sesión supera su duración máxima ({session.max_points} puntos).")
+            if samples.size >= CHUNK_THREAD_THRESHOLD:
+                await asyncio.to_thread(session.accumulator.feed, samples)
+            else:
+                session.accumulator.feed(samples)
+            session.next_seq += 1
+            session.touched_at = time.monotonic()
+            return session.status()
+
+    async def finalize(self, upload_id: str, deliver: Callable[[IngestSession, dict], Awaitable[Any]]) -> Any:
+        """Analiza la subida y entrega el resultado con `deliver(sesión, resultado)`.
+
+        La subida sólo se cierra cuando la entrega termina: si falla (p. ej. 503 con la
+        cola de persistencia llena) sigue abierta y el cliente puede volver a finalizar.
+        """
+        session = self.get(upload_id)
+        async with session.lock:
+            if self._sessions.get(upload_id) is not session:
+                raise IngestError(404, "Subida de Star Trip ya finalizada.")
+            features = session.accumulator.features()
+            outcome = await deliver(session, summarize_session(features, session.mode, session.sample_rate_hz))
+            del self._sessions[upload_id]
+            self.finalized += 1
+            return outcome
+
+    def abort(self, upload_id: str) -> Optional[IngestSession]:
+        return self._sessions.pop(upload_id, None)
+
+    def stats(self) -> dict:
+        self._sweep()
+        return {
+            "open": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_s": self.ttl,
+            "finalized": self.finalized,
+            "expired": self.expired,
+        }
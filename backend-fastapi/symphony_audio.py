@@ -0,0 +1,222 @@
+# -----------------------------------------------------
+# SÍNTESIS DE AUDIO DE LA SINFONÍA CÓSMICA (STREAMING)
+# -----------------------------------------------------
+# compose_symphony sólo devuelve notas (pitch MIDI, duración, tempo e
+# instrumento) y cada cliente las sintetizaba por su cuenta. Aquí se
+# renderizan en el servidor a PCM mono de 16 bits (WAV o crudo, a 48 kHz por
+# defecto: la frecuencia nativa de Opus) con osciladores y envolventes
+# vectorizados en NumPy.
+#
+# El audio se genera por bloques de medio segundo y cada bloque se envía en
+# cuanto está listo: la memoria no depende de la duración del clip (un render
+# de 5 minutos a 48 kHz son 28,8 MB de PCM que nunca se juntan). Cada bloque
+# se calcula en un hilo para no frenar el event loop.
+#
+# Los clips pequeños (una pasada de la sinfonía) se guardan en una LRU cuya
+# clave son los parámetros que determinan el sonido; una petición repetida se
+# sirve de memoria sin sintetizar.
+
+import asyncio
+import math
+import os
+import struct
+from typing import AsyncIterator, Optional, Sequence
+
+import numpy as np
+
+from cosmic_cache import TTLCache
+from render_cache import content_key
+
+SAMPLE_RATES = (22050, 24000, 44100, 48000)
+DEFAULT_SAMPLE_RATE = 48000
+MAX_RENDER_MINUTES = int(os.getenv("SYMPHONY_MAX_RENDER_MINUTES", 5))
+MAX_NOTES = 4096
+MIN_NOTE_MS, MAX_NOTE_MS = 20, 10_000
+BLOCK_SECONDS = 0.5
+SYMPHONY_CACHE_SIZE = int(os.getenv("SYMPHONY_CACHE_SIZE", 32))
+# Sólo se cachean clips hasta este tamaño (~43 s a 48 kHz); los más largos siempre se transmiten
+SYMPHONY_CACHE_MAX_CLIP_MB = float(os.getenv("SYMPHONY_CACHE_MAX_CLIP_MB", 4))
+# Cambiarlo invalida la caché si cambia el sonido
+AUDIO_VERSION = 1
+
+# Pico de la suma de armónicos: deja margen para el acento de tempo sin saturar
+AMPLITUDE = 0.6 * 32767
+MEDIA_TYPES = {"wav": "audio/wav", "pcm": "application/octet-stream"}
+
+# Timbre por modo de Star Trip (el instrumento es "Cosmic Synth - <modo>")
+TIMBRES = {
+    # Brillante y pulsado: ataque corto, armónicos altos y acento marcado en cada pulso
+    "Focus": {"harmonics": (1.0, 0.5, 0.3, 0.15), "attack_s": 0.005, "decay_s": 0.6, "release_s": 0.04, "pulse": 0.3},
+    "Relax": {"harmonics": (1.0, 0.35, 0.1), "attack_s": 0.04, "decay_s": 1.5, "release_s": 0.12, "pulse": 0.12},
+    # Casi senoidal, ataque lento y sin acento
+    "Sleep": {"harmonics": (1.0, 0.15), "attack_s": 0.12, "decay_s": 4.0, "release_s": 0.25, "pulse": 0.0},
+}
+DEFAULT_TIMBRE = "Relax"
+
+
+def timbre_for(instrument: str) -> str:
+    mode = instrument.rsplit("-", 1)[-1].strip()
+    return mode if mode in TIMBRES else DEFAULT_TIMBRE
+
+
+def wav_header(sample_rate: int, data_bytes: int) -> bytes:
+    """Cabecera RIFF/WAVE de PCM mono de 16 bits; el tamaño se conoce antes de sintetizar."""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE", b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16, b"data", data_bytes,
+    )
+
+
+class SymphonyRenderer:
+    """Una sinfonía lista para sintetizar por bloques: tabla de notas, timbre y formato de salida."""
+
+    def __init__(
+        self,
+        pitch: Sequence[int],
+        duration_ms: Sequence[int],
+        tempo_bpm: int,
+        instrument: str,
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+        max_duration_minutes: float = MAX_RENDER_MINUTES,
+        loop: bool = False,
+        format: str = "wav",
+    ):
+        pitch = np.asarray(pitch, dtype=np.int64)
+        duration_ms = np.asarray(duration_ms, dtype=np.int64)
+        if pitch.size == 0 or pitch.size != duration_ms.size or pitch.size > MAX_NOTES:
+            raise ValueError(f"pitch y duration_ms deben tener la misma longitud (1 a {MAX_NOTES} notas).")
+        if pitch.min() < 0 or pitch.max() > 127:
+            raise ValueError("pitch debe ser una nota MIDI entre 0 y 127.")
+        if duration_ms.min() < MIN_NOTE_MS or duration_ms.max() > MAX_NOTE_MS:
+            raise ValueError(f"duration_ms debe estar entre {MIN_NOTE_MS} y {MAX_NOTE_MS} ms.")
+        if sample_rate not in SAMPLE_RATES:
+            raise ValueError(f"sample_rate debe ser uno de {SAMPLE_RATES}.")
+        if not 0 < max_duration_minutes <= MAX_RENDER_MINUTES:
+            raise ValueError(f"max_duration_minutes debe estar entre 0 y {MAX_RENDER_MINUTES}.")
+
+        self.sample_rate = sample_rate
+        self.format = format
+        self.tempo_bpm = tempo_bpm
+        self.timbre = timbre_for(instrument)
+        self.loop = loop
+        self.max_duration_minutes = max_duration_minutes
+        self.key = content_key(
+            AUDIO_VERSION, format, sample_rate, tempo_bpm, self.timbre, max_duration_minutes, int(loop),
+            pitch.tobytes(), duration_ms.tobytes(),
+        )
+
+        lengths = duration_ms * sample_rate // 1000
+        one_pass = int(lengths.sum())
+        limit = int(max_duration_minutes * 60 * sample_rate)
+        self.total_samples = limit if loop else min(one_pass, limit)
+        # Con `loop` la melodía se repite hasta llenar la duración pedida
+        repeats = math.ceil(self.total_samples / one_pass)
+        self.lengths = np.tile(lengths, repeats)
+        self.starts = np.concatenate(([0], np.cumsum(self.lengths)[:-1]))
+        self.freqs = np.tile(440.0 * 2.0 ** ((pitch - 69) / 12.0), repeats)
+
+    @property
+    def duration_s(self) -> float:
+        return self.total_samples / self.sample_rate
+
+    @property
+    def content_length(self) -> int:
+        return self.total_samples * 2 + (44 if self.format == "wav" else 0)
+
+    @property
+    def block_count(self) -> int:
+        return math.ceil(self.total_samples / self.block_samples)
+
+    @property
+    def block_samples(self) -> int:
+        return int(self.sample_rate * BLOCK_SECONDS)
+
+    def headers(self) -> dict:
+        return {
+            "X-Audio-Sample-Rate": str(self.sample_rate),
+            "X-Audio-Channels": "1",
+            "X-Audio-Encoding": "s16le",
+            "X-Audio-Duration-S": f"{self.duration_s:.3f}",
+        }
+
+    def render_block(self, start: int, count: int) -> np.ndarray:
+        """Muestras int16 [start, start + count): cada muestra busca su nota y evalúa oscilador y envolvente."""
+        timbre = TIMBRES[self.timbre]
+        rate = self.sample_rate
+        n = np.arange(start, start + count, dtype=np.int64)
+        note = np.searchsorted(self.starts, n, side="right") - 1
+        local = (n - self.starts[note]) / rate
+        remaining = self.lengths[note] / rate - local
+        freq = self.freqs[note]
+
+        # Fase desde el inicio de cada nota: la envolvente parte y termina en cero, sin clics
+        phase = (2 * np.pi) * freq * local
+        weights = timbre["harmonics"]
+        wave = np.zeros(count)
+        for k, weight in enumerate(weights, start=1):
+            # Los armónicos por encima de Nyquist se omiten (aliasing)
+            wave += np.where(freq * k < rate / 2, weight * np.sin(k * phase), 0.0)
+        wave *= AMPLITUDE / sum(weights)
+
+        envelope = np.minimum(1.0, local / timbre["attack_s"])
+        envelope *= np.exp(-local / timbre["decay_s"])
+        envelope *= np.clip(remaining / timbre["release_s"], 0.0, 1.0)
+        if timbre["pulse"]:
+            # Acento al inicio de cada pulso del tempo, que decae en un cuarto de pulso
+            beat = 60.0 / self.tempo_bpm
+            since_beat = np.mod(n / rate, beat)
+            envelope *= (1 - timbre["pulse"]) + timbre["pulse"] * np.exp(-since_beat / (beat / 4))
+        wave *= envelope
+        return wave.astype("<i2")
+
+    def chunk(self, index: int) -> bytes:
+        """Bloque `index` listo para enviar (el primero del WAV lleva la cabecera)."""
+        start = index * self.block_samples
+        data = self.render_block(start, min(self.block_samples, self.total_samples - start)).tobytes()
+        if index == 0 and self.format == "wav":
+            return wav_header(self.sample_rate, self.total_samples * 2) + data
+        return data
+
+
+class SymphonyClipCache:
+    """LRU de clips ya renderizados; los clips grandes se transmiten sin guardarse nunca enteros."""
+
+    def __init__(self, maxsize: int = SYMPHONY_CACHE_SIZE, max_clip_bytes: int = int(SYMPHONY_CACHE_MAX_CLIP_MB * 1024 * 1024)):
+        self.clips = TTLCache(maxsize=maxsize, ttl=None)
+        self.max_clip_bytes = max_clip_bytes
+        self.renders = 0
+        self.rendered_seconds = 0.0
+        self.aborted = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.clips.get(key)
+
+    async def stream(self, renderer: SymphonyRenderer) -> AsyncIterator[bytes]:
+        """Sintetiza bloque a bloque en un hilo y entrega cada uno en cuanto está listo."""
+        keep = [] if renderer.content_length <= self.max_clip_bytes else None
+        self.renders += 1
+        completed = False
+        try:
+            for index in range(renderer.block_count):
+                chunk = await asyncio.to_thread(renderer.chunk, index)
+                if keep is not None:
+                    keep.append(chunk)
+                yield chunk
+            completed = True
+        finally:
+            if completed:
+                self.rendered_seconds += renderer.duration_s
+                if keep is not None:
+                    self.clips.set(renderer.key, b"".join(keep))
+            else:
+                # Cliente desconectado a mitad: no se cachea un clip incompleto
+                self.aborted += 1
+
+    def stats(self) -> dict:
+        return {
+            "clips": self.clips.stats(),
+            "max_clip_bytes": self.max_clip_bytes,
+            "renders": self.renders,
+            "rendered_seconds": round(self.rendered_seconds, 1),
+            "aborted": self.aborted,
+        }
@@ -0,0 +1,8 @@
+# Las pruebas importan los módulos del backend y los dobles locales de benchmarks/
+# (servidor SMTP de prueba, FakeFirestore) tal como lo hacen los benchmarks.
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
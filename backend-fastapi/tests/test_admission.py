@@ -0,0 +1,200 @@
+"""Control de admisión: 429 por cubeta, 413 por tamaño, 503 por concurrencia y 1013 en WebSockets."""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect
+
+from admission import WS_TRY_AGAIN_LATER, AdmissionController, AdmissionMiddleware
+
+
+def build_app(controller: Optional[AdmissionController] = None) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"bytes": len(await request.body())}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.websocket("/ws")
+    async def ws(websocket: WebSocket):
+        await websocket.accept()
+        await websocket.receive_text()
+
+    if controller is not None:
+        app.add_middleware(AdmissionMiddleware, controller=controller)
+    return app
+
+
+def http_scope(path: str, headers=()) -> dict:
+    return {"type": "http", "method": "POST", "path": path, "headers": list(headers),
+            "client": ("198.51.100.7", 5000), "query_string": b""}
+
+
+async def call(middleware, scope, chunks) -> int:
+    """Ejecuta una petición ASGI con el cuerpo en `chunks` y devuelve el estado de la respuesta."""
+    incoming = [{"type": "http.request", "body": chunk, "more_body": idx < len(chunks) - 1}
+                for idx, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        if incoming:
+            return incoming.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware(scope, receive, send)
+    return next(message["status"] for message in sent if message["type"] == "http.response.start")
+
+
+def test_route_bucket_answers_429_with_retry_after():
+    controller = AdmissionController(default_rate=0)
+    policy = controller.limit("/echo", rate=0.5, burst=2)
+    with TestClient(build_app(controller)) as client:
+        statuses = [client.post("/echo", content=b"x") for _ in range(3)]
+        # La cubeta general está desactivada: otras rutas siguen entrando
+        assert client.get("/ping").status_code == 200
+    assert [response.status_code for response in statuses] == [200, 200, 429]
+    # Un token cada 2 s
+    assert statuses[2].headers["retry-after"] == "2"
+    assert policy.admitted == 2 and policy.rejected["rate_limited"] == 1
+
+
+def test_default_bucket_limits_every_route():
+    controller = AdmissionController(default_rate=1, default_burst=1)
+    with TestClient(build_app(controller)) as client:
+        assert client.get("/ping").status_code == 200
+        response = client.get("/ping")
+    assert response.status_code == 429 and response.headers["retry-after"] == "1"
+    assert controller.default_rejected == 1
+
+
+def test_content_length_over_the_limit_is_rejected_without_reading():
+    controller = AdmissionController(default_rate=0)
+    policy = controller.limit("/echo", max_body_bytes=100)
+    with TestClient(build_app(controller)) as client:
+        assert client.post("/echo", content=b"x" * 100).json() == {"bytes": 100}
+        assert client.post("/echo", content=b"x" * 101).status_code == 413
+    assert policy.rejected["too_large"] == 1
+
+
+def test_chunked_body_is_cut_at_the_limit_and_replayed_when_it_fits():
+    controller = AdmissionController(default_rate=0)
+    policy = controller.limit("/echo", max_body_bytes=100)
+    middleware = AdmissionMiddleware(build_app(), controller)
+
+    # Sin Content-Length: el middleware lee los trozos y corta al pasar de 100 bytes
+    assert asyncio.run(call(middleware, http_scope("/echo"), [b"x" * 60, b"x" * 60, b"x" * 60])) == 413
+    assert asyncio.run(call(middleware, http_scope("/echo"), [b"x" * 60, b"x" * 40])) == 200
+    assert policy.rejected["too_large"] == 1 and policy.admitted == 1
+    assert policy.in_flight == 0
+
+
+def test_full_concurrency_cap_answers_503():
+    controller = AdmissionController(default_rate=0)
+    policy = controller.limit("/slow", max_concurrency=1)
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = AdmissionMiddleware(slow_app, controller)
+
+    async def scenario():
+        first = asyncio.create_task(call(middleware, http_scope("/slow"), [b""]))
+        await asyncio.sleep(0)
+        assert policy.in_flight == 1
+        second = await call(middleware, http_scope("/slow"), [b""])
+        release.set()
+        return await first, second
+
+    assert asyncio.run(scenario()) == (200, 503)
+    assert policy.rejected["overloaded"] == 1 and policy.in_flight == 0
+
+
+def test_websocket_over_the_client_budget_is_accepted_then_closed_with_1013():
+    controller = AdmissionController(default_rate=0)
+    policy = controller.limit("/ws", websocket=True, max_connections_per_client=1)
+    with TestClient(build_app(controller)) as client:
+        with client.websocket_connect("/ws") as first:
+            # El handshake se completa y el primer mensaje es el cierre con 1013 y su motivo
+            with client.websocket_connect("/ws") as rejected:
+                with pytest.raises(WebSocketDisconnect) as closed:
+                    rejected.receive_text()
+            assert closed.value.code == WS_TRY_AGAIN_LATER
+            assert closed.value.reason == "Presupuesto de conexiones agotado"
+            first.send_text("bye")
+        # Al cerrarse la primera se libera su hueco
+        with client.websocket_connect("/ws") as again:
+            again.send_text("bye")
+    assert policy.rejected["client_budget"] == 1 and policy.admitted == 2
+    assert policy.connections == 0
+
+
+def test_uvicorn_client_sees_the_1013_close_not_a_403():
+    controller = AdmissionController(default_rate=0)
+    controller.limit("/ws", websocket=True, max_connections_per_client=0)
+    server = uvicorn.Server(uvicorn.Config(build_app(controller), port=0, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not server.started and time.monotonic() < deadline:
+            time.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        with connect(f"ws://127.0.0.1:{port}/ws") as ws:
+            with pytest.raises(ConnectionClosed) as closed:
+                ws.recv(timeout=5)
+        assert closed.value.rcvd.code == WS_TRY_AGAIN_LATER
+        assert closed.value.rcvd.reason == "Presupuesto de conexiones agotado"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+def test_disabled_controller_lets_everything_through():
+    controller = AdmissionController(default_rate=1, default_burst=1, enabled=False)
+    controller.limit("/echo", rate=0.1, burst=1, max_body_bytes=1)
+    with TestClient(build_app(controller)) as client:
+        assert all(client.post("/echo", content=b"xyz").status_code == 200 for _ in range(3))
+
+
+def test_client_key_uses_the_entry_added_by_the_trusted_proxy():
+    def scope(*forwarded):
+        return {"client": ("10.0.0.1", 5000), "headers": [(b"x-forwarded-for", value) for value in forwarded]}
+
+    direct = AdmissionController(trust_proxy=0)
+    one_hop = AdmissionController(trust_proxy=1)
+    two_hops = AdmissionController(trust_proxy=2)
+    assert direct.client_key(scope(b"1.1.1.1")) == "10.0.0.1"
+    # Lo de la izquierda lo pone el cliente: cambiarlo no cambia la clave
+    assert one_hop.client_key(scope(b"1.1.1.1, 203.0.113.9")) == "203.0.113.9"
+    assert one_hop.client_key(scope(b"2.2.2.2, 203.0.113.9")) == "203.0.113.9"
+    assert two_hops.client_key(scope(b"6.6.6.6, 203.0.113.9, 198.51.100.2")) == "203.0.113.9"
+    assert two_hops.client_key(scope(b"203.0.113.9", b"198.51.100.2")) == "203.0.113.9"
+    assert two_hops.client_key(scope(b"203.0.113.9")) == "203.0.113.9"
+    assert one_hop.client_key(scope()) == "10.0.0.1"
+
+
+def test_spoofed_forwarded_for_does_not_bypass_the_bucket():
+    controller = AdmissionController(default_rate=0, trust_proxy=1)
+    controller.limit("/echo", rate=0.1, burst=1)
+    with TestClient(build_app(controller)) as client:
+        statuses = [client.post("/echo", content=b"x", headers={"X-Forwarded-For": f"6.6.6.{idx}, 203.0.113.9"}).status_code
+                    for idx in range(3)]
+    assert statuses == [200, 429, 429]
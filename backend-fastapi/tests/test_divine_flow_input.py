@@ -0,0 +1,32 @@
+"""Entradas de Divine Flow: un mensaje inválido se ignora sin detener la sala compartida."""
+
+from fastapi.testclient import TestClient
+
+import main
+from divine_flow_rooms import merge_observer_inputs, parse_observer_input
+
+
+def test_observer_input_is_coerced_or_rejected():
+    assert parse_observer_input({}) == {"x": 50.0, "y": 50.0, "active": False}
+    assert parse_observer_input({"x": "12.5", "y": 3, "active": 1}) == {"x": 12.5, "y": 3.0, "active": True}
+    for bad in ({"x": "oops"}, {"x": None}, {"y": [1, 2]}, {"x": float("nan")}, {"y": "inf"}, {"active": "yes"}):
+        assert parse_observer_input(bad) is None, bad
+
+
+def test_merge_of_parsed_inputs_never_raises():
+    inputs = {1: parse_observer_input({"x": 10, "y": 20, "active": True}), 2: parse_observer_input({"x": 90})}
+    assert merge_observer_inputs(inputs) == (10.0, 20.0, True)
+
+
+def test_bad_messages_do_not_close_the_other_viewers():
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws/divine-flow?room=input-test") as viewer, \
+                client.websocket_connect("/ws/divine-flow?room=input-test") as sender:
+            for message in ({"x": "oops"}, {"x": None}, {"y": [1]}, [1, 2], "texto", 7, {"physics_mode": ["x"]}):
+                sender.send_json(message)
+            sender.send_json({"x": 20, "y": 80, "active": True})
+            # La sala sigue emitiendo frames a ambos
+            for _ in range(3):
+                assert "particles" in viewer.receive_json()
+                assert "particles" in sender.receive_json()
+            assert main.room_manager.rooms["input-test"].inputs
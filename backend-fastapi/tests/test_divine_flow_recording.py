@@ -0,0 +1,60 @@
+"""Grabaciones de Divine Flow: archivos truncados en el listado y la repetición."""
+
+import pytest
+
+from divine_flow_recording import EXTENSION, FILE_HEADER, FILE_MAGIC, FORMAT_VERSION, ReplayLibrary
+
+
+def test_truncated_files_are_skipped_in_the_listing(tmp_path):
+    (tmp_path / f"empty{EXTENSION}").write_bytes(b"")
+    (tmp_path / f"short{EXTENSION}").write_bytes(b"DFRC\x01")
+    # Cabecera completa pero los metadatos JSON cortados
+    header = FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION, 20, 200, 50.0, 0.0)
+    (tmp_path / f"meta{EXTENSION}").write_bytes(header + b'{"room": ')
+    library = ReplayLibrary(str(tmp_path))
+    assert library.list() == []
+    for recording_id in ("empty", "short", "meta"):
+        with pytest.raises(ValueError):
+            library.open(recording_id)
+
+
+def test_budget_counts_files_sizes_and_active_recordings(tmp_path):
+    mb = 1024 * 1024
+    library = ReplayLibrary(str(tmp_path), max_recordings=3, max_total_bytes=10 * mb)
+    assert library.recording_budget() == 10 * mb
+    (tmp_path / f"a{EXTENSION}").write_bytes(b"\0" * (4 * mb))
+    assert library.usage() == (1, 4 * mb)
+
+    class Growing:
+        active, max_bytes, bytes_written = True, 5 * mb, 1 * mb
+
+    # Lo que aún puede crecer la grabación en curso también cuenta
+    assert library.recording_budget([Growing()]) == 2 * mb
+    (tmp_path / f"b{EXTENSION}").write_bytes(b"")
+    (tmp_path / f"c{EXTENSION}").write_bytes(b"")
+    assert library.recording_budget() == 0
+
+
+def test_recording_endpoint_refuses_once_the_directory_is_full(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    monkeypatch.setattr(main, "replay_library", ReplayLibrary(str(tmp_path), max_recordings=1))
+    monkeypatch.setattr(main.admission, "enabled", False)
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws/divine-flow?room=rec-quota") as ws:
+            ws.receive_json()
+            url = "/api/v1/divine-flow/rooms/rec-quota/recording"
+            assert client.post(url).status_code == 200
+            assert client.delete(url).status_code == 200
+            assert client.post(url).status_code == 507
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_recording_endpoints_have_an_admission_policy():
+    import main
+
+    for method in ("POST", "DELETE"):
+        policy = main.admission.match(method, "/api/v1/divine-flow/rooms/any/recording")
+        assert policy is not None and policy.buckets is not None
@@ -0,0 +1,50 @@
+"""Los dobles de benchmarks/fake_backends.py: los endpoints reales escriben en ellos y no salen de la máquina."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from api_suite import session_points
+from fake_backends import install
+
+REPLACED = ("star_trip_writer", "star_trip_history", "mail_queue")
+
+
+@pytest.fixture
+def fakes(monkeypatch):
+    # install() reemplaza globales del módulo main: se restauran al acabar cada prueba
+    for name in REPLACED:
+        monkeypatch.setattr(main, name, getattr(main, name))
+    monkeypatch.setattr(main.admission, "enabled", main.admission.enabled)
+    monkeypatch.setenv("ZOHO_USER", "portal@cosmic.local")
+    monkeypatch.setenv("ZOHO_PASSWORD", "benchmark")
+    backends = install(main, firestore_latency_ms=0, smtp_handshake_ms=0)
+    yield backends
+    backends["smtp"].stop()
+
+
+def test_contact_form_is_delivered_to_the_stand_in_smtp_server(fakes):
+    payload = {"name": "Ana", "email": "ana@cosmic.local", "subject": "Hola", "message": "Una misión."}
+    with TestClient(main.app) as client:
+        response = client.post("/api/v1/contact", json=payload)
+        assert response.status_code == 200
+    # Al cerrar el lifespan la cola se vacía: el mensaje ya está entregado
+    assert fakes["smtp"].delivered == 1
+    assert main.mail_queue.stats()["sent"] == 1
+
+
+def test_star_trip_session_lands_in_the_fake_firestore(fakes):
+    body = {"user_id": "ana", "session_id": "s1", "mode": "Relax",
+            "raw_frequency_points": session_points(2_048).tolist()}
+    with TestClient(main.app) as client:
+        response = client.post("/api/v1/star-trip/analyze-data", json=body)
+        assert response.status_code == 200
+        score = response.json()["result_score"]
+        stats = client.get("/api/v1/star-trip/users/ana/stats").json()
+    assert stats["sessions"] == 1 and stats["best"]["score"] == score
+
+    store = fakes["firestore"].store
+    session = store[("star_trip_results", "ana", "sessions", "s1")]
+    assert session["score"] == score and session["mode"] == "Relax"
+    # Los agregados viajan en la misma cola write-behind
+    assert store[("star_trip_results", "ana")]["stats"]["sessions"] == 1
@@ -0,0 +1,130 @@
+"""Cola write-behind de Firestore contra el FakeFirestore de los benchmarks: fusión, reencolado y descartes."""
+
+import asyncio
+
+from bench_firestore_writer import FakeFirestore
+from firestore_writer import FirestoreWriteBehind
+
+
+def path(doc_id: str) -> tuple:
+    return ("star_trip_results", "user", "sessions", doc_id)
+
+
+def test_writes_to_the_same_document_are_coalesced():
+    db = FakeFirestore(0.0)
+
+    async def scenario():
+        writer = FirestoreWriteBehind(lambda: db, max_batch=2, flush_interval=60)
+        for score in (1, 2, 3):
+            assert writer.enqueue(path("a"), {"score": score})
+        assert writer.enqueue(path("b"), {"score": 10})
+        assert writer.enqueue(path("c"), {"score": 20})
+        await writer.drain()
+        return writer.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["enqueued"] == 3 and stats["coalesced"] == 2
+    assert stats["written"] == 3 and stats["batches"] == 2
+    assert stats["pending"] == 0 and stats["dropped"] == 0
+    # Gana la última escritura, igual que set()
+    assert db.store[path("a")] == {"score": 3}
+    assert db.store[path("c")] == {"score": 20}
+
+
+def test_enqueue_is_rejected_when_the_queue_is_full():
+    db = FakeFirestore(0.0)
+
+    async def scenario():
+        writer = FirestoreWriteBehind(lambda: db, max_pending=2, flush_interval=60)
+        accepted = [writer.enqueue(path(doc_id), {}) for doc_id in "abc"]
+        # Fusionar con un documento ya en cola no ocupa sitio
+        accepted.append(writer.enqueue(path("a"), {"again": True}))
+        await writer.drain()
+        return accepted, writer.stats()
+
+    accepted, stats = asyncio.run(scenario())
+    assert accepted == [True, True, False, True]
+    assert stats["rejected"] == 1 and stats["written"] == 2
+
+
+def test_failed_batch_is_requeued_and_written_once_firestore_recovers():
+    db = FakeFirestore(0.0, fail_rate=1.0)
+
+    async def scenario():
+        writer = FirestoreWriteBehind(lambda: db, flush_interval=0.01, max_retries=1, base_backoff=0.01)
+        writer.enqueue(path("a"), {"score": 1})
+        await asyncio.sleep(0.1)
+        failing = writer.stats()
+        # Tras fallar sigue sin confirmar (en cola o reintentándose), no se pierde
+        unconfirmed = writer.peek(path("a"))
+        writer.enqueue(path("a"), {"score": 2})
+        db.fail_rate = 0.0
+        await asyncio.sleep(0.1)
+        await writer.drain()
+        return failing, unconfirmed, writer.stats()
+
+    failing, unconfirmed, stats = asyncio.run(scenario())
+    assert failing["written"] == 0 and failing["retries"] >= 1
+    assert "ConnectionError" in failing["last_error"]
+    assert unconfirmed == {"score": 1}
+    assert stats["written"] >= 1 and stats["dropped"] == 0 and stats["pending"] == 0
+    # El reencolado nunca pisa una escritura más nueva del mismo documento
+    assert db.store[path("a")] == {"score": 2}
+
+
+def test_requeued_batch_is_retried_later():
+    db = FakeFirestore(0.0, fail_rate=1.0)
+
+    async def scenario():
+        writer = FirestoreWriteBehind(lambda: db, flush_interval=0.01, max_retries=0)
+        writer.enqueue(path("a"), {"score": 1})
+        # Sin reintentos internos, cada fallo devuelve el lote a la cola y el siguiente ciclo lo vuelve a intentar
+        await asyncio.sleep(0.1)
+        first_error = writer.last_error
+        db.fail_rate = 0.0
+        await asyncio.sleep(0.1)
+        stats = writer.stats()
+        await writer.drain()
+        return first_error, stats
+
+    first_error, stats = asyncio.run(scenario())
+    assert "ConnectionError" in first_error
+    assert stats["written"] == 1 and stats["pending"] == 0 and stats["dropped"] == 0
+    assert db.store[path("a")] == {"score": 1}
+
+
+def test_requeue_drops_when_the_queue_filled_up_meanwhile():
+    # Cada viaje tarda 0,2 s y falla: mientras el lote de "a" está en vuelo la cola se llena
+    db = FakeFirestore(0.2, fail_rate=1.0)
+
+    async def scenario():
+        writer = FirestoreWriteBehind(lambda: db, max_batch=1, max_pending=2, flush_interval=0.01, max_retries=0)
+        writer.enqueue(path("a"), {})
+        writer.enqueue(path("b"), {})
+        await asyncio.sleep(0.05)
+        assert writer.enqueue(path("c"), {})
+        await asyncio.sleep(0.25)
+        dropped = writer.stats()["dropped"]
+        db.fail_rate, db.latency_s = 0.0, 0.0
+        await writer.drain()
+        return dropped, writer.stats()
+
+    dropped, stats = asyncio.run(scenario())
+    assert dropped == 1
+    assert stats["written"] == 2
+    assert set(db.store) == {path("b"), path("c")}
+
+
+def test_drain_counts_what_cannot_be_written():
+    db = FakeFirestore(0.0, fail_rate=1.0)
+
+    async def scenario():
+        writer = FirestoreWriteBehind(lambda: db, flush_interval=60, base_backoff=0.0)
+        for doc_id in "abc":
+            writer.enqueue(path(doc_id), {})
+        await writer.drain(retries=0)
+        return writer.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["dropped"] == 3 and stats["pending"] == 0 and stats["written"] == 0
+    assert db.store == {}
@@ -0,0 +1,28 @@
+"""Los generadores NumPy de cosmic_geometry deben dar exactamente los mismos puntos que los escalares originales."""
+
+import pytest
+
+import cosmic_geometry
+from bench_geometry import check_parity, legacy_advanced_cosmic_geometry, legacy_sacred_geometry
+
+GEOMETRY_TYPES = cosmic_geometry.GEOMETRY_TYPES + ("unknown",)
+
+
+def test_batch_matches_scalar_generators():
+    checked, mismatches = check_parity()
+    assert checked > 0
+    assert mismatches == 0
+
+
+@pytest.mark.parametrize("geometry_type", GEOMETRY_TYPES)
+@pytest.mark.parametrize("frequency", [432, 432.5, 528.0, 741.5, 963, 1234.25, 3431.5])
+@pytest.mark.parametrize("nodes", [12, 17, 24, 36])
+def test_single_mandala_matches_scalar_generator(geometry_type, frequency, nodes):
+    expected = legacy_advanced_cosmic_geometry(geometry_type, frequency, nodes)
+    assert cosmic_geometry.generate_advanced_cosmic_geometry(geometry_type, frequency, nodes) == expected
+
+
+@pytest.mark.parametrize("frequency", [432, 528.5, 963])
+@pytest.mark.parametrize("nodes", [12, 25, 36])
+def test_sacred_geometry_matches_scalar_generator(frequency, nodes):
+    assert cosmic_geometry.generate_sacred_geometry(frequency, nodes) == legacy_sacred_geometry(frequency, nodes)
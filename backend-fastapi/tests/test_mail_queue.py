@@ -0,0 +1,138 @@
+"""Cola de correo contra el servidor SMTP de prueba: entrega, reintento y recuperación del spool."""
+
+import asyncio
+import os
+import socket
+
+import pytest
+
+from bench_mail_queue import RAW_MESSAGE, StandInSMTPServer, plain_connect
+from mail_queue import MailQueue, SMTPConnectionPool
+
+
+@pytest.fixture
+def smtp_server():
+    servers = []
+
+    def start(fail_every: int = 0) -> StandInSMTPServer:
+        server = StandInSMTPServer(0.0, fail_every)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spooled_files(spool_dir) -> list:
+    return [name for name in os.listdir(spool_dir) if name.endswith(".json")]
+
+
+def make_queue(port: int, spool_dir, **kwargs) -> MailQueue:
+    pool = SMTPConnectionPool("127.0.0.1", port, "portal", "secret", size=2, connect=plain_connect)
+    return MailQueue(pool, str(spool_dir), workers=2, **kwargs)
+
+
+def test_messages_are_delivered_and_removed_from_spool(smtp_server, tmp_path):
+    server = smtp_server()
+
+    async def scenario():
+        queue = make_queue(server.port, tmp_path)
+        ids = [await queue.enqueue("portal@cosmic", ["portal@cosmic"], RAW_MESSAGE) for _ in range(5)]
+        assert all(ids)
+        # Ya en disco al volver de enqueue
+        assert len(spooled_files(tmp_path)) + queue.stats()["sent"] == 5
+        await queue.drain(timeout=10)
+        return queue.stats()
+
+    stats = asyncio.run(scenario())
+    assert server.delivered == 5
+    assert stats["sent"] == 5 and stats["spooled"] == 0 and stats["failed"] == 0
+    # Una conexión autenticada por worker como mucho, no una por mensaje
+    assert server.connections <= 2
+    assert spooled_files(tmp_path) == []
+
+
+def test_transient_failures_are_retried(smtp_server, tmp_path):
+    # Uno de cada dos DATA responde 451 (error transitorio)
+    server = smtp_server(fail_every=2)
+
+    async def scenario():
+        queue = make_queue(server.port, tmp_path, base_backoff=0.01)
+        for _ in range(4):
+            await queue.enqueue("portal@cosmic", ["portal@cosmic"], RAW_MESSAGE)
+        await queue.drain(timeout=10)
+        return queue.stats()
+
+    stats = asyncio.run(scenario())
+    assert server.delivered == 4
+    assert stats["sent"] == 4 and stats["failed"] == 0
+    assert stats["retries"] >= 2
+    assert "451" in stats["last_error"]
+    assert spooled_files(tmp_path) == []
+
+
+def test_spool_is_recovered_after_restart(smtp_server, tmp_path):
+    async def server_down():
+        # Nada escucha en este puerto: todo queda pendiente en el spool al apagar
+        queue = make_queue(unused_port(), tmp_path, base_backoff=0.05, max_attempts=100)
+        for _ in range(3):
+            await queue.enqueue("portal@cosmic", ["portal@cosmic"], RAW_MESSAGE)
+        await queue.drain(timeout=0.3)
+        return queue.stats()
+
+    stats = asyncio.run(server_down())
+    assert stats["sent"] == 0 and stats["spooled"] == 3
+    assert stats["retries"] >= 3
+    assert len(spooled_files(tmp_path)) == 3
+
+    server = smtp_server()
+
+    async def restarted():
+        queue = make_queue(server.port, tmp_path)
+        queue.start()
+        await queue.drain(timeout=10)
+        return queue.stats()
+
+    stats = asyncio.run(restarted())
+    assert server.delivered == 3
+    assert stats["sent"] == 3 and stats["spooled"] == 0
+    assert spooled_files(tmp_path) == []
+
+
+def test_spool_errors_do_not_stop_the_workers(smtp_server, tmp_path):
+    # Uno de cada dos DATA falla y apuntar el reintento en disco también falla
+    server = smtp_server(fail_every=2)
+
+    async def scenario():
+        queue = make_queue(server.port, tmp_path, base_backoff=0.01)
+        write = queue._write
+
+        def failing_retry_write(record):
+            if record["attempts"]:
+                raise OSError("disco lleno")
+            write(record)
+
+        queue._write = failing_retry_write
+        for _ in range(4):
+            await queue.enqueue("portal@cosmic", ["portal@cosmic"], RAW_MESSAGE)
+        await queue.drain(timeout=10)
+        first = queue.stats()
+
+        # Los workers siguen vivos; al volver a arrancar retoman además lo que quedó en el spool
+        queue._write = write
+        await queue.enqueue("portal@cosmic", ["portal@cosmic"], RAW_MESSAGE)
+        await queue.drain(timeout=10)
+        return first, queue.stats()
+
+    first, last = asyncio.run(scenario())
+    assert first["sent"] == 2 and first["spool_errors"] == 2 and first["spooled"] == 0
+    assert "disco lleno" in first["last_error"]
+    assert last["sent"] == 5 and last["spooled"] == 0 and server.delivered == 5
+    assert spooled_files(tmp_path) == []
@@ -0,0 +1,120 @@
+"""Historial de Star Trip: agregados precalculados y paginación por cursor contra el FakeFirestore."""
+
+import asyncio
+import datetime
+
+from bench_firestore_writer import FakeFirestore
+from firestore_writer import FirestoreWriteBehind
+from star_trip_history import RESULTS_COLLECTION, StarTripHistory, apply_session, empty_aggregate, public_stats, session_day
+
+DAY = 86400
+# Mediodía UTC para que las sesiones de un mismo día no crucen la medianoche
+BASE = int(datetime.datetime(2025, 3, 10, 12, tzinfo=datetime.timezone.utc).timestamp())
+
+
+def build(sessions) -> dict:
+    aggregate = empty_aggregate()
+    for session_id, timestamp, score, mode in sessions:
+        apply_session(aggregate, session_id, {"timestamp": timestamp, "score": score, "mode": mode}, recent_size=3)
+    return aggregate
+
+
+def test_aggregates_averages_bests_and_streaks():
+    aggregate = build([
+        ("s1", BASE, 95.0, "Focus"),
+        ("s2", BASE + DAY, 97.0, "Relax"),
+        ("s3", BASE + 2 * DAY, 96.0, "Focus"),
+        # Hueco de dos días: la racha vuelve a 1
+        ("s4", BASE + 5 * DAY, 94.0, "Sleep"),
+        ("s5", BASE + 5 * DAY + 60, 99.0, "Focus"),
+    ])
+    stats = public_stats(aggregate, today=session_day(BASE + 5 * DAY))
+    assert stats["sessions"] == 5
+    assert stats["average_score"] == round((95 + 97 + 96 + 94 + 99) / 5, 2)
+    assert stats["best"]["session_id"] == "s5" and stats["best"]["score"] == 99.0
+    assert stats["modes"]["Focus"] == {"sessions": 3, "average_score": round((95 + 96 + 99) / 3, 2), "best_score": 99.0}
+    assert stats["modes"]["Relax"]["sessions"] == 1 and stats["modes"]["Sleep"]["best_score"] == 94.0
+    assert stats["streak"]["current"] == 1 and stats["streak"]["longest"] == 3
+    assert stats["first_session_at"] == BASE and stats["last_session_at"] == BASE + 5 * DAY + 60
+    # Sólo las 3 más recientes, de la más nueva a la más antigua
+    assert [entry["session_id"] for entry in aggregate["recent"]] == ["s5", "s4", "s3"]
+    # Sin sesión ayer ni hoy, la racha actual se corta
+    assert public_stats(aggregate, today=session_day(BASE + 8 * DAY))["streak"]["current"] == 0
+
+
+def test_rewriting_a_recent_session_replaces_it():
+    aggregate = build([("s1", BASE, 95.0, "Focus"), ("s2", BASE + 60, 93.0, "Focus")])
+    apply_session(aggregate, "s2", {"timestamp": BASE + 60, "score": 97.0, "mode": "Relax"})
+    stats = public_stats(aggregate, today=session_day(BASE))
+    assert stats["sessions"] == 2
+    assert stats["average_score"] == 96.0
+    assert set(stats["modes"]) == {"Focus", "Relax"}
+    assert stats["modes"]["Focus"]["sessions"] == 1
+
+
+def seed_sessions(db: FakeFirestore, user_id: str, count: int) -> list:
+    """Sesiones con timestamps repetidos (empates) para ejercitar el desempate del cursor."""
+    expected = []
+    for index in range(count):
+        session_id = f"s{index:03d}"
+        timestamp = BASE + (index // 3) * 60
+        db.store[(RESULTS_COLLECTION, user_id, "sessions", session_id)] = {
+            "timestamp": timestamp, "score": 90.0 + index % 10, "mode": "Focus",
+        }
+        expected.append((timestamp, session_id))
+    return [session_id for _, session_id in sorted(expected, reverse=True)]
+
+
+def test_cursor_pages_cover_every_session_once():
+    db = FakeFirestore(0.0)
+    expected = seed_sessions(db, "ana", 23)
+
+    async def scenario():
+        writer = FirestoreWriteBehind(lambda: db, flush_interval=60)
+        history = StarTripHistory(lambda: db, writer, recent_size=5)
+        pages, cursor = [], None
+        while True:
+            page = await history.history("ana", limit=4, cursor=cursor)
+            pages.append(page)
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        # Repetir una página la sirve de la caché
+        repeated = await history.history("ana", limit=4, cursor=pages[1]["next_cursor"])
+        await writer.drain()
+        return pages, repeated, history.stats_summary()
+
+    pages, repeated, summary = asyncio.run(scenario())
+    served = [entry["session_id"] for page in pages for entry in page["sessions"]]
+    assert served == expected
+    assert all(page["total_sessions"] == 23 for page in pages)
+    assert repeated == pages[2]
+    # Sin agregados previos se reconstruyen una vez; la primera página sale de ellos sin consulta
+    assert summary["rebuilds"] == 1
+    assert summary["page_queries"] == len(pages) - 1 and summary["page_hits"] == 1
+
+
+def test_recorded_sessions_update_stats_and_persist_aggregates():
+    db = FakeFirestore(0.0)
+
+    async def scenario():
+        writer = FirestoreWriteBehind(lambda: db, flush_interval=60)
+        history = StarTripHistory(lambda: db, writer)
+        for index, score in enumerate((95.0, 98.0, 96.0)):
+            path = (RESULTS_COLLECTION, "leo", "sessions", f"s{index}")
+            data = {"timestamp": BASE + index * DAY, "score": score, "mode": "Relax"}
+            writer.enqueue(path, data)
+            history.record("leo", f"s{index}", data)
+        stats = await history.stats("leo")
+        await writer.drain()
+
+        # Otro proceso (caché fría) lee el documento de agregados: una lectura, sin reconstruir
+        cold = StarTripHistory(lambda: db, FirestoreWriteBehind(lambda: db))
+        return stats, await cold.stats("leo"), cold.stats_summary()
+
+    stats, cold_stats, cold_summary = asyncio.run(scenario())
+    assert stats["sessions"] == 3 and stats["best"]["score"] == 98.0
+    assert stats["modes"]["Relax"]["average_score"] == round((95 + 98 + 96) / 3, 2)
+    assert stats["streak"]["longest"] == 3
+    assert cold_stats == stats
+    assert cold_summary["aggregate_reads"] == 1 and cold_summary["rebuilds"] == 0
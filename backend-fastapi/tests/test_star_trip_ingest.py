@@ -0,0 +1,70 @@
+"""Ingesta por trozos de Star Trip: mensajes inválidos y finalize reintentable tras un 503."""
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from bench_firestore_writer import FakeFirestore
+from firestore_writer import FirestoreWriteBehind
+
+CHUNK = np.sin(np.arange(1024) / 4).astype("<f4")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "star_trip_history", None)
+    monkeypatch.setattr(main.admission, "enabled", False)
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def open_upload(client) -> str:
+    response = client.post("/api/v1/star-trip/sessions", json={"user_id": "ana", "session_id": "s1", "mode": "Focus"})
+    assert response.status_code == 200
+    return response.json()["upload_id"]
+
+
+def full_writer() -> FirestoreWriteBehind:
+    # max_pending=0: toda escritura se rechaza como con la cola saturada
+    return FirestoreWriteBehind(lambda: FakeFirestore(0.0), max_pending=0)
+
+
+def test_websocket_rejects_json_that_is_not_an_object(client):
+    upload_id = open_upload(client)
+    with client.websocket_connect(f"/ws/star-trip/{upload_id}") as ws:
+        for text in ("[]", '"x"', "1", "{", '{"seq": [1]}'):
+            ws.send_text(text)
+            assert ws.receive_json()["status_code"] == 400
+        ws.send_bytes((0).to_bytes(4, "little") + CHUNK.tobytes())
+        assert ws.receive_json()["next_seq"] == 1
+
+
+def test_http_finalize_keeps_the_upload_after_a_503(client, monkeypatch):
+    upload_id = open_upload(client)
+    client.put(f"/api/v1/star-trip/sessions/{upload_id}/chunks/0", content=CHUNK.tobytes())
+
+    monkeypatch.setattr(main, "star_trip_writer", full_writer())
+    assert client.post(f"/api/v1/star-trip/sessions/{upload_id}/finalize").status_code == 503
+    assert client.get(f"/api/v1/star-trip/sessions/{upload_id}").json()["received_points"] == CHUNK.size
+
+    monkeypatch.setattr(main, "star_trip_writer", FirestoreWriteBehind(lambda: FakeFirestore(0.0)))
+    response = client.post(f"/api/v1/star-trip/sessions/{upload_id}/finalize")
+    assert response.status_code == 200 and response.json()["processed_points"] == CHUNK.size
+    assert client.post(f"/api/v1/star-trip/sessions/{upload_id}/finalize").status_code == 404
+
+
+def test_websocket_finalize_can_be_retried_after_a_503(client, monkeypatch):
+    upload_id = open_upload(client)
+    monkeypatch.setattr(main, "star_trip_writer", full_writer())
+    with client.websocket_connect(f"/ws/star-trip/{upload_id}") as ws:
+        ws.send_bytes((0).to_bytes(4, "little") + CHUNK.tobytes())
+        ws.receive_json()
+        ws.send_json({"action": "finalize"})
+        assert ws.receive_json()["status_code"] == 503
+
+        monkeypatch.setattr(main, "star_trip_writer", FirestoreWriteBehind(lambda: FakeFirestore(0.0)))
+        ws.send_json({"action": "finalize"})
+        result = ws.receive_json()
+    assert result["processed_points"] == CHUNK.size and result["session_id"] == "s1"
+    assert main.star_trip_writer.stats()["enqueued"] == 1
@@ -0,0 +1,68 @@
+# -----------------------------------------------------
+# TRANSMUTACIÓN EN STREAMING PARA TEXTOS LARGOS (COSMIC ARCHITECT)
+# -----------------------------------------------------
+# Acumula, trozo a trozo, todo lo que el análisis necesita del texto sin
+# guardarlo: el estado del autómata de palabras clave y sus aciertos, la suma
+# de códigos del texto en minúsculas (frecuencia de respaldo) y el hash
+# ponderado por posición del texto original (perfil de color). La memoria
+# por petición es constante; el costo, una sola pasada lineal.
+
+import codecs
+from typing import Set
+
+import numpy as np
+
+from keyword_matcher import CosmicLexicon
+
+# Fragmento máximo procesado de una vez: acota los temporales y evita desbordar int64
+MAX_SLICE_CHARS = 65536
+PREVIEW_CHARS = 280
+
+
+def _code_points(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+
+
+class TransmutationStream:
+    """Estado incremental de una transmutación; `feed` acepta bytes UTF-8 o texto."""
+
+    def __init__(self, lexicon: CosmicLexicon):
+        self.lexicon = lexicon
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._state = 0
+        self._hit_indices: Set[int] = set()
+        self.length = 0
+        self.lower_sum = 0
+        self.color_hash = 0
+        self.preview = ""
+
+    def feed(self, chunk) -> None:
+        text = self._decoder.decode(chunk) if isinstance(chunk, (bytes, bytearray)) else chunk
+        for start in range(0, len(text), MAX_SLICE_CHARS):
+            self._feed_text(text[start:start + MAX_SLICE_CHARS])
+
+    def _feed_text(self, text: str) -> None:
+        if not text:
+            return
+        if len(self.preview) < PREVIEW_CHARS:
+            self.preview += text[:PREVIEW_CHARS - len(self.preview)]
+
+        # Nota: lower() por fragmento coincide con lower() del texto completo salvo
+        # el caso contextual de la sigma final griega justo en un borde de fragmento.
+        lower = text.lower()
+        self._state, _ = self.lexicon.automaton.search(lower, self._state, self._hit_indices)
+        self.lower_sum += int(_code_points(lower).sum())
+
+        # Σ ord(c)·(offset + i + 1) = offset·Σ ord(c) + Σ ord(c)·(i + 1)
+        codes = _code_points(text)
+        weights = np.arange(1, len(codes) + 1, dtype=np.int64)
+        self.color_hash += self.length * int(codes.sum()) + int(np.dot(codes, weights))
+        self.length += len(codes)
+
+    def finish(self) -> None:
+        # Bytes UTF-8 incompletos al final se sustituyen igual que en una decodificación normal
+        self._feed_text(self._decoder.decode(b"", final=True))
+
+    @property
+    def hits(self) -> Set[str]:
+        return self.lexicon.hits_from_indices(self._hit_indices)